@@ -1,29 +1,63 @@
-from minigit import MinigitObject
+import os
+from minigit import MinigitObject, iter_file_chunks
+from logger import get_logger
+
+log = get_logger("Blob")
 
 class Blob(MinigitObject):
+    __slots__ = ()
 
     def __init__(self, data=None):
         #if the data is a string, we encode it to bytes
         if isinstance(data, str):
             data = data.encode('utf-8')
         super().__init__(data)
-        print(f"[Blob] Created blob with {len(self.data)} bytes")
+        log.trace("Created blob with %d bytes", len(self.data))
 
     def get_type(self):
         return "blob"
     #this is a class method that creates a blob object from a file
     @classmethod
     def from_file(cls, file_path):
-        print(f"[Blob] Reading file: {file_path}")
+        log.trace("Reading file: %s", file_path)
         #we open the file in binary mode and read the content "rb flag"
         with open(file_path, 'rb') as f:
             content = f.read()
-        print(f"[Blob] Read {len(content)} bytes from {file_path}")
+        log.trace("Read %d bytes from %s", len(content), file_path)
         return cls(content)
 
+    @classmethod
+    def from_file_stream(cls, file_path):
+        #same as from_file but the content stays on disk until it is hashed or stored
+        return FileBlob(file_path)
+
     def save_to_file(self, file_path):
-        print(f"[Blob] Writing {len(self.data)} bytes to: {file_path}")
+        log.trace("Writing %d bytes to: %s", len(self.data), file_path)
         #we open the file in binary mode and write the content "wb flag"
         with open(file_path, 'wb') as f:
             f.write(self.data)
-        print(f"[Blob] Successfully wrote file: {file_path}")
\ No newline at end of file
+        log.trace("Successfully wrote file: %s", file_path)
+
+
+class FileBlob(Blob):
+    #a blob backed by a file on disk, we only keep the stat result and read fixed size chunks when needed
+    #so hashing and storing a multi GB file does not need the whole thing in memory
+    __slots__ = ('file_path', 'stat')
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.oid = None
+        with open(file_path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+        log.trace("Streaming blob for %s (%d bytes)", file_path, self.stat.st_size)
+
+    @property
+    def data(self):
+        #only for callers that really want everything in memory
+        return b''.join(self.iter_data_chunks())
+
+    def get_size(self):
+        return self.stat.st_size
+
+    def iter_data_chunks(self):
+        return iter_file_chunks(self.file_path, self.stat.st_size)
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from logger import get_logger
+
+log = get_logger("ObjectCache")
+
+#rough per entry cost on top of the content: the object, its slots, the key and the OrderedDict node
+ENTRY_OVERHEAD = 200
+
+
+class ObjectCache:
+    #objects never change once stored under their id, so a loaded object can be handed out again as is.
+    #Least recently used entries are dropped once the cached content goes over max_bytes.
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, oid):
+        entry = self._entries.get(oid)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(oid)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, oid, obj, size):
+        cost = size + ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        old = self._entries.pop(oid, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        self._entries[oid] = (obj, cost)
+        self.current_bytes += cost
+
+        while self.current_bytes > self.max_bytes:
+            evicted_oid, (evicted, evicted_cost) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_cost
+            log.trace("Evicted %s (%d bytes)", evicted_oid.hex(), evicted_cost)
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+        }
@@ -1,9 +1,10 @@
 import sys
 import os
 import argparse
+import subprocess
+import time
 import importlib.util
 #TODO: this is a bit of a hack, I should find a better way to do this but chalega
-#Logs are very verbose and probably one log class would be better for all objects.
 
 #this function is used to load the module from the file path, MODULE IS basically where the import command is
 def load_module(module_name, file_path):
@@ -19,6 +20,10 @@ sys.path.insert(0, script_dir)
 repo_module = load_module("repository", os.path.join(script_dir, "repository.py"))
 Repository = repo_module.Repository
 
+import logger
+import fsmonitor
+from pack import PackIndex, MAX_DELTA_DEPTH
+
 #this is the command to initialize the repository, so the python code is a bit convoluted but it is needed to create the repository object.
 def cmd_init(args):
     print("[CLI] Initializing minigit repository...")
@@ -53,7 +58,9 @@ def cmd_init(args):
 
 
 def cmd_cat_file(args):
-    print(f"[CLI] Reading object: {args.object}")
+    header_only = args.t or args.s
+    if not header_only:
+        print(f"[CLI] Reading object: {args.object}")
     
     repo = Repository.find_repository()
     if repo is None:
@@ -66,22 +73,30 @@ def cmd_cat_file(args):
         return 1
     
     try:
-        obj = repo.load_object(full_hash)
+        if header_only:
+            #only the header is inflated, tooling can check thousands of big blobs this way
+            obj_type, size = repo.read_object_header(full_hash)
+            print(obj_type if args.t else size)
+            return 0
+        
+        obj_type, size, chunks = repo.open_object_stream(full_hash)
         
-        print(f"[CLI] Object type: {obj.get_type()}")
+        print(f"[CLI] Object type: {obj_type}")
         print(f"[CLI] Object hash: {full_hash}")
-        print(f"[CLI] Object size: {len(obj.data)} bytes")
+        print(f"[CLI] Object size: {size} bytes")
         print()
         
-        if obj.get_type() == "blob":
-            try:
-                content = obj.data.decode('utf-8')
-                print(content, end='')
-            except UnicodeDecodeError:
-                print(f"[CLI] Binary content ({len(obj.data)} bytes)")
-                print(f"[CLI] First 100 bytes: {obj.data[:100]}")
+        if obj_type == "blob":
+            #pipe the content straight through so big blobs never sit in memory
+            sys.stdout.flush()
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return 0
         
-        elif obj.get_type() == "tree":
+        obj = repo.load_object(full_hash)
+        
+        if obj.get_type() == "tree":
             obj.display_tree()
         
         elif obj.get_type() == "commit":
@@ -123,42 +138,30 @@ def cmd_status(args):
         print(f"[CLI] Last commit: {head_commit.message}")
         print()
     
-    working_files = repo.get_working_files()
+    status = repo.compute_status()
+    staged_files = status['staged']
+    modified_files = status['modified']
+    deleted_files = status['deleted']
+    untracked_files = status['untracked']
+    unmodified_files = status['unmodified']
+    working_count = len(unmodified_files) + len(untracked_files) + len(set(staged_files + modified_files) - set(deleted_files))
     
-    if not working_files:
+    if not working_count and not deleted_files:
         print("[CLI] No files in working directory")
         return 0
     
-    staged_files = []
-    modified_files = []
-    untracked_files = []
-    unmodified_files = []
-    
-    for file_path in working_files:
-        status = repo.get_file_status_detailed(file_path)
-        
-        if status == "staged":
-            staged_files.append(file_path)
-        elif status == "modified":
-            modified_files.append(file_path)
-        elif status == "modified_after_staging":
-            staged_files.append(file_path)
-            modified_files.append(file_path)
-        elif status == "untracked":
-            untracked_files.append(file_path)
-        elif status == "unmodified":
-            unmodified_files.append(file_path)
-    
     if staged_files:
         print("[CLI] Changes to be committed:")
         for file_path in staged_files:
             print(f"[CLI]   staged: {file_path}")
         print()
     
-    if modified_files:
+    if modified_files or deleted_files:
         print("[CLI] Changes not staged for commit:")
         for file_path in modified_files:
             print(f"[CLI]   modified: {file_path}")
+        for file_path in deleted_files:
+            print(f"[CLI]   deleted:  {file_path}")
         print()
     
     if untracked_files:
@@ -168,13 +171,13 @@ def cmd_status(args):
         print()
         print("[CLI] (use 'minigit add <file>' to track files)")
     
-    if not staged_files and not modified_files and not untracked_files:
+    if not staged_files and not modified_files and not deleted_files and not untracked_files:
         if head_commit is None:
             print("[CLI] Nothing to commit (create files and use 'minigit add' to track)")
         else:
             print("[CLI] Nothing to commit, working tree clean")
     
-    print(f"[CLI] Total files: {len(working_files)} ({len(unmodified_files)} tracked, {len(staged_files)} staged, {len(untracked_files)} untracked, {len(modified_files)} modified)")
+    print(f"[CLI] Total files: {working_count} ({len(unmodified_files)} tracked, {len(staged_files)} staged, {len(untracked_files)} untracked, {len(modified_files)} modified, {len(deleted_files)} deleted)")
     
     return 0
 
@@ -188,12 +191,12 @@ def cmd_add(args):
         print("[CLI] Run 'minigit init' to initialize a repository")
         return 1
     
-    if not args.files:
+    if not args.files and not args.update:
         print("[CLI] ERROR: No files specified")
         print("[CLI] Use 'minigit add <file>' to add files")
         return 1
     
-    added_files = []
+    paths = []
     failed_files = []
     
     for file_path in args.files:
@@ -209,25 +212,15 @@ def cmd_add(args):
                 print(f"[CLI] ERROR: Cannot resolve path {file_path}")
                 failed_files.append(file_path)
                 continue
-        
-        full_path = os.path.join(repo.repo_path, file_path)
-        if not os.path.exists(full_path):
-            print(f"[CLI] ERROR: File not found: {file_path}")
-            failed_files.append(file_path)
-            continue
-        
-        if os.path.isdir(full_path):
-            print(f"[CLI] ERROR: Cannot add directory: {file_path}")
-            print(f"[CLI] (Use 'minigit add' on individual files in the directory)")
-            failed_files.append(file_path)
-            continue
-        
-        hash_value = repo.add_to_index(file_path)
-        if hash_value:
-            added_files.append((file_path, hash_value))
-            print(f"[CLI] ✅ Added: {file_path}")
-        else:
-            failed_files.append(file_path)
+        paths.append(file_path)
+    
+    added_files, failed = repo.add_paths(paths, update_only=args.update, jobs=args.jobs, use_processes=args.process_pool)
+    
+    for file_path, hash_value in added_files:
+        print(f"[CLI] ✅ Added: {file_path}")
+    for file_path, reason in failed:
+        print(f"[CLI] ERROR: {reason}: {file_path}")
+        failed_files.append(file_path)
     
     if added_files:
         print(f"\n[CLI] Successfully added {len(added_files)} file(s):")
@@ -244,6 +237,10 @@ def cmd_add(args):
         else:
             return 1
     
+    if not added_files:
+        print("[CLI] Nothing to add, files match the last commit")
+        return 0
+    
     print(f"\n[CLI] Use 'minigit status' to see staged files")
     return 0
 
@@ -303,19 +300,20 @@ def cmd_log(args):
     print(f"[CLI] Found {len(history)} commit(s)\n")
     
     for i, (commit_hash, commit) in enumerate(history):
-        print(f"Commit: {commit_hash[:4]}")
-        print(f"Tree:   {commit.tree_hash[:4]}")
+        abbrev = repo.shortest_unique_abbrev
+        print(f"Commit: {abbrev(commit_hash)}")
+        print(f"Tree:   {abbrev(commit.tree_hash)}")
         if commit.parent_hash:
-            print(f"Parent: {commit.parent_hash[:4]}")
+            print(f"Parent: {abbrev(commit.parent_hash)}")
         print(f"Author: {commit.author}")
-        print(f"Date:   {commit.timestamp}")
+        print(f"Date:   {commit.format_date()}")
         print(f"Message: {commit.message}")
         
         try:
-            tree = repo.load_object(commit.tree_hash)
-            print(f"\nTree contents ({len(tree.entries)} files):")
-            for entry in tree.entries:
-                print(f"  {entry['mode']} {entry['hash'][:4]} {entry['name']}")
+            tree_files = list(repo.iter_tree_files(commit.tree_hash))
+            print(f"\nTree contents ({len(tree_files)} files):")
+            for file_path, mode, hash_value in tree_files:
+                print(f"  {mode} {abbrev(hash_value)} {file_path}")
         except Exception as e:
             print(f"  Error loading tree: {e}")
         
@@ -399,74 +397,296 @@ def cmd_checkout(args):
         return 1
 
 
+def cmd_repack(args):
+    print("[CLI] Packing objects...")
+    
+    repo = Repository.find_repository()
+    if repo is None:
+        print("[CLI] ERROR: Not a minigit repository")
+        print("[CLI] Run 'minigit init' to initialize a repository")
+        return 1
+    
+    loose_count = len(repo.list_loose_objects())
+    idx_path = repo.repack(all_objects=args.a, delete_loose=args.d, window=args.window, depth=args.depth)
+    
+    if idx_path is None:
+        print("[CLI] Nothing to pack")
+        return 0
+    
+    # with -a objects from the old packs are written too
+    packed_count = len(PackIndex(idx_path))
+    print(f"[CLI] ✅ Packed {packed_count} object(s) into {os.path.basename(idx_path)[:-len('.idx')]}")
+    if args.d:
+        print(f"[CLI] Removed {loose_count} loose object(s)")
+    return 0
+
+
+def cmd_fsmonitor(args):
+    repo = Repository.find_repository()
+    if repo is None:
+        print("[CLI] ERROR: Not a minigit repository")
+        print("[CLI] Run 'minigit init' to initialize a repository")
+        return 1
+    
+    running = fsmonitor.send_command(repo.fsmonitor_socket, 'status')
+    
+    if args.action == 'status':
+        if running is None:
+            print("[CLI] fsmonitor is not running")
+            return 1
+        print(f"[CLI] fsmonitor is running (pid {running['pid']}, {running['watches']} directories watched, {running['changes']} changed paths)")
+        if running.get('unwatched'):
+            print(f"[CLI] {running['unwatched']} directories could not be watched, status scans everything (raise fs.inotify.max_user_watches and restart)")
+        return 0
+    
+    if args.action == 'stop':
+        if running is None:
+            print("[CLI] fsmonitor is not running")
+            return 0
+        fsmonitor.send_command(repo.fsmonitor_socket, 'stop')
+        print("[CLI] ✅ Stopped fsmonitor")
+        return 0
+    
+    if running is not None:
+        print(f"[CLI] fsmonitor is already running (pid {running['pid']})")
+        return 0
+    
+    if args.action == 'run':
+        try:
+            daemon = fsmonitor.FSMonitorDaemon(repo.repo_path, repo.fsmonitor_socket)
+        except OSError as e:
+            print(f"[CLI] ERROR: Cannot start fsmonitor: {e}")
+            return 1
+        daemon.serve_forever()
+        return 0
+    
+    # start: run the daemon detached from this terminal and wait until it answers
+    with open(os.path.join(repo.minigit_path, "fsmonitor.log"), 'ab') as log_file:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "fsmonitor", "run"],
+            cwd=repo.repo_path,
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=log_file,
+            start_new_session=True
+        )
+    
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        if fsmonitor.send_command(repo.fsmonitor_socket, 'status') is not None:
+            print(f"[CLI] ✅ Started fsmonitor (pid {process.pid})")
+            return 0
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    
+    print("[CLI] ERROR: fsmonitor did not start, see .minigit/fsmonitor.log")
+    return 1
+
+
+PRUNE_UNITS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60,
+    'week': 7 * 24 * 60 * 60,
+}
+
+
+def parse_prune_expire(value):
+    #accepts what git gc --prune does for the common cases: now, never, or <n>.<unit>.ago
+    value = value.strip().lower()
+    if value == 'now':
+        return 0
+    if value == 'never':
+        return None
+    if value.isdigit():
+        return int(value)
+    
+    parts = value.split('.')
+    if len(parts) == 3 and parts[0].isdigit() and parts[2] == 'ago':
+        unit = parts[1][:-1] if parts[1].endswith('s') else parts[1]
+        if unit in PRUNE_UNITS:
+            return int(parts[0]) * PRUNE_UNITS[unit]
+    raise argparse.ArgumentTypeError(f"invalid prune expiry '{value}' (use now, never, seconds or e.g. 2.weeks.ago)")
+
+
+def parse_delta_depth(value):
+    #readers give up on chains longer than MAX_DELTA_DEPTH, a deeper pack would lose objects
+    try:
+        depth = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid depth '{value}'")
+    if not 0 <= depth <= MAX_DELTA_DEPTH:
+        raise argparse.ArgumentTypeError(f"depth must be between 0 and {MAX_DELTA_DEPTH}, got {depth}")
+    return depth
+
+
+def cmd_gc(args):
+    print("[CLI] Removing unreachable objects...")
+    
+    repo = Repository.find_repository()
+    if repo is None:
+        print("[CLI] ERROR: Not a minigit repository")
+        print("[CLI] Run 'minigit init' to initialize a repository")
+        return 1
+    
+    try:
+        pruned = repo.gc(prune_expire=args.prune)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[CLI] ERROR: Could not walk the history, nothing was removed: {e}")
+        return 1
+    
+    print(f"[CLI] ✅ Pruned {len(pruned)} unreachable object(s)")
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog='minigit',
         description='Mini-Git: A minimal implementation of Git version control'
     )
     
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count',
+        default=0,
+        help='Show internal logs (-v for repository operations, -vv to trace every object)'
+    )
+    #so -v also works after the command name, e.g. minigit status -v
+    verbose_parent = argparse.ArgumentParser(add_help=False)
+    verbose_parent.add_argument('-v', '--verbose', action='count', default=argparse.SUPPRESS)
+    
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
-    init_parser = subparsers.add_parser('init', help='Initialize a new minigit repository')
+    init_parser = subparsers.add_parser('init', parents=[verbose_parent], help='Initialize a new minigit repository')
     init_parser.add_argument(
         'directory', 
         nargs='?', 
         help='Directory to initialize (default: current directory)'
     )
     
-    cat_file_parser = subparsers.add_parser('cat-file', help='Display object contents')
-    cat_file_parser.add_argument(
+    cat_file_parser = subparsers.add_parser('cat-file', parents=[verbose_parent], help='Display object contents')
+    cat_file_mode = cat_file_parser.add_mutually_exclusive_group()
+    cat_file_mode.add_argument(
         '-p', 
         action='store_true', 
         help='Pretty-print object contents'
     )
+    cat_file_mode.add_argument(
+        '-t',
+        action='store_true',
+        help='Show only the object type'
+    )
+    cat_file_mode.add_argument(
+        '-s',
+        action='store_true',
+        help='Show only the object size in bytes'
+    )
     cat_file_parser.add_argument(
         'object', 
         help='Object hash (full or abbreviated)'
     )
     
-    status_parser = subparsers.add_parser('status', help='Show working directory status')
+    status_parser = subparsers.add_parser('status', parents=[verbose_parent], help='Show working directory status')
     
-    add_parser = subparsers.add_parser('add', help='Add files to staging area')
+    add_parser = subparsers.add_parser('add', parents=[verbose_parent], help='Add files to staging area')
     add_parser.add_argument(
         'files',
-        nargs='+',
-        help='Files to add to staging area'
+        nargs='*',
+        help='Files or directories to add to staging area (. for everything)'
+    )
+    add_parser.add_argument(
+        '-u', '--update',
+        action='store_true',
+        help='Stage modifications of tracked files only'
+    )
+    add_parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Number of files to hash and compress in parallel (default: number of CPUs)'
+    )
+    add_parser.add_argument(
+        '--process-pool',
+        action='store_true',
+        help='Hash in worker processes instead of threads'
     )
     
-    commit_parser = subparsers.add_parser('commit', help='Create a new commit')
+    commit_parser = subparsers.add_parser('commit', parents=[verbose_parent], help='Create a new commit')
     commit_parser.add_argument(
         '-m', '--message',
         required=True,
         help='Commit message'
     )
     
-    log_parser = subparsers.add_parser('log', help='Show commit history')
+    log_parser = subparsers.add_parser('log', parents=[verbose_parent], help='Show commit history')
     log_parser.add_argument(
         '--max-count',
         type=int,
         help='Maximum number of commits to show'
     )
     
-    move_parser = subparsers.add_parser('move', help='Move between commits')
+    move_parser = subparsers.add_parser('move', parents=[verbose_parent], help='Move between commits')
     move_parser.add_argument(
         'direction',
         choices=['u', 'd'],
         help='Direction: u (up/newer) or d (down/older)'
     )
     
-    checkout_parser = subparsers.add_parser('checkout', help='Jump to specific commit')
+    checkout_parser = subparsers.add_parser('checkout', parents=[verbose_parent], help='Jump to specific commit')
     checkout_parser.add_argument(
         'commit',
         help='Commit hash (4+ characters) to checkout'
     )
     
+    repack_parser = subparsers.add_parser('repack', parents=[verbose_parent], help='Pack loose objects into a single file')
+    repack_parser.add_argument(
+        '-a',
+        action='store_true',
+        help='Also fold existing packs into the new one'
+    )
+    repack_parser.add_argument(
+        '-d',
+        action='store_true',
+        help='Delete the loose objects that were packed'
+    )
+    repack_parser.add_argument(
+        '--window',
+        type=int,
+        default=10,
+        help='How many similar objects each one is compared against for deltas (default: 10, 0 disables deltas)'
+    )
+    repack_parser.add_argument(
+        '--depth',
+        type=parse_delta_depth,
+        default=MAX_DELTA_DEPTH,
+        help=f'Maximum length of a delta chain, at most {MAX_DELTA_DEPTH} (default: {MAX_DELTA_DEPTH})'
+    )
+    
+    gc_parser = subparsers.add_parser('gc', parents=[verbose_parent], help='Remove unreachable loose objects')
+    gc_parser.add_argument(
+        '--prune',
+        type=parse_prune_expire,
+        default=parse_prune_expire('2.weeks.ago'),
+        help='Only prune objects older than this: now, never, seconds or e.g. 2.weeks.ago (default: 2.weeks.ago)'
+    )
+    
+    fsmonitor_parser = subparsers.add_parser('fsmonitor', parents=[verbose_parent], help='Watch the working tree so status only looks at changed files')
+    fsmonitor_parser.add_argument(
+        'action',
+        choices=['start', 'stop', 'status', 'run'],
+        help='start/stop the background daemon, show its status, or run it in the foreground'
+    )
+    
     if len(sys.argv) < 2:
         parser.print_help()
         return 1
     
     args = parser.parse_args()
     
+    if args.verbose:
+        logger.set_level(min(logger.get_level(), logger.level_from_verbosity(args.verbose)))
+    
     if args.command == 'init':
         return cmd_init(args)
     elif args.command == 'cat-file':
@@ -483,6 +703,12 @@ def main():
         return cmd_move(args)
     elif args.command == 'checkout':
         return cmd_checkout(args)
+    elif args.command == 'repack':
+        return cmd_repack(args)
+    elif args.command == 'gc':
+        return cmd_gc(args)
+    elif args.command == 'fsmonitor':
+        return cmd_fsmonitor(args)
     else:
         print(f"[CLI] ERROR: Unknown command '{args.command}'")
         parser.print_help()
@@ -1,7 +1,12 @@
-from minigit import MinigitObject
+from minigit import MinigitObject, to_oid
+from logger import get_logger
 import time
 
+log = get_logger("Commit")
+
 class Commit(MinigitObject):
+    __slots__ = ('tree_oid', 'parent_oid', 'author', 'committer', 'message',
+                 'timestamp', 'timezone', 'committer_timestamp', 'committer_timezone')
 
     def __init__(self, tree_hash=None, parent_hash=None, author=None, committer=None, message=""):
         self.tree_hash = tree_hash
@@ -12,14 +17,33 @@ class Commit(MinigitObject):
         self.message = message
         self.timestamp = int(time.time())
         self.timezone = "+0000"
+        self.committer_timestamp = self.timestamp
+        self.committer_timezone = self.timezone
         
         super().__init__()
         self._build_commit_data()
-        print(f"[Commit] Created commit with tree {tree_hash}")
+        log.trace("Created commit with tree %s", tree_hash)
 
     def get_type(self):
         return "commit"
 
+    #ids are stored binary, tree_hash/parent_hash give the hex form
+    @property
+    def tree_hash(self):
+        return self.tree_oid.hex() if self.tree_oid is not None else None
+
+    @tree_hash.setter
+    def tree_hash(self, value):
+        self.tree_oid = to_oid(value) if value else None
+
+    @property
+    def parent_hash(self):
+        return self.parent_oid.hex() if self.parent_oid is not None else None
+
+    @parent_hash.setter
+    def parent_hash(self, value):
+        self.parent_oid = to_oid(value) if value else None
+
     def _build_commit_data(self):
         commit_lines = []
         
@@ -30,72 +54,95 @@ class Commit(MinigitObject):
             commit_lines.append(f"parent {self.parent_hash}")
         
         commit_lines.append(f"author {self.author} {self.timestamp} {self.timezone}")
-        commit_lines.append(f"committer {self.committer} {self.timestamp} {self.timezone}")
+        commit_lines.append(f"committer {self.committer} {self.committer_timestamp} {self.committer_timezone}")
         commit_lines.append("")
         commit_lines.append(self.message)
         
         commit_content = "\n".join(commit_lines)
         self.data = commit_content.encode('utf-8')
         
-        print(f"[Commit] Built commit data: {len(self.data)} bytes")
+        log.trace("Built commit data: %d bytes", len(self.data))
 
     def set_tree(self, tree_hash):
         self.tree_hash = tree_hash
         self._build_commit_data()
-        print(f"[Commit] Set tree hash to {tree_hash}")
+        log.trace("Set tree hash to %s", tree_hash)
 
     def set_parent(self, parent_hash):
         self.parent_hash = parent_hash
         self._build_commit_data()
-        print(f"[Commit] Set parent hash to {parent_hash}")
+        log.trace("Set parent hash to %s", parent_hash)
 
     def set_message(self, message):
         self.message = message
         self._build_commit_data()
-        print(f"[Commit] Set message: {message}")
+        log.trace("Set message: %s", message)
 
     def set_author(self, author):
         self.author = author
         self._build_commit_data()
-        print(f"[Commit] Set author: {author}")
+        log.trace("Set author: %s", author)
+
+    @staticmethod
+    def _split_signature(value):
+        #"Name <email> 1700000000 +0530" -> ("Name <email>", 1700000000, "+0530")
+        parts = value.rsplit(' ', 2)
+        if len(parts) == 3 and parts[1].lstrip('-').isdigit():
+            return parts[0], int(parts[1]), parts[2]
+        return value, 0, "+0000"
 
     @classmethod
     def parse_commit_data(cls, commit_data):
-        if isinstance(commit_data, bytes):
-            commit_data = commit_data.decode('utf-8')
+        #fills the fields straight from the raw bytes, no __init__ so no time.time() and no re-serializing
+        if isinstance(commit_data, str):
+            commit_data = commit_data.encode('utf-8')
+        raw = bytes(commit_data)
         
-        lines = commit_data.split('\n')
-        print(lines)
+        headers, _, message = raw.decode('utf-8').partition('\n\n')
         tree_hash = None
         parent_hash = None
-        author = None
+        author = "Unknown <unknown@example.com> 0 +0000"
         committer = None
-        message_lines = []
-        
-        in_message = False
         
-        for line in lines:
-            if in_message:
-                message_lines.append(line)
-            elif line.startswith('tree '):
+        for line in headers.split('\n'):
+            if line.startswith('tree '):
                 tree_hash = line[5:]
             elif line.startswith('parent '):
-                parent_hash = line[7:]
+                #only the first parent is tracked
+                if parent_hash is None:
+                    parent_hash = line[7:]
             elif line.startswith('author '):
                 author = line[7:]
             elif line.startswith('committer '):
                 committer = line[10:]
-            elif line == '':
-                in_message = True
-        
-        message = '\n'.join(message_lines)
         
-        commit = cls(tree_hash, parent_hash, author, committer, message)
-        print(commit)
+        commit = cls.__new__(cls)
+        commit.tree_hash = tree_hash
+        commit.parent_hash = parent_hash
+        commit.author, commit.timestamp, commit.timezone = cls._split_signature(author)
+        if committer is None:
+            commit.committer = commit.author
+            commit.committer_timestamp = commit.timestamp
+            commit.committer_timezone = commit.timezone
+        else:
+            commit.committer, commit.committer_timestamp, commit.committer_timezone = cls._split_signature(committer)
+        commit.message = message
+        commit.data = raw
+        commit.oid = None
         
-        print(f"[Commit] Parsed commit: tree={tree_hash}, parent={parent_hash}")
+        log.trace("Parsed commit: tree=%s, parent=%s", tree_hash, parent_hash)
         return commit
 
+    def format_date(self):
+        #git style date in the author's own timezone, e.g. "Tue Oct 14 09:12:45 2025 +0530"
+        sign = -1 if self.timezone.startswith('-') else 1
+        digits = self.timezone.lstrip('+-')
+        offset = 0
+        if len(digits) == 4 and digits.isdigit():
+            offset = sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+        local = time.gmtime(self.timestamp + offset)
+        return f"{time.strftime('%a %b %d %H:%M:%S %Y', local)} {self.timezone}"
+
     def display_commit(self):
         print(f"[Commit] Commit Information:")
         print(f"  Tree: {self.tree_hash}")
@@ -0,0 +1,167 @@
+import mmap
+import os
+import struct
+import tempfile
+from logger import get_logger
+
+log = get_logger("CommitGraph")
+
+#Everything a history walk needs from a commit, so it never has to inflate and parse the commit object:
+#  "CGPH" | version u32 | row count u32 | rows...
+#  row = commit id 20 | tree id 20 | parent row u32 | commit time i64 | generation u32   (56 bytes)
+#Rows are appended in the order commits are added and a commit is only added after its parent, so parent
+#rows always come first and a walk is array indexing. Generation is 1 for a root commit and one more than
+#the parent otherwise. Appending writes the new rows after the last one and then the new count, a crash in
+#between leaves rows past the count that the next append overwrites. The file is read through mmap, the id
+#to row lookup is built from the id column the first time it is needed.
+
+SIGNATURE = b'CGPH'
+VERSION = 1
+NO_PARENT = 0xffffffff
+
+HEADER = struct.Struct('>4sII')
+ROW = struct.Struct('>20s20sIqI')
+
+
+class CommitGraph:
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._map = None
+        self._positions = None
+        self._valid = False
+        self._open()
+
+    def _open(self):
+        self.count = 0
+        self._map = None
+        self._positions = None
+        self._valid = False
+        try:
+            with open(self.path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < HEADER.size:
+                    raise ValueError("file is truncated")
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            log.warning("Ignoring commit graph %s: %s", self.path, e)
+            return
+
+        signature, version, count = HEADER.unpack_from(self._map, 0)
+        if signature != SIGNATURE or version != VERSION or size < HEADER.size + count * ROW.size:
+            log.warning("Ignoring commit graph %s: bad header", self.path)
+            self._map = None
+            return
+        self.count = count
+        self._valid = True
+        log.trace("Opened commit graph with %d commits", count)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, oid):
+        return self.position(oid) is not None
+
+    def _positions_map(self):
+        if self._positions is None:
+            self._positions = {self._map[start:start + 20]: i for i, start in enumerate(
+                range(HEADER.size, HEADER.size + self.count * ROW.size, ROW.size))} if self._valid else {}
+        return self._positions
+
+    def position(self, oid):
+        """Row of a binary commit id, or None if the commit is not in the graph"""
+        return self._positions_map().get(oid)
+
+    def row(self, pos):
+        """(oid, tree oid, parent row or None, commit time, generation) of a row"""
+        oid, tree_oid, parent, commit_time, generation = ROW.unpack_from(self._map, HEADER.size + pos * ROW.size)
+        return oid, tree_oid, (None if parent == NO_PARENT else parent), commit_time, generation
+
+    def oid_at(self, pos):
+        start = HEADER.size + pos * ROW.size
+        return self._map[start:start + 20]
+
+    def tree_at(self, pos):
+        start = HEADER.size + pos * ROW.size + 20
+        return self._map[start:start + 20]
+
+    def parent_at(self, pos):
+        parent = struct.unpack_from('>I', self._map, HEADER.size + pos * ROW.size + 40)[0]
+        return None if parent == NO_PARENT else parent
+
+    def generation_at(self, pos):
+        return struct.unpack_from('>I', self._map, HEADER.size + pos * ROW.size + 52)[0]
+
+    def iter_ancestry(self, pos):
+        """Yields pos and then the row of every parent down to the root commit"""
+        while pos is not None:
+            yield pos
+            pos = self.parent_at(pos)
+
+    def append(self, commits):
+        """Add [(oid, tree oid, parent oid or None, commit time)], oldest first, returns the row of each
+
+        A parent has to be in the graph already or come earlier in commits. Commits already in the
+        graph are left as they are.
+        """
+        positions = self._positions_map() if self._valid else {}
+        added = {}
+        rows = []
+        result = []
+        for oid, tree_oid, parent_oid, commit_time in commits:
+            pos = added.get(oid, positions.get(oid))
+            if pos is not None:
+                result.append(pos)
+                continue
+
+            if parent_oid is None:
+                parent, generation = NO_PARENT, 1
+            elif parent_oid in added:
+                parent = added[parent_oid]
+                generation = rows[parent - self.count][1] + 1
+            elif parent_oid in positions:
+                parent = positions[parent_oid]
+                generation = self.generation_at(parent) + 1
+            else:
+                raise ValueError(f"Parent {parent_oid.hex()} of {oid.hex()} is not in the commit graph")
+
+            pos = self.count + len(rows)
+            added[oid] = pos
+            rows.append((ROW.pack(oid, tree_oid, parent, commit_time, generation), generation))
+            result.append(pos)
+
+        if not rows:
+            return result
+
+        data = b''.join(row for row, generation in rows)
+        count = self.count + len(rows)
+        if self._valid:
+            with open(self.path, 'r+b') as f:
+                f.seek(HEADER.size + self.count * ROW.size)
+                f.write(data)
+                f.truncate()
+                f.flush()
+                #the new count goes in last, until then readers still see the old rows only
+                f.seek(0)
+                f.write(HEADER.pack(SIGNATURE, VERSION, count))
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix="tmp_graph_", dir=os.path.dirname(self.path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(HEADER.pack(SIGNATURE, VERSION, count))
+                    f.write(data)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        log.debug("Added %d commits to the commit graph (%d total)", len(rows), count)
+        self._open()
+        positions.update(added)
+        self._positions = positions
+        return result
@@ -0,0 +1,166 @@
+#Copy/insert deltas in the same shape git uses inside packs:
+#  delta = base size varint | result size varint | ops...
+#  copy   = 1xxxxxxx, then the offset bytes flagged in bits 0-3 and the size bytes flagged in bits 4-6
+#  insert = 0nnnnnnn followed by n literal bytes (1-127)
+
+BLOCK_SIZE = 16
+MAX_INSERT = 127
+MAX_COPY = 0xffffff
+
+
+def encode_varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def decode_varint(buffer, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _common_prefix(a, b):
+    #compare big slices first and halve on a mismatch, so identical stretches cost a memcmp rather than a loop
+    limit = min(len(a), len(b))
+    pos = 0
+    step = 4096
+    while step:
+        while pos + step <= limit and a[pos:pos + step] == b[pos:pos + step]:
+            pos += step
+        step //= 2
+    return pos
+
+
+def _common_suffix(a, b, limit):
+    pos = 0
+    step = 4096
+    while step:
+        while pos + step <= limit and a[len(a) - pos - step:len(a) - pos] == b[len(b) - pos - step:len(b) - pos]:
+            pos += step
+        step //= 2
+    return pos
+
+
+def _emit_insert(out, data):
+    for start in range(0, len(data), MAX_INSERT):
+        piece = data[start:start + MAX_INSERT]
+        out.append(len(piece))
+        out += piece
+
+
+def _emit_copy(out, offset, size):
+    while size:
+        length = min(size, MAX_COPY)
+        command = 0x80
+        args = bytearray()
+        for i in range(4):
+            byte = (offset >> (8 * i)) & 0xff
+            if byte:
+                command |= 1 << i
+                args.append(byte)
+        for i in range(3):
+            byte = (length >> (8 * i)) & 0xff
+            if byte:
+                command |= 0x10 << i
+                args.append(byte)
+        out.append(command)
+        out += args
+        offset += length
+        size -= length
+
+
+def create_delta(base, target):
+    """Encode target as copies from base plus literal inserts"""
+    base = bytes(base)
+    target = bytes(target)
+    out = bytearray(encode_varint(len(base)) + encode_varint(len(target)))
+
+    prefix = _common_prefix(base, target)
+    suffix = _common_suffix(base, target, min(len(base), len(target)) - prefix)
+    if prefix:
+        _emit_copy(out, 0, prefix)
+
+    #the edited middle goes through a block index of the base, looking up every target offset
+    base_end = len(base) - suffix
+    target_end = len(target) - suffix
+    blocks = {}
+    for offset in range(prefix, base_end - BLOCK_SIZE + 1, BLOCK_SIZE):
+        blocks.setdefault(base[offset:offset + BLOCK_SIZE], offset)
+
+    pending_start = prefix
+    pos = prefix
+    while pos + BLOCK_SIZE <= target_end:
+        base_offset = blocks.get(target[pos:pos + BLOCK_SIZE])
+        if base_offset is None:
+            pos += 1
+            continue
+
+        #grow the match backwards into the pending literals, then forwards as far as it goes
+        while pos > pending_start and base_offset > prefix and base[base_offset - 1] == target[pos - 1]:
+            pos -= 1
+            base_offset -= 1
+        length = BLOCK_SIZE + _common_prefix(
+            memoryview(base)[base_offset + BLOCK_SIZE:base_end],
+            memoryview(target)[pos + BLOCK_SIZE:target_end]
+        )
+
+        _emit_insert(out, target[pending_start:pos])
+        _emit_copy(out, base_offset, length)
+        pos += length
+        pending_start = pos
+
+    _emit_insert(out, target[pending_start:target_end])
+    if suffix:
+        _emit_copy(out, len(base) - suffix, suffix)
+    return bytes(out)
+
+
+def apply_delta(base, delta):
+    base_size, pos = decode_varint(delta, 0)
+    result_size, pos = decode_varint(delta, pos)
+    if base_size != len(base):
+        raise ValueError(f"Delta base size mismatch: expected {base_size}, got {len(base)}")
+
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        command = delta[pos]
+        pos += 1
+        if command & 0x80:
+            offset = 0
+            size = 0
+            for i in range(4):
+                if command & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if command & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            if size == 0:
+                size = 0x10000
+            if offset + size > base_size:
+                raise ValueError("Delta copies past the end of its base")
+            out += base[offset:offset + size]
+        elif command:
+            out += delta[pos:pos + command]
+            pos += command
+        else:
+            raise ValueError("Invalid delta opcode 0")
+
+    if len(out) != result_size:
+        raise ValueError(f"Delta result size mismatch: expected {result_size}, got {len(out)}")
+    return bytes(out)
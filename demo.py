@@ -68,7 +68,9 @@ def run_command(cmd, description=""):
     print(f"{Colors.WARNING}$ {cmd}{Colors.ENDC}")
     time.sleep(0.5)  # Quick command preview for video
     
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    # the demo is about showing the internals, so keep the repository logs on
+    env = dict(os.environ, MINIGIT_TRACE=os.environ.get('MINIGIT_TRACE', 'debug'))
+    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, env=env)
     
     if result.stdout:
         # Color the output based on content
@@ -0,0 +1,270 @@
+import bisect
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import select
+import socket
+import struct
+import time
+from logger import get_logger
+
+log = get_logger("FSMonitor")
+
+#A small daemon that watches the working tree with inotify and remembers which paths changed.
+#Clients ask "what changed since <token>" over a Unix socket and get back the paths plus a new token,
+#tokens from another daemon instance, from before a queue overflow or older than the trimmed part of the
+#change log get {"full": true} and the client falls back to scanning everything. Linux only, elsewhere
+#start() fails and status just walks the tree.
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+QUERY_TIMEOUT = 2.0
+#the change log keeps at most this many entries, tokens older than the trimmed ones get a full scan
+MAX_CHANGES = 100000
+
+
+class Inotify:
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        try:
+            self._init = libc.inotify_init1
+            self._add_watch = libc.inotify_add_watch
+        except AttributeError:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"{os.strerror(error)}: {path}")
+        return wd
+
+    def read_events(self):
+        """Yields (wd, mask, name) for everything queued, never blocks"""
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            pos = 0
+            while pos < len(buffer):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, pos)
+                pos += EVENT_HEADER.size
+                name = os.fsdecode(buffer[pos:pos + length].rstrip(b'\0'))
+                pos += length
+                yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FSMonitorDaemon:
+
+    def __init__(self, repo_path, socket_path, ignored_dir=".minigit"):
+        self.repo_path = os.path.abspath(repo_path)
+        self.socket_path = socket_path
+        self.ignored_dir = ignored_dir
+        #tokens are "<instance>:<sequence>", a new daemon never accepts tokens handed out by an old one
+        self.instance = f"{os.getpid()}-{time.time_ns()}"
+        self.sequence = 0
+        self.full_before = 0
+        #the change log, sequence numbers in increasing order and the path each one marked
+        self.change_seqs = []
+        self.change_paths = []
+        self.watches = {}
+        #directories add_watch failed for, while there are any no token is good enough to skip a full scan
+        self.unwatched = set()
+        self.running = False
+        self.inotify = Inotify()
+
+    def _mark(self, rel_path):
+        self.sequence += 1
+        self.change_seqs.append(self.sequence)
+        self.change_paths.append(rel_path)
+        if len(self.change_seqs) > MAX_CHANGES:
+            #drop the older half at once so trimming stays cheap per change
+            cut = len(self.change_seqs) - MAX_CHANGES // 2
+            self.full_before = max(self.full_before, self.change_seqs[cut - 1])
+            del self.change_seqs[:cut]
+            del self.change_paths[:cut]
+
+    def _lose_track(self):
+        #nobody can trust a token from before this point, and nothing logged so far is needed any more
+        self.sequence += 1
+        self.full_before = self.sequence
+        self.change_seqs = []
+        self.change_paths = []
+
+    def _watch_tree(self, rel_dir, report=False):
+        #each directory gets its watch before it is listed, a file created in between is then either in the
+        #listing or reported by inotify. New directories may already hold files, report everything in them
+        pending = [rel_dir]
+        while pending:
+            rel_root = pending.pop()
+            root = os.path.join(self.repo_path, rel_root) if rel_root else self.repo_path
+            try:
+                self.watches[self.inotify.add_watch(root)] = rel_root
+            except FileNotFoundError:
+                #removed again already, the watch on its parent reports that
+                continue
+            except OSError as e:
+                #e.g. ENOSPC at the inotify watch limit, changes below root would go unnoticed from now on
+                log.warning("Cannot watch %s: %s, every query asks for a full scan until restarted", rel_root or ".", e)
+                self.unwatched.add(rel_root)
+                self._lose_track()
+                continue
+            if report:
+                self._mark(rel_root)
+            try:
+                with os.scandir(root) as entries:
+                    for entry in entries:
+                        if rel_root == "" and entry.name == self.ignored_dir:
+                            continue
+                        rel_path = os.path.join(rel_root, entry.name) if rel_root else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(rel_path)
+                        elif report:
+                            self._mark(rel_path)
+            except OSError as e:
+                log.debug("Cannot list %s: %s", rel_root or ".", e)
+
+    def process_events(self):
+        for wd, mask, name in self.inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                #events were dropped
+                log.warning("inotify queue overflowed, next query will ask for a full scan")
+                self._lose_track()
+                continue
+            rel_dir = self.watches.get(wd)
+            if rel_dir is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._mark(rel_dir)
+                continue
+            if rel_dir == "" and name == self.ignored_dir:
+                continue
+
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(rel_path, report=True)
+            else:
+                self._mark(rel_path)
+
+    def query(self, token):
+        self.process_events()
+        response = {'token': f"{self.instance}:{self.sequence}", 'full': True, 'paths': []}
+        instance, _, sequence = (token or "").rpartition(':')
+        if (instance == self.instance and sequence.isdigit() and int(sequence) >= self.full_before
+                and not self.unwatched):
+            since = int(sequence)
+            response['full'] = False
+            start = bisect.bisect_right(self.change_seqs, since)
+            response['paths'] = sorted(set(self.change_paths[start:]))
+        return response
+
+    def _handle(self, connection):
+        with connection:
+            connection.settimeout(QUERY_TIMEOUT)
+            request = json.loads(_read_line(connection) or b'{}')
+            command = request.get('command')
+            if command == 'query':
+                response = self.query(request.get('token'))
+            elif command == 'status':
+                self.process_events()
+                response = {'running': True, 'pid': os.getpid(), 'watches': len(self.watches),
+                            'unwatched': len(self.unwatched), 'changes': len(self.change_seqs)}
+            elif command == 'stop':
+                self.running = False
+                response = {'stopped': True}
+            else:
+                response = {'error': f"unknown command {command!r}"}
+            connection.sendall(json.dumps(response).encode('utf-8') + b'\n')
+
+    def serve_forever(self):
+        self._watch_tree("")
+        log.info("Watching %d directories under %s", len(self.watches), self.repo_path)
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(16)
+        self.running = True
+
+        try:
+            while self.running:
+                readable, _, _ = select.select([server, self.inotify.fd], [], [])
+                if self.inotify.fd in readable:
+                    self.process_events()
+                if server in readable:
+                    connection, _ = server.accept()
+                    try:
+                        self._handle(connection)
+                    except (OSError, ValueError) as e:
+                        log.warning("Bad request: %s", e)
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.inotify.close()
+            log.info("Stopped")
+
+
+def _read_line(connection):
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = connection.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data.strip()
+
+
+def send_command(socket_path, command, **fields):
+    """Send one request to the daemon, returns the decoded response or None if it is not running"""
+    if not os.path.exists(socket_path):
+        return None
+    request = dict(fields, command=command)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(QUERY_TIMEOUT)
+            client.connect(socket_path)
+            client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            return json.loads(_read_line(client) or b'null')
+    except (OSError, ValueError) as e:
+        log.debug("fsmonitor not reachable: %s", e)
+        return None
+
+
+def query_fsmonitor(socket_path, token):
+    """{'token', 'full', 'paths'} for the changes since token, or None without a daemon"""
+    return send_command(socket_path, 'query', token=token)
@@ -0,0 +1,181 @@
+import os
+import re
+from logger import get_logger
+
+log = get_logger("Ignore")
+
+IGNORE_FILE = ".minigitignore"
+
+#.minigitignore follows gitignore: one glob per line, # comments, ! re-includes, a trailing / only matches
+#directories, a pattern with a / in it is relative to the directory of its ignore file, otherwise it matches
+#the name at any depth, ** spans directories. Files deeper in the tree override their parents and within a
+#file the last matching line wins. Consecutive lines with the same kind are compiled into one alternation,
+#so a lookup runs a handful of regexes instead of one per line.
+
+
+def _translate(pattern):
+    """Regex source for a glob relative to its ignore file's directory"""
+    anchored = '/' in pattern
+    if pattern.startswith('/'):
+        pattern = pattern[1:]
+
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i) and i + 2 == n and (i == 0 or pattern[i - 1] == '/'):
+            out.append('.*')
+            i += 2
+        elif c == '*':
+            out.append('[^/]*')
+            i += 1
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern.startswith('[!', i) or pattern.startswith('[^', i) else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body[:1] in ('!', '^'):
+                body = '^' + body[1:]
+            out.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+
+    regex = ''.join(out)
+    return regex if anchored else '(?:.*/)?' + regex
+
+
+def parse_patterns(lines):
+    """(negate, dir_only, regex source) for every pattern line"""
+    patterns = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        #trailing spaces are dropped unless escaped
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line or line.startswith('#'):
+            continue
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        patterns.append((negate, dir_only, _translate(line)))
+    return patterns
+
+
+class IgnoreRules:
+    #the compiled contents of one ignore file
+
+    def __init__(self, patterns):
+        self.groups = []
+        for negate, dir_only, source in patterns:
+            if self.groups and self.groups[-1][0] == negate and self.groups[-1][1] == dir_only:
+                self.groups[-1][2].append(source)
+            else:
+                self.groups.append((negate, dir_only, [source]))
+        self.groups = [
+            (negate, dir_only, re.compile('(?:' + '|'.join(sources) + ')\\Z', re.DOTALL))
+            for negate, dir_only, sources in self.groups
+        ]
+
+    def match(self, rel_path, is_dir):
+        """True if ignored, False if re-included, None if no line applies"""
+        for negate, dir_only, regex in reversed(self.groups):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                return not negate
+        return None
+
+
+class IgnoreMatcher:
+
+    def __init__(self, repo_path, always_ignored=(".minigit",)):
+        self.repo_path = os.path.abspath(repo_path)
+        self.always_ignored = set(always_ignored)
+        self._rules = {}
+        self._ignored_dirs = {}
+
+    def _rules_for(self, rel_dir):
+        rules = self._rules.get(rel_dir, False)
+        if rules is False:
+            rules = None
+            path = os.path.join(self.repo_path, rel_dir, IGNORE_FILE)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    patterns = parse_patterns(f)
+                if patterns:
+                    rules = IgnoreRules(patterns)
+                    log.trace("Loaded %d patterns from %s", len(patterns), os.path.join(rel_dir, IGNORE_FILE))
+            except FileNotFoundError:
+                pass
+            self._rules[rel_dir] = rules
+        return rules
+
+    def _matches(self, rel_path, is_dir):
+        #deepest ignore file first, its answer overrides the ones above it
+        parent = rel_path
+        while parent:
+            parent = os.path.dirname(parent)
+            rules = self._rules_for(parent)
+            if rules is not None:
+                relative = rel_path[len(parent) + 1:] if parent else rel_path
+                result = rules.match(relative, is_dir)
+                if result is not None:
+                    return result
+        return False
+
+    def is_ignored(self, rel_path, is_dir=False):
+        """Whether a repository relative path is ignored, including by an ignored parent directory"""
+        parent = os.path.dirname(rel_path)
+        if parent and self.is_dir_ignored(parent):
+            return True
+        if not parent and rel_path in self.always_ignored:
+            return True
+        return self._matches(rel_path, is_dir)
+
+    def is_dir_ignored(self, rel_dir):
+        ignored = self._ignored_dirs.get(rel_dir)
+        if ignored is None:
+            ignored = self.is_ignored(rel_dir, is_dir=True)
+            self._ignored_dirs[rel_dir] = ignored
+        return ignored
+
+    def prune(self, rel_root, dirs, files):
+        """Drop ignored entries from an os.walk step in place, dirs[:] so the walk never descends into them"""
+        prefix = rel_root + os.sep if rel_root else ""
+        dirs[:] = [name for name in dirs if not self._child_ignored(prefix + name, rel_root, True)]
+        files[:] = [name for name in files if not self._child_ignored(prefix + name, rel_root, False)]
+
+    def _child_ignored(self, rel_path, rel_root, is_dir):
+        #the walk already pruned ignored parents, only this path's own name is left to check
+        if not rel_root and rel_path in self.always_ignored:
+            return True
+        if is_dir:
+            ignored = self._matches(rel_path, True)
+            self._ignored_dirs[rel_path] = ignored
+            return ignored
+        return self._matches(rel_path, False)
+
@@ -0,0 +1,271 @@
+import hashlib
+import os
+import struct
+import tempfile
+from minigit import to_oid
+from logger import get_logger
+
+log = get_logger("Index")
+
+#Binary index, laid out like git's DIRC version 2:
+#  "DIRC" | version u32 | entry count u32 | entries... | sha1 of everything before it
+#  entry = ctime s/ns | mtime s/ns | dev | ino | mode | uid | gid | size (u32 each) | 20 byte id | flags u16 | path
+#          then 1-8 null bytes so the entry length is a multiple of 8
+#Besides the staged files the index caches stat data and the blob id of files it has already hashed, so
+#status only reads files whose stat data changed. Staged entries carry STAGED_FLAG (git's assume-valid bit,
+#which we do not use). The low 12 bits of flags hold the path length like in git.
+
+SIGNATURE = b'DIRC'
+VERSION = 2
+STAGED_FLAG = 0x8000
+NAME_MASK = 0x0fff
+
+ENTRY = struct.Struct('>10I20sH')
+HEADER = struct.Struct('>4sII')
+U32 = 0xffffffff
+
+#The untracked cache lives next to the index in the same shape: header, records, sha1.
+#  record = directory mtime ns u64 | file count u32 | subdirectory count u32 | path \0 | names, each \0 terminated
+#A directory's mtime changes whenever an entry is created, removed or renamed in it, so while it stays the same
+#the names recorded for it are still what it holds and status does not have to list it again. Names are kept
+#before ignore rules are applied, editing a .minigitignore never makes a record wrong.
+UNTRACKED_SIGNATURE = b'UNTR'
+UNTRACKED_VERSION = 1
+DIRECTORY = struct.Struct('>QII')
+
+
+class IndexEntry:
+    __slots__ = ('path', 'oid', 'ctime_ns', 'mtime_ns', 'dev', 'ino', 'mode', 'uid', 'gid', 'size', 'staged')
+
+    def __init__(self, path, oid, ctime_ns=0, mtime_ns=0, dev=0, ino=0, mode=0, uid=0, gid=0, size=0, staged=False):
+        self.path = path
+        self.oid = oid
+        self.ctime_ns = ctime_ns
+        self.mtime_ns = mtime_ns
+        self.dev = dev
+        self.ino = ino
+        self.mode = mode
+        self.uid = uid
+        self.gid = gid
+        self.size = size
+        self.staged = staged
+
+    @classmethod
+    def from_stat(cls, path, oid, st, staged=False):
+        #fields are cut to 32 bits the way git does it, matches compares the cut values
+        return cls(
+            path, to_oid(oid),
+            _ns(st.st_ctime_ns), _ns(st.st_mtime_ns),
+            st.st_dev & U32, st.st_ino & U32, st.st_mode & U32,
+            st.st_uid & U32, st.st_gid & U32, st.st_size & U32,
+            staged
+        )
+
+    @property
+    def hash(self):
+        return self.oid.hex()
+
+    def matches(self, st):
+        return (
+            self.mtime_ns == _ns(st.st_mtime_ns)
+            and self.ctime_ns == _ns(st.st_ctime_ns)
+            and self.size == st.st_size & U32
+            and self.ino == st.st_ino & U32
+            and self.dev == st.st_dev & U32
+            and self.mode == st.st_mode & U32
+        )
+
+
+def _ns(value):
+    #seconds and nanoseconds are stored in separate u32 fields, keep only what survives that
+    return ((value // 1_000_000_000) & U32) * 1_000_000_000 + value % 1_000_000_000
+
+
+class Index:
+
+    def __init__(self):
+        self.entries = {}
+        #mtime of the index file when it was read or written, entries modified at or after it are racy
+        self.mtime_ns = None
+        self.dirty = False
+
+    @classmethod
+    def read(cls, index_file):
+        index = cls()
+        if not os.path.exists(index_file):
+            return index
+
+        with open(index_file, 'rb') as f:
+            data = f.read()
+            index.mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+
+        if data[:4] != SIGNATURE:
+            index._read_text(data)
+            #rewrite in the binary format next time something is saved
+            index.dirty = True
+            return index
+
+        if hashlib.sha1(data[:-20]).digest() != data[-20:]:
+            raise ValueError("Index checksum mismatch")
+        signature, version, count = HEADER.unpack_from(data, 0)
+        if version != VERSION:
+            raise ValueError(f"Unsupported index version {version}")
+
+        pos = HEADER.size
+        for _ in range(count):
+            (ctime_s, ctime_ns, mtime_s, mtime_ns, dev, ino, mode, uid, gid, size,
+             oid, flags) = ENTRY.unpack_from(data, pos)
+            name_start = pos + ENTRY.size
+            name_end = data.index(b'\0', name_start)
+            path = data[name_start:name_end].decode('utf-8')
+            index.entries[path] = IndexEntry(
+                path, oid,
+                ctime_s * 1_000_000_000 + ctime_ns, mtime_s * 1_000_000_000 + mtime_ns,
+                dev, ino, mode, uid, gid, size,
+                bool(flags & STAGED_FLAG)
+            )
+            pos += (ENTRY.size + len(data[name_start:name_end]) + 8) & ~7
+
+        log.trace("Read index with %d entries", len(index.entries))
+        return index
+
+    def _read_text(self, data):
+        #the old format, one "hash path" line per staged file and no stat data
+        for line in data.decode('utf-8').splitlines():
+            line = line.strip()
+            if line and ' ' in line:
+                hash_value, file_path = line.split(' ', 1)
+                self.entries[file_path] = IndexEntry(file_path, to_oid(hash_value), staged=True)
+        log.debug("Read %d entries from a text index", len(self.entries))
+
+    def write(self, index_file):
+        parts = [HEADER.pack(SIGNATURE, VERSION, len(self.entries))]
+        for path in sorted(self.entries):
+            entry = self.entries[path]
+            name = path.encode('utf-8')
+            flags = min(len(name), NAME_MASK) | (STAGED_FLAG if entry.staged else 0)
+            parts.append(ENTRY.pack(
+                entry.ctime_ns // 1_000_000_000, entry.ctime_ns % 1_000_000_000,
+                entry.mtime_ns // 1_000_000_000, entry.mtime_ns % 1_000_000_000,
+                entry.dev, entry.ino, entry.mode, entry.uid, entry.gid, entry.size,
+                entry.oid, flags
+            ))
+            parts.append(name)
+            parts.append(b'\0' * (8 - (ENTRY.size + len(name)) % 8))
+        body = b''.join(parts)
+        _write_checksummed(index_file, body, "tmp_index_")
+
+        self.mtime_ns = os.stat(index_file).st_mtime_ns
+        self.dirty = False
+        log.trace("Wrote index with %d entries", len(self.entries))
+
+    def staged(self):
+        return {path: entry.hash for path, entry in self.entries.items() if entry.staged}
+
+    def is_racy(self, entry):
+        #a file changed in the same timestamp tick the index was written in can look unchanged, hash it again
+        return self.mtime_ns is not None and entry.mtime_ns >= self.mtime_ns
+
+    def cached_hash(self, path, st):
+        """Blob id for path if its stat data still matches what was recorded, else None"""
+        entry = self.entries.get(path)
+        if entry is None or not entry.matches(st) or self.is_racy(entry):
+            return None
+        return entry.hash
+
+    def record(self, path, hash_value, st, staged=False):
+        self.entries[path] = IndexEntry.from_stat(path, hash_value, st, staged)
+        self.dirty = True
+
+
+class UntrackedCache:
+
+    def __init__(self):
+        #{relative directory: (mtime ns, file names, subdirectory names)}, "" is the top of the working tree
+        self.dirs = {}
+        self.mtime_ns = None
+        self.dirty = False
+
+    @classmethod
+    def read(cls, cache_file):
+        """The cache in cache_file, or an empty one if it is missing or damaged"""
+        cache = cls()
+        try:
+            with open(cache_file, 'rb') as f:
+                data = f.read()
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        except FileNotFoundError:
+            return cache
+
+        try:
+            if hashlib.sha1(data[:-20]).digest() != data[-20:]:
+                raise ValueError("checksum mismatch")
+            signature, version, count = HEADER.unpack_from(data, 0)
+            if signature != UNTRACKED_SIGNATURE or version != UNTRACKED_VERSION:
+                raise ValueError(f"unsupported format {signature!r} version {version}")
+            pos = HEADER.size
+            for _ in range(count):
+                dir_mtime_ns, file_count, dir_count = DIRECTORY.unpack_from(data, pos)
+                pos += DIRECTORY.size
+                names = []
+                for _ in range(1 + file_count + dir_count):
+                    end = data.index(b'\0', pos)
+                    names.append(data[pos:end].decode('utf-8'))
+                    pos = end + 1
+                cache.dirs[names[0]] = (dir_mtime_ns, names[1:1 + file_count], names[1 + file_count:])
+        except (ValueError, struct.error) as e:
+            log.debug("Ignoring untracked cache: %s", e)
+            cache.dirs = {}
+            return cache
+
+        cache.mtime_ns = mtime_ns
+        log.trace("Read untracked cache with %d directories", len(cache.dirs))
+        return cache
+
+    def write(self, cache_file):
+        parts = [HEADER.pack(UNTRACKED_SIGNATURE, UNTRACKED_VERSION, len(self.dirs))]
+        for rel_dir in sorted(self.dirs):
+            mtime_ns, files, dirs = self.dirs[rel_dir]
+            parts.append(DIRECTORY.pack(mtime_ns, len(files), len(dirs)))
+            parts.extend(name.encode('utf-8') + b'\0' for name in [rel_dir] + files + dirs)
+        _write_checksummed(cache_file, b''.join(parts), "tmp_untracked_")
+
+        self.mtime_ns = os.stat(cache_file).st_mtime_ns
+        self.dirty = False
+        log.trace("Wrote untracked cache with %d directories", len(self.dirs))
+
+    def lookup(self, rel_dir, mtime_ns):
+        """(file names, subdirectory names) recorded for rel_dir if its mtime is still mtime_ns, else None"""
+        record = self.dirs.get(rel_dir)
+        if record is None or record[0] != mtime_ns:
+            return None
+        #same racy window as the index, a directory changed in the tick the cache was written is listed again
+        if self.mtime_ns is None or mtime_ns >= self.mtime_ns:
+            return None
+        return record[1], record[2]
+
+    def record(self, rel_dir, mtime_ns, files, dirs):
+        record = (mtime_ns, sorted(files), sorted(dirs))
+        if self.dirs.get(rel_dir) != record:
+            self.dirs[rel_dir] = record
+            self.dirty = True
+
+    def retain(self, rel_dirs):
+        """Drop records of directories the last walk did not reach"""
+        for rel_dir in [rel_dir for rel_dir in self.dirs if rel_dir not in rel_dirs]:
+            del self.dirs[rel_dir]
+            self.dirty = True
+
+
+def _write_checksummed(path, body, prefix):
+    #temp file in the same directory plus rename, readers see the old file or the new one, never half of it
+    fd, temp_path = tempfile.mkstemp(prefix=prefix, dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+            f.write(hashlib.sha1(body).digest())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
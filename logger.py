@@ -0,0 +1,92 @@
+import os
+import sys
+
+ERROR = 40
+WARNING = 30
+INFO = 20
+DEBUG = 10
+TRACE = 5
+
+LEVEL_NAMES = {
+    'error': ERROR,
+    'warning': WARNING,
+    'info': INFO,
+    'debug': DEBUG,
+    'trace': TRACE,
+}
+
+_level = INFO
+_loggers = {}
+
+
+def _noop(*args):
+    pass
+
+
+class Logger:
+    #one logger per component, messages come out as "[Tag] message" like the old prints did
+    #levels that are switched off get a no-op bound in place of the method, so a silent log site
+    #costs a single call. Pass %-style args instead of building f-strings so nothing gets formatted
+    #unless the level is actually on.
+
+    def __init__(self, tag):
+        self.tag = tag
+        self._apply(_level)
+
+    def _apply(self, level):
+        self.level = level
+        self.error = self._emit if level <= ERROR else _noop
+        self.warning = self._emit if level <= WARNING else _noop
+        self.info = self._emit if level <= INFO else _noop
+        self.debug = self._emit if level <= DEBUG else _noop
+        self.trace = self._emit if level <= TRACE else _noop
+
+    def is_enabled(self, level):
+        return self.level <= level
+
+    def _emit(self, message, *args):
+        if args:
+            message = message % args
+        print(f"[{self.tag}] {message}", file=sys.stdout)
+
+
+def get_logger(tag):
+    logger = _loggers.get(tag)
+    if logger is None:
+        logger = Logger(tag)
+        _loggers[tag] = logger
+    return logger
+
+
+def set_level(level):
+    global _level
+    _level = level
+    for logger in _loggers.values():
+        logger._apply(level)
+
+
+def get_level():
+    return _level
+
+
+def level_from_verbosity(verbosity):
+    #-v shows what the repository is doing, -vv also traces every object
+    if verbosity >= 2:
+        return TRACE
+    if verbosity == 1:
+        return DEBUG
+    return INFO
+
+
+def level_from_env(value):
+    value = (value or '').strip().lower()
+    if value in ('', '0', 'false', 'no', 'off'):
+        return None
+    if value in LEVEL_NAMES:
+        return LEVEL_NAMES[value]
+    return TRACE
+
+
+env_level = level_from_env(os.environ.get('MINIGIT_TRACE'))
+if env_level is not None:
+    set_level(env_level)
@@ -1,55 +1,95 @@
 import hashlib
 import zlib
 import os
+import tempfile
 from abc import ABC, abstractmethod
+from logger import get_logger
+
+log = get_logger("MinigitObject")
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def to_oid(value):
+    #object ids are kept as 20 raw bytes internally, hex strings are only for the user and the filesystem
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) == 20:
+        return bytes(value)
+    if isinstance(value, str) and len(value) == 40:
+        return bytes.fromhex(value)
+    raise ValueError(f"Invalid object id: {value!r}")
+
+
+def to_hex(value):
+    if value is None or isinstance(value, str):
+        return value
+    return bytes(value).hex()
 
 
 class MinigitObject(ABC):
+    #slots instead of a per instance __dict__, with thousands of objects loaded that overhead adds up
+    __slots__ = ('data', 'oid')
 
     def __init__(self, data=None):
         #This basically initializes the object with the data and sets the hash to None if no data is provided then emotystring
         self.data = data if data is not None else b''
-        self.hash = None
-        print(f"[MinigitObject] Created {self.__class__.__name__} with {len(self.data)} bytes")
+        self.oid = None
+        log.trace("Created %s with %d bytes", self.__class__.__name__, len(self.data))
+
+    @property
+    def hash(self):
+        return self.oid.hex() if self.oid is not None else None
+
+    @hash.setter
+    def hash(self, value):
+        self.oid = to_oid(value) if value else None
     #An abstract method for inherited classes to implement, just syntactic contract clean code stuff
     @abstractmethod
     def get_type(self):
         pass
 
+    def get_size(self):
+        return len(self.data)
+
+    def iter_data_chunks(self):
+        #content in pieces, subclasses that do not keep everything in memory override this
+        yield self.data
+
     def create_header(self):
         #returns a header string of form <type> <size>\0
         obj_type = self.get_type()
-        size = len(self.data)
+        size = self.get_size()
         header = f"{obj_type} {size}\0".encode('utf-8')
-        print(f"[MinigitObject] Created header: '{obj_type} {size}\\0' ({len(header)} bytes)")
+        log.trace("Created header: '%s %d\\0' (%d bytes)", obj_type, size, len(header))
         return header
 
     def get_full_data(self):
         header = self.create_header()
         full_data = header + self.data
-        print(f"[MinigitObject] Full data: {len(full_data)} bytes (header: {len(header)}, content: {len(self.data)})")
+        log.trace("Full data: %d bytes (header: %d, content: %d)", len(full_data), len(header), len(self.data))
         return full_data
 
     def calculate_hash(self):
 
-        full_data = self.get_full_data()
-        sha1_hash = hashlib.sha1(full_data).hexdigest()
-        self.hash = sha1_hash
-        print(f"[MinigitObject] Calculated SHA-1: {sha1_hash}")
+        sha1 = hashlib.sha1(self.create_header())
+        for chunk in self.iter_data_chunks():
+            sha1.update(chunk)
+        self.oid = sha1.digest()
+        sha1_hash = self.oid.hex()
+        log.trace("Calculated SHA-1: %s", sha1_hash)
         return sha1_hash
 
     def compress_data(self):
 
         full_data = self.get_full_data()
         compressed = zlib.compress(full_data)
-        print(f"[MinigitObject] Compressed {len(full_data)} bytes -> {len(compressed)} bytes")
+        log.trace("Compressed %d bytes -> %d bytes", len(full_data), len(compressed))
         return compressed
 
     @staticmethod
     def decompress_data(compressed_data):
 
         decompressed = zlib.decompress(compressed_data)
-        print(f"[MinigitObject] Decompressed {len(compressed_data)} bytes -> {len(decompressed)} bytes")
+        log.trace("Decompressed %d bytes -> %d bytes", len(compressed_data), len(decompressed))
         return decompressed
 
     @staticmethod
@@ -69,7 +109,7 @@ class MinigitObject(ABC):
         obj_type = header_parts[0]
         size = int(header_parts[1])
 
-        print(f"[MinigitObject] Parsed object: type={obj_type}, size={size}, content_len={len(content)}")
+        log.trace("Parsed object: type=%s, size=%d, content_len=%d", obj_type, size, len(content))
 
         if len(content) != size:
             raise ValueError(f"Size mismatch: header says {size}, got {len(content)}")
@@ -84,10 +124,151 @@ class MinigitObject(ABC):
         dir_name = self.hash[:2]
         filename = self.hash[2:]
 
-        print(f"[MinigitObject] Storage path: objects/{dir_name}/{filename}")
+        log.trace("Storage path: objects/%s/%s", dir_name, filename)
         return dir_name, filename
 
 
+def write_object_stream(objects_path, obj_type, size, chunks, is_stored=None):
+    """Hash, compress and store an object in one pass, returns the hex hash
+
+    is_stored(hex hash) says whether the object is already there, by default the object file is checked.
+    """
+    header = f"{obj_type} {size}\0".encode('utf-8')
+    sha1 = hashlib.sha1(header)
+    compressor = zlib.compressobj()
+    written = 0
+
+    #we do not know the final name until the whole object went through sha1, so write to a temp file first
+    fd, temp_path = tempfile.mkstemp(prefix="tmp_obj_", dir=objects_path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(compressor.compress(header))
+            for chunk in chunks:
+                written += len(chunk)
+                sha1.update(chunk)
+                f.write(compressor.compress(chunk))
+            f.write(compressor.flush())
+
+        if written != size:
+            raise ValueError(f"Size mismatch: header says {size}, got {written}")
+
+        hash_value = sha1.hexdigest()
+        object_dir = os.path.join(objects_path, hash_value[:2])
+        object_file = os.path.join(object_dir, hash_value[2:])
+
+        if is_stored(hash_value) if is_stored is not None else os.path.exists(object_file):
+            os.remove(temp_path)
+            log.trace("Object %s already exists", hash_value)
+        else:
+            try:
+                os.replace(temp_path, object_file)
+            except FileNotFoundError:
+                #first object in this fanout directory
+                os.makedirs(object_dir, exist_ok=True)
+                os.replace(temp_path, object_file)
+            log.trace("Streamed %d bytes into %s", written, hash_value)
+        return hash_value
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def iter_file_chunks(file_path, size):
+    """Read a file in STREAM_CHUNK_SIZE pieces, raises ValueError if it is no longer size bytes long"""
+    remaining = size
+    with open(file_path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError(f"File {file_path} shrank while reading")
+            remaining -= len(chunk)
+            yield chunk
+        if f.read(1):
+            raise ValueError(f"File {file_path} grew while reading")
+
+
+def store_file_blob(objects_path, file_path):
+    """Hash a file as a blob and store it unless it is already there, returns (hex hash, stat result)
+
+    Module level so a process pool can run it. Workers only see loose objects, a blob that is
+    already packed gets a loose copy, only repack -d removes it again (gc keeps reachable objects).
+    """
+    st = os.stat(file_path)
+    #hashed while it is compressed, the file is read once
+    hash_value = write_object_stream(objects_path, "blob", st.st_size, iter_file_chunks(file_path, st.st_size))
+    return hash_value, st
+
+
+def inflate_chunks(compressed_chunks):
+    #decompress piece by piece, never producing more than STREAM_CHUNK_SIZE bytes at once
+    decompressor = zlib.decompressobj()
+    for piece in compressed_chunks:
+        while piece and not decompressor.eof:
+            out = decompressor.decompress(piece, STREAM_CHUNK_SIZE)
+            if out:
+                yield out
+            piece = decompressor.unconsumed_tail
+        if decompressor.eof:
+            break
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def _parse_header(header_bytes):
+    header = header_bytes.decode('utf-8')
+    header_parts = header.split(' ')
+    if len(header_parts) != 2:
+        raise ValueError(f"Invalid header format: {header}")
+    return header_parts[0], int(header_parts[1])
+
+
+def read_object_header(compressed_chunks, peek_size=64):
+    """Inflate only as much as needed to parse <type> <size>\\0, returns (type, size)"""
+    decompressor = zlib.decompressobj()
+    buffered = b''
+    for piece in compressed_chunks:
+        while piece and not decompressor.eof:
+            buffered += decompressor.decompress(piece, peek_size)
+            null_index = buffered.find(b'\0')
+            if null_index != -1:
+                return _parse_header(buffered[:null_index])
+            piece = decompressor.unconsumed_tail
+        if decompressor.eof:
+            break
+    raise ValueError("Invalid object data: no null separator found")
+
+
+def open_object_stream(compressed_chunks):
+    """Parse the header of a compressed object, returns (type, size, iterator over content chunks)"""
+    pieces = inflate_chunks(compressed_chunks)
+    buffered = b''
+
+    while b'\0' not in buffered:
+        piece = next(pieces, None)
+        if piece is None:
+            raise ValueError("Invalid object data: no null separator found")
+        buffered += piece
+
+    null_index = buffered.find(b'\0')
+    obj_type, size = _parse_header(buffered[:null_index])
+    first = buffered[null_index + 1:]
+
+    def content():
+        seen = 0
+        if first:
+            seen += len(first)
+            yield first
+        for piece in pieces:
+            seen += len(piece)
+            yield piece
+        if seen != size:
+            raise ValueError(f"Size mismatch: header says {size}, got {seen}")
+
+    log.trace("Opened object stream: type=%s, size=%d", obj_type, size)
+    return obj_type, size, content()
+
 
 if __name__ == "__main__":
     print("Mini-Git: Use 'python -m unittest discover tests' to run tests")
@@ -0,0 +1,352 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from minigit import STREAM_CHUNK_SIZE, inflate_chunks
+from delta import encode_varint, decode_varint, create_delta, apply_delta
+from logger import get_logger
+
+log = get_logger("Pack")
+
+#Pack layout, loosely following git:
+#  .pack  "MPCK" | version u32 | count u32 | entries... | sha1 of everything before it
+#         entry = type byte | content size as a little endian base 128 varint | zlib stream of the content
+#         a delta entry has type REF_DELTA, the size of the object it rebuilds and the 20 byte base id before
+#         its zlib stream, which holds a copy/insert delta against that base (see delta.py)
+#  .idx   "MPIX" | version u32 | fanout 256 x u32 | sorted ids N x 20 | pack offsets N x u64 | pack sha1 | idx sha1
+#The fanout table says how many ids start with a byte <= i, so a lookup only bisects ids sharing the first byte.
+
+PACK_SIGNATURE = b'MPCK'
+INDEX_SIGNATURE = b'MPIX'
+PACK_VERSION = 1
+
+TYPE_CODES = {"commit": 1, "tree": 2, "blob": 3}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+REF_DELTA = 7
+
+#how many recent objects each one is tried against, and how many deltas may stack on top of a full object
+DELTA_WINDOW = 10
+MAX_DELTA_DEPTH = 50
+#like git's core.bigFileThreshold, bigger objects are stored whole
+DELTA_SIZE_LIMIT = 512 * 1024 * 1024
+
+FANOUT_OFFSET = 8
+IDS_OFFSET = FANOUT_OFFSET + 256 * 4
+
+
+class PackIndex:
+
+    def __init__(self, idx_path):
+        self.path = idx_path
+        with open(idx_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] != INDEX_SIGNATURE:
+            raise ValueError(f"Invalid pack index: {idx_path}")
+        self.fanout = struct.unpack_from('>256I', self._map, FANOUT_OFFSET)
+        self.count = self.fanout[255]
+        self._offsets_offset = IDS_OFFSET + self.count * 20
+
+    def __len__(self):
+        return self.count
+
+    def oid_at(self, i):
+        start = IDS_OFFSET + i * 20
+        return self._map[start:start + 20]
+
+    def offset_at(self, i):
+        return struct.unpack_from('>Q', self._map, self._offsets_offset + i * 8)[0]
+
+    def _bounds(self, first_byte):
+        return (self.fanout[first_byte - 1] if first_byte else 0), self.fanout[first_byte]
+
+    def position(self, oid):
+        """Index of oid in the sorted id table, or -1"""
+        lo, hi = self._bounds(oid[0])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self.oid_at(mid)
+            if current < oid:
+                lo = mid + 1
+            elif current > oid:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def lower_bound(self, oid):
+        """Index of the first id >= oid, ids sharing a prefix with oid start here"""
+        lo, hi = self._bounds(oid[0])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.oid_at(mid) < oid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def iter_prefix(self, hex_prefix):
+        """Yields the ids starting with a hex prefix of at least 2 characters"""
+        i = self.lower_bound(bytes.fromhex(hex_prefix.ljust(40, '0')))
+        while i < self.count:
+            oid = self.oid_at(i)
+            if not oid.hex().startswith(hex_prefix):
+                break
+            yield oid
+            i += 1
+
+    def find_offset(self, oid):
+        pos = self.position(oid)
+        return self.offset_at(pos) if pos != -1 else None
+
+    def iter_oids(self):
+        for i in range(self.count):
+            yield self.oid_at(i)
+
+
+class Pack:
+
+    def __init__(self, idx_path):
+        self.index = PackIndex(idx_path)
+        self.pack_path = idx_path[:-len(".idx")] + ".pack"
+        with open(self.pack_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] != PACK_SIGNATURE:
+            raise ValueError(f"Invalid pack file: {self.pack_path}")
+        log.trace("Opened pack %s with %d objects", os.path.basename(self.pack_path), len(self.index))
+
+    def __contains__(self, oid):
+        return self.index.position(oid) != -1
+
+    def _entry_header(self, offset):
+        type_code = self._map[offset]
+        size, data_start = decode_varint(self._map, offset + 1)
+        return type_code, size, data_start
+
+    def _compressed_chunks(self, data_start):
+        #hand zlib windows of the mapping, inflate_chunks stops at the end of the stream
+        view = memoryview(self._map)
+        pos = data_start
+        end = len(self._map) - 20
+        while pos < end:
+            yield view[pos:min(pos + STREAM_CHUNK_SIZE, end)]
+            pos += STREAM_CHUNK_SIZE
+
+    def _inflate(self, data_start):
+        return b''.join(inflate_chunks(self._compressed_chunks(data_start)))
+
+    def _base_offset(self, base_oid):
+        offset = self.index.find_offset(base_oid)
+        if offset is None:
+            raise ValueError(f"Delta base {base_oid.hex()} is not in {os.path.basename(self.pack_path)}")
+        return offset
+
+    def _resolve_type(self, offset):
+        #follows delta bases by their entry headers only, nothing is inflated
+        for _ in range(MAX_DELTA_DEPTH + 1):
+            type_code, size, data_start = self._entry_header(offset)
+            if type_code != REF_DELTA:
+                return TYPE_NAMES[type_code]
+            offset = self._base_offset(bytes(self._map[data_start:data_start + 20]))
+        raise ValueError(f"Delta chain longer than {MAX_DELTA_DEPTH}")
+
+    def _read_content(self, offset):
+        #walk down to the full object, then apply the deltas on the way back up
+        deltas = []
+        while True:
+            type_code, size, data_start = self._entry_header(offset)
+            if type_code != REF_DELTA:
+                break
+            if len(deltas) == MAX_DELTA_DEPTH:
+                raise ValueError(f"Delta chain longer than {MAX_DELTA_DEPTH}")
+            deltas.append(data_start + 20)
+            offset = self._base_offset(bytes(self._map[data_start:data_start + 20]))
+        
+        content = self._inflate(data_start)
+        for delta_start in reversed(deltas):
+            content = apply_delta(content, self._inflate(delta_start))
+        log.trace("Resolved delta chain of %d", len(deltas))
+        return TYPE_NAMES[type_code], content
+
+    def read_header(self, oid):
+        offset = self.index.find_offset(oid)
+        if offset is None:
+            return None
+        type_code, size, data_start = self._entry_header(offset)
+        if type_code == REF_DELTA:
+            return self._resolve_type(offset), size
+        return TYPE_NAMES[type_code], size
+
+    def open_stream(self, oid):
+        """Returns (type, size, chunks) for an object in this pack, or None"""
+        offset = self.index.find_offset(oid)
+        if offset is None:
+            return None
+        type_code, size, data_start = self._entry_header(offset)
+        if type_code == REF_DELTA:
+            obj_type, content = self._read_content(offset)
+            return obj_type, size, self._checked(iter([content]), size)
+        return TYPE_NAMES[type_code], size, self._checked(inflate_chunks(self._compressed_chunks(data_start)), size)
+
+    def verify(self):
+        """Read every object back and check it hashes to its id, raises ValueError on the first bad one"""
+        for oid in self.index.iter_oids():
+            obj_type, size, chunks = self.open_stream(oid)
+            sha1 = hashlib.sha1(f"{obj_type} {size}\0".encode('utf-8'))
+            for chunk in chunks:
+                sha1.update(chunk)
+            if sha1.digest() != oid:
+                raise ValueError(f"{oid.hex()} does not match its content in {os.path.basename(self.pack_path)}")
+        log.trace("Verified %d objects in %s", len(self.index), os.path.basename(self.pack_path))
+
+    def is_delta(self, oid):
+        offset = self.index.find_offset(oid)
+        return offset is not None and self._map[offset] == REF_DELTA
+
+    @staticmethod
+    def _checked(chunks, size):
+        seen = 0
+        for chunk in chunks:
+            seen += len(chunk)
+            yield chunk
+        if seen != size:
+            raise ValueError(f"Size mismatch: pack says {size}, got {seen}")
+
+
+def find_deltas(candidates, load_content, window=DELTA_WINDOW, max_depth=MAX_DELTA_DEPTH):
+    """Pick a delta base for objects that compress well against a similar one
+
+    candidates are (oid, type, path, size) tuples, load_content(oid) returns the full bytes.
+    Returns {oid: (base oid, delta bytes)}, only keeping deltas at most half the object size.
+    """
+    #same sort as git: type, then the file name so revisions of one file sit together, biggest first,
+    #an object is then only compared against the few before it
+    ordered = sorted(
+        (candidate for candidate in candidates if 0 < candidate[3] <= DELTA_SIZE_LIMIT),
+        key=lambda c: (c[1], os.path.basename(c[2]), c[2], -c[3])
+    )
+    recent = []
+    depths = {}
+    deltas = {}
+    
+    for oid, obj_type, path, size in ordered:
+        content = None
+        best = None
+        for base_oid, base_type, base_size, base_content in recent:
+            if base_type != obj_type or depths.get(base_oid, 0) >= max_depth:
+                continue
+            if base_size < size // 2 or base_size > size * 2:
+                continue
+            if content is None:
+                content = load_content(oid)
+            delta = create_delta(base_content, content)
+            if len(delta) <= size // 2 and (best is None or len(delta) < len(best[1])):
+                best = (base_oid, delta)
+        
+        if best is not None:
+            deltas[oid] = best
+            depths[oid] = depths.get(best[0], 0) + 1
+        
+        if window:
+            recent.append((oid, obj_type, size, content if content is not None else load_content(oid)))
+            if len(recent) > window:
+                recent.pop(0)
+    
+    log.debug("Found deltas for %d of %d objects", len(deltas), len(ordered))
+    return deltas
+
+
+def write_pack(pack_dir, objects, deltas=None):
+    """Write (oid, type, size, content chunks) tuples into a new pack, returns the .idx path or None if empty
+
+    Objects listed in deltas ({oid: (base oid, delta)}) are stored as a delta and their chunks are not read.
+    The bases have to be in the same pack.
+    """
+    deltas = deltas or {}
+    os.makedirs(pack_dir, exist_ok=True)
+    fd, temp_pack = tempfile.mkstemp(prefix="tmp_pack_", dir=pack_dir)
+    sha1 = hashlib.sha1()
+    offsets = {}
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            #count is patched in once we know it, the checksum is computed over the final bytes
+            f.write(PACK_SIGNATURE + struct.pack('>II', PACK_VERSION, 0))
+            position = 12
+
+            for oid, obj_type, size, chunks in objects:
+                if oid in offsets:
+                    continue
+                offsets[oid] = position
+                
+                if oid in deltas:
+                    base_oid, delta = deltas[oid]
+                    compressed = zlib.compress(delta)
+                    entry = bytes([REF_DELTA]) + encode_varint(size) + base_oid + compressed
+                    f.write(entry)
+                    position += len(entry)
+                    continue
+                
+                entry_header = bytes([TYPE_CODES[obj_type]]) + encode_varint(size)
+                f.write(entry_header)
+                position += len(entry_header)
+                compressor = zlib.compressobj()
+                for chunk in chunks:
+                    compressed = compressor.compress(chunk)
+                    f.write(compressed)
+                    position += len(compressed)
+                compressed = compressor.flush()
+                f.write(compressed)
+                position += len(compressed)
+
+        if not offsets:
+            os.remove(temp_pack)
+            return None
+
+        with open(temp_pack, 'r+b') as f:
+            f.seek(8)
+            f.write(struct.pack('>I', len(offsets)))
+            f.seek(0)
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha1.update(chunk)
+            pack_checksum = sha1.digest()
+            f.write(pack_checksum)
+
+        name = "pack-" + pack_checksum.hex()
+        pack_path = os.path.join(pack_dir, name + ".pack")
+        idx_path = os.path.join(pack_dir, name + ".idx")
+        os.replace(temp_pack, pack_path)
+        _write_index(idx_path, offsets, pack_checksum)
+        log.debug("Wrote %s with %d objects", name, len(offsets))
+        return idx_path
+    except BaseException:
+        if os.path.exists(temp_pack):
+            os.remove(temp_pack)
+        raise
+
+
+def _write_index(idx_path, offsets, pack_checksum):
+    oids = sorted(offsets)
+    fanout = [0] * 256
+    for oid in oids:
+        fanout[oid[0]] += 1
+    total = 0
+    for i in range(256):
+        total += fanout[i]
+        fanout[i] = total
+
+    parts = [INDEX_SIGNATURE, struct.pack('>I', PACK_VERSION), struct.pack('>256I', *fanout)]
+    parts.extend(oids)
+    parts.append(struct.pack(f'>{len(oids)}Q', *(offsets[oid] for oid in oids)))
+    parts.append(pack_checksum)
+    body = b''.join(parts)
+
+    temp_idx = idx_path + ".tmp"
+    with open(temp_idx, 'wb') as f:
+        f.write(body)
+        f.write(hashlib.sha1(body).digest())
+    os.replace(temp_idx, idx_path)
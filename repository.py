@@ -1,6 +1,16 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import importlib.util
-from minigit import MinigitObject
+from minigit import MinigitObject, STREAM_CHUNK_SIZE, to_oid, to_hex, write_object_stream, open_object_stream, read_object_header, store_file_blob
+from logger import get_logger
+from cache import ObjectCache
+from fsmonitor import query_fsmonitor
+from index import Index, IndexEntry, UntrackedCache
+from ignore import IgnoreMatcher, IGNORE_FILE
+from walker import walk_working_tree
+from commit_graph import CommitGraph
+from pack import Pack, write_pack, find_deltas, DELTA_WINDOW, MAX_DELTA_DEPTH
 
 def load_module(module_name, file_path):
     spec = importlib.util.spec_from_file_location(module_name, file_path)
@@ -14,32 +24,57 @@ tree_module = load_module("tree_object", os.path.join(script_dir, "tree-object.p
 commit_module = load_module("commit_object", os.path.join(script_dir, "commit-object.py"))
 
 Blob = blob_module.Blob
+FileBlob = blob_module.FileBlob
 Tree = tree_module.Tree
 Commit = commit_module.Commit
 
+log = get_logger("Repository")
+
+BLOB_MODE = "100644"
+TREE_MODE = "040000"
+
+#unreachable loose objects younger than this are kept, like git's gc.pruneExpire of 2 weeks,
+#so a concurrent add or commit that has not updated its ref yet does not lose objects
+PRUNE_EXPIRE = 14 * 24 * 60 * 60
+
+#memory for parsed objects kept by load_object, 0 turns the cache off
+OBJECT_CACHE_SIZE = 32 * 1024 * 1024
+
 
 class Repository:
 
-    def __init__(self, repo_path="."):
+    def __init__(self, repo_path=".", cache_size=OBJECT_CACHE_SIZE):
         self.repo_path = os.path.abspath(repo_path)
+        self.object_cache = ObjectCache(cache_size) if cache_size else None
         self.minigit_path = os.path.join(self.repo_path, ".minigit")
         self.objects_path = os.path.join(self.minigit_path, "objects")
+        self.pack_path = os.path.join(self.objects_path, "pack")
+        self._packs = None
+        self.commit_graph_file = os.path.join(self.objects_path, "info", "commit-graph")
+        self._commit_graph = None
+        self._commit_graph_stamp = None
+        self._loose_ids = {}
         self.refs_path = os.path.join(self.minigit_path, "refs")
         self.heads_path = os.path.join(self.refs_path, "heads")
         self.head_file = os.path.join(self.minigit_path, "HEAD")
         self.index_file = os.path.join(self.minigit_path, "index")
+        self._index = None
+        self._index_stamp = None
+        self.untracked_cache_file = os.path.join(self.minigit_path, "untracked-cache")
+        self.fsmonitor_socket = os.path.join(self.minigit_path, "fsmonitor.sock")
+        self.fsmonitor_token_file = os.path.join(self.minigit_path, "fsmonitor-token")
         
-        print(f"[Repository] Initialized repository at {self.repo_path}")
+        log.debug("Initialized repository at %s", self.repo_path)
 
     def exists(self):
         return os.path.exists(self.minigit_path) and os.path.isdir(self.minigit_path)
 
     def create(self):
         if self.exists():
-            print(f"[Repository] Repository already exists at {self.repo_path}")
+            log.debug("Repository already exists at %s", self.repo_path)
             return False
         
-        print(f"[Repository] Creating new repository at {self.repo_path}")
+        log.debug("Creating new repository at %s", self.repo_path)
         
         os.makedirs(self.objects_path, exist_ok=True)
         os.makedirs(self.heads_path, exist_ok=True)
@@ -48,71 +83,159 @@ class Repository:
         with open(self.head_file, 'w') as f:
             f.write("ref: refs/heads/main\n")
         
-        print(f"[Repository] Created .minigit directory structure")
+        log.debug("Created .minigit directory structure")
         return True
 
     def store_object(self, obj):
         if not isinstance(obj, MinigitObject):
             raise ValueError("Object must be a MinigitObject")
         
-        hash_value = obj.calculate_hash()
-        dir_name, filename = obj.get_storage_path_components()
-        
-        object_dir = os.path.join(self.objects_path, dir_name)
-        os.makedirs(object_dir, exist_ok=True)
-        
-        object_file = os.path.join(object_dir, filename)
-        
-        if os.path.exists(object_file):
-            print(f"[Repository] Object {hash_value} already exists")
-            return hash_value
-        
-        compressed_data = obj.compress_data()
+        #content held in memory is cheap to hash, an object we already have is then not compressed again.
+        #A file backed blob would have to be read twice for that, it is hashed while it is written instead
+        if obj.oid is not None or not isinstance(obj, FileBlob):
+            hash_value = obj.hash or obj.calculate_hash()
+            if self.has_object(hash_value):
+                log.trace("Object %s already stored", hash_value)
+                return hash_value
         
-        with open(object_file, 'wb') as f:
-            f.write(compressed_data)
+        hash_value = write_object_stream(
+            self.objects_path, obj.get_type(), obj.get_size(), obj.iter_data_chunks(), is_stored=self.has_object
+        )
+        obj.hash = hash_value
+        self._loose_id_set(hash_value[:2]).add(hash_value[2:])
         
-        print(f"[Repository] Stored object {hash_value} ({len(compressed_data)} bytes)")
+        log.trace("Stored object %s", hash_value)
         return hash_value
 
-    def load_object(self, hash_value):
+    def _loose_id_set(self, dir_name):
+        #names in one fanout directory, read with a single scandir the first time the directory is asked about
+        ids = self._loose_ids.get(dir_name)
+        if ids is None:
+            ids = set()
+            try:
+                with os.scandir(os.path.join(self.objects_path, dir_name)) as it:
+                    for entry in it:
+                        if len(entry.name) == 38:
+                            ids.add(entry.name)
+            except FileNotFoundError:
+                pass
+            self._loose_ids[dir_name] = ids
+        return ids
+
+    def _forget_loose(self, hash_value):
+        ids = self._loose_ids.get(hash_value[:2])
+        if ids is not None:
+            ids.discard(hash_value[2:])
+
+    def has_object(self, hash_value):
+        """Existence check for a full id without touching the filesystem once its fanout directory is known
+
+        Objects written by another process after the directory was scanned are not seen, store_object then
+        renames its identical copy over theirs, which is harmless.
+        """
+        hash_value = to_hex(hash_value)
+        if hash_value[2:] in self._loose_id_set(hash_value[:2]):
+            return True
+        return self._find_pack(hash_value) is not None
+
+    def _object_file(self, hash_value):
+        """Path of the loose object, or None when it is not stored loose"""
+        hash_value = to_hex(hash_value)
         if len(hash_value) != 40:
             raise ValueError("Hash must be 40 characters")
         
-        dir_name = hash_value[:2]
-        filename = hash_value[2:]
-        
-        object_file = os.path.join(self.objects_path, dir_name, filename)
+        object_file = os.path.join(self.objects_path, hash_value[:2], hash_value[2:])
         
         if not os.path.exists(object_file):
-            raise FileNotFoundError(f"Object {hash_value} not found")
+            return None
         
+        return object_file
+
+    def get_packs(self):
+        if self._packs is None:
+            self._packs = []
+            if os.path.isdir(self.pack_path):
+                for name in sorted(os.listdir(self.pack_path)):
+                    if name.endswith(".idx"):
+                        self._packs.append(Pack(os.path.join(self.pack_path, name)))
+            log.trace("Loaded %d packs", len(self._packs))
+        return self._packs
+
+    def _find_pack(self, hash_value):
+        oid = to_oid(hash_value)
+        for pack in self.get_packs():
+            if oid in pack:
+                return pack
+        return None
+
+    def _read_compressed_chunks(self, object_file, chunk_size=STREAM_CHUNK_SIZE):
         with open(object_file, 'rb') as f:
-            compressed_data = f.read()
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def open_object_stream(self, hash_value):
+        """Returns (type, size, chunks) without inflating the whole object up front, takes a hex or binary id"""
+        object_file = self._object_file(hash_value)
+        if object_file is not None:
+            return open_object_stream(self._read_compressed_chunks(object_file))
+        
+        pack = self._find_pack(hash_value)
+        if pack is None:
+            raise FileNotFoundError(f"Object {to_hex(hash_value)} not found")
+        return pack.open_stream(to_oid(hash_value))
+
+    def read_object_header(self, hash_value):
+        """Returns (type, size) by inflating just the first few bytes of the object"""
+        object_file = self._object_file(hash_value)
+        if object_file is not None:
+            obj_type, size = read_object_header(self._read_compressed_chunks(object_file, chunk_size=256))
+        else:
+            pack = self._find_pack(hash_value)
+            if pack is None:
+                raise FileNotFoundError(f"Object {to_hex(hash_value)} not found")
+            obj_type, size = pack.read_header(to_oid(hash_value))
+        log.trace("Read header of %s (type: %s, size: %d)", to_hex(hash_value), obj_type, size)
+        return obj_type, size
+
+    def load_object(self, hash_value):
+        """Load and parse an object, repeated loads of the same id come from the object cache
+
+        Cached objects are shared between callers, treat them as read only.
+        """
+        oid = to_oid(hash_value)
+        if self.object_cache is not None:
+            obj = self.object_cache.get(oid)
+            if obj is not None:
+                log.trace("Cache hit for %s", oid.hex())
+                return obj
         
-        decompressed_data = MinigitObject.decompress_data(compressed_data)
-        obj_type, size, content = MinigitObject.parse_object_data(decompressed_data)
+        hash_value = oid.hex()
+        obj_type, size, chunks = self.open_object_stream(hash_value)
+        content = b''.join(chunks)
         
-        print(f"[Repository] Loaded object {hash_value} (type: {obj_type}, size: {size})")
+        log.trace("Loaded object %s (type: %s, size: %d)", hash_value, obj_type, size)
         
         if obj_type == "blob":
-            blob = Blob(content)
-            blob.hash = hash_value
-            return blob
+            obj = Blob(content)
         elif obj_type == "tree":
-            tree = Tree()
-            tree.data = content
-            tree.parse_tree_data(content)
-            tree.hash = hash_value
-            return tree
+            obj = Tree.from_data(content)
         elif obj_type == "commit":
-            commit = Commit.parse_commit_data(content)
-            commit.hash = hash_value
-            return commit
+            obj = Commit.parse_commit_data(content)
         else:
             raise ValueError(f"Unknown object type: {obj_type}")
+        
+        obj.oid = oid
+        if self.object_cache is not None:
+            self.object_cache.put(oid, obj, size)
+        return obj
 
     def object_exists(self, hash_value):
+        hash_value = to_hex(hash_value)
+        if len(hash_value) == 40:
+            return self.has_object(hash_value)
         dir_name = hash_value[:2]
         filename = hash_value[2:]
         object_file = os.path.join(self.objects_path, dir_name, filename)
@@ -135,10 +258,10 @@ class Repository:
             with open(ref_file, 'r') as f:
                 commit_hash = f.read().strip()
             
-            print(f"[Repository] HEAD points to {ref_path} -> {commit_hash}")
+            log.trace("HEAD points to %s -> %s", ref_path, commit_hash)
             return commit_hash
         else:
-            print(f"[Repository] HEAD points directly to {head_content}")
+            log.trace("HEAD points directly to %s", head_content)
             return head_content
 
     def update_branch(self, branch_name, commit_hash):
@@ -147,7 +270,7 @@ class Repository:
         with open(branch_file, 'w') as f:
             f.write(commit_hash + '\n')
         
-        print(f"[Repository] Updated branch {branch_name} to {commit_hash}")
+        log.debug("Updated branch %s to %s", branch_name, commit_hash)
 
     def get_current_branch(self):
         if not os.path.exists(self.head_file):
@@ -161,25 +284,239 @@ class Repository:
         
         return None
 
-    def list_objects(self):
-        objects = []
-        
+    def iter_objects(self):
+        """Yields every stored object id in hex, loose ones first, each once"""
         if not os.path.exists(self.objects_path):
-            return objects
+            return
         
+        for dir_name in sorted(os.listdir(self.objects_path)):
+            if len(dir_name) != 2 or not os.path.isdir(os.path.join(self.objects_path, dir_name)):
+                continue
+            for filename in self._loose_id_set(dir_name):
+                yield dir_name + filename
+        
+        seen = set()
+        for pack in self.get_packs():
+            for oid in pack.index.iter_oids():
+                hash_value = oid.hex()
+                if hash_value not in seen and hash_value[2:] not in self._loose_id_set(hash_value[:2]):
+                    seen.add(hash_value)
+                    yield hash_value
+
+    def list_objects(self):
+        objects = list(self.iter_objects())
+        log.debug("Found %d objects", len(objects))
+        return objects
+
+    def objects_with_prefix(self, prefix):
+        """Sorted hex ids starting with prefix, only the prefix[:2] fanout directory and pack bucket are read"""
+        prefix = prefix.lower()
+        if len(prefix) < 2 or any(c not in "0123456789abcdef" for c in prefix):
+            return []
+        
+        rest = prefix[2:]
+        matches = {prefix[:2] + filename for filename in self._loose_id_set(prefix[:2]) if filename.startswith(rest)}
+        for pack in self.get_packs():
+            matches.update(oid.hex() for oid in pack.index.iter_prefix(prefix))
+        return sorted(matches)
+
+    def shortest_unique_abbrev(self, hash_value, min_length=4):
+        """Shortest prefix of hash_value (at least min_length) that no other stored object shares"""
+        hash_value = to_hex(hash_value)
+        length = min_length
+        for other in self.objects_with_prefix(hash_value[:min_length]):
+            if other == hash_value:
+                continue
+            common = 0
+            while common < 40 and other[common] == hash_value[common]:
+                common += 1
+            length = max(length, common + 1)
+        return hash_value[:length]
+
+    def list_loose_objects(self):
+        loose = []
+        if not os.path.isdir(self.objects_path):
+            return loose
         for dir_name in os.listdir(self.objects_path):
             dir_path = os.path.join(self.objects_path, dir_name)
-            
-            if not os.path.isdir(dir_path) or len(dir_name) != 2:
+            if len(dir_name) == 2 and os.path.isdir(dir_path):
+                loose.extend(dir_name + filename for filename in os.listdir(dir_path) if len(filename) == 38)
+        return loose
+
+    def ref_tips(self):
+        """Commit hashes every branch and a detached HEAD point at"""
+        tips = []
+        if os.path.isdir(self.heads_path):
+            for branch_name in sorted(os.listdir(self.heads_path)):
+                branch_head = self.get_branch_head(branch_name)
+                if branch_head and branch_head not in tips:
+                    tips.append(branch_head)
+        head = self.get_head()
+        if head and head not in tips:
+            tips.append(head)
+        return tips
+
+    def walk_objects(self, tips=None):
+        """Yields (oid, type, path) once for every commit, tree and blob reachable from tips (default: all refs)"""
+        seen = set()
+        graph = self.commit_graph()
+        pending = [self.commit_graph_position(tip) for tip in (self.ref_tips() if tips is None else tips)]
+        
+        # commit ids, trees and parents come from the commit graph, commit objects are never opened
+        while pending:
+            pos = pending.pop()
+            oid = graph.oid_at(pos)
+            if oid in seen:
                 continue
-            
-            for filename in os.listdir(dir_path):
-                if len(filename) == 38:
-                    hash_value = dir_name + filename
-                    objects.append(hash_value)
+            seen.add(oid)
+            yield oid, "commit", ""
+            parent = graph.parent_at(pos)
+            if parent is not None:
+                pending.append(parent)
+            yield from self._walk_tree(graph.tree_at(pos), "", seen)
+
+    def _walk_tree(self, tree_oid, path, seen):
+        if tree_oid in seen:
+            return
+        seen.add(tree_oid)
+        yield tree_oid, "tree", path
+        
+        for entry in self.load_object(tree_oid).iter_entries():
+            entry_path = path + "/" + entry.name if path else entry.name
+            if entry.mode == TREE_MODE:
+                yield from self._walk_tree(entry.oid, entry_path, seen)
+            elif entry.oid not in seen:
+                seen.add(entry.oid)
+                yield entry.oid, "blob", entry_path
+
+    def repack(self, all_objects=False, delete_loose=False, window=DELTA_WINDOW, depth=MAX_DELTA_DEPTH):
+        """Move loose objects (and with all_objects every packed one too) into a single new pack
+
+        Blobs and trees are stored as deltas against a similar object where that is at most half the size,
+        window and depth bound the candidate search and the delta chains like git's repack options, depth
+        can be at most MAX_DELTA_DEPTH since readers refuse longer chains. The new pack is read back in full
+        before any old pack or loose object is removed.
+        """
+        if depth > MAX_DELTA_DEPTH:
+            raise ValueError(f"Delta depth {depth} is above the maximum of {MAX_DELTA_DEPTH}")
+        
+        loose = self.list_loose_objects()
+        old_packs = self.get_packs() if all_objects else []
+        
+        wanted = [to_oid(hash_value) for hash_value in loose]
+        for pack in old_packs:
+            wanted.extend(pack.index.iter_oids())
+        
+        if not wanted:
+            log.info("Nothing to pack")
+            return None
         
-        print(f"[Repository] Found {len(objects)} objects")
-        return objects
+        wanted = set(wanted)
+        
+        #paths only steer which objects get compared, unreachable ones are still packed
+        paths = {oid: path for oid, obj_type, path in self.walk_objects() if oid in wanted}
+        candidates = []
+        for oid in wanted:
+            obj_type, size = self.read_object_header(oid)
+            if obj_type != "commit":
+                candidates.append((oid, obj_type, paths.get(oid, ""), size))
+        
+        def load_content(oid):
+            return b''.join(self.open_object_stream(oid)[2])
+        
+        deltas = find_deltas(candidates, load_content, window=window, max_depth=depth)
+        
+        def objects():
+            for oid in sorted(wanted):
+                if oid in deltas:
+                    obj_type, size = self.read_object_header(oid)
+                    yield oid, obj_type, size, None
+                else:
+                    obj_type, size, chunks = self.open_object_stream(oid)
+                    yield oid, obj_type, size, chunks
+        
+        existing = {pack.pack_path[:-len(".pack")] for pack in self.get_packs()}
+        idx_path = write_pack(self.pack_path, objects(), deltas)
+        log.debug("Packed %d objects (%d as deltas) into %s", len(wanted), len(deltas), os.path.basename(idx_path))
+        
+        new_pack_base = idx_path[:-len(".idx")]
+        try:
+            Pack(idx_path).verify()
+        except Exception:
+            #nothing has been removed yet, drop the unreadable pack unless it replaced an identical one
+            if new_pack_base not in existing:
+                os.remove(idx_path)
+                os.remove(new_pack_base + ".pack")
+            self._packs = None
+            raise
+        
+        for pack in old_packs:
+            old_base = pack.pack_path[:-len(".pack")]
+            if old_base != new_pack_base:
+                os.remove(old_base + ".idx")
+                os.remove(old_base + ".pack")
+        self._packs = None
+        
+        if delete_loose:
+            for hash_value in loose:
+                os.remove(os.path.join(self.objects_path, hash_value[:2], hash_value[2:]))
+                self._forget_loose(hash_value)
+            for dir_name in {hash_value[:2] for hash_value in loose}:
+                dir_path = os.path.join(self.objects_path, dir_name)
+                if not os.listdir(dir_path):
+                    os.rmdir(dir_path)
+            log.debug("Removed %d loose objects", len(loose))
+        
+        return idx_path
+
+    def gc(self, prune_expire=PRUNE_EXPIRE, now=None):
+        """Delete loose objects nothing refers to that are older than prune_expire seconds
+
+        Reachability starts at every branch, a detached HEAD and the index. Returns the pruned hashes.
+        prune_expire=None keeps everything, 0 prunes regardless of age.
+        """
+        if prune_expire is None:
+            log.info("Pruning disabled, nothing removed")
+            return []
+        
+        now = time.time() if now is None else now
+        cutoff = now - prune_expire
+        
+        #a missing object raises here, better to stop than to prune with half the graph
+        reachable = {oid for oid, obj_type, path in self.walk_objects()}
+        reachable.update(to_oid(hash_value) for hash_value in self.read_index().values())
+        log.debug("Found %d reachable objects", len(reachable))
+        
+        pruned = []
+        for hash_value in self.list_loose_objects():
+            if to_oid(hash_value) in reachable:
+                continue
+            object_file = os.path.join(self.objects_path, hash_value[:2], hash_value[2:])
+            if os.stat(object_file).st_mtime > cutoff:
+                log.trace("Keeping recent unreachable object %s", hash_value)
+                continue
+            os.remove(object_file)
+            self._forget_loose(hash_value)
+            pruned.append(hash_value)
+            log.trace("Pruned %s", hash_value)
+        
+        for dir_name in {hash_value[:2] for hash_value in pruned}:
+            dir_path = os.path.join(self.objects_path, dir_name)
+            if not os.listdir(dir_path):
+                os.rmdir(dir_path)
+        
+        #leftovers of interrupted writes
+        for directory in (self.objects_path, self.pack_path, os.path.dirname(self.commit_graph_file)):
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                temp_path = os.path.join(directory, name)
+                if name.startswith(("tmp_obj_", "tmp_pack_", "tmp_graph_")) and os.stat(temp_path).st_mtime <= cutoff:
+                    os.remove(temp_path)
+                    log.trace("Removed stale temp file %s", name)
+        
+        log.debug("Pruned %d unreachable objects", len(pruned))
+        return pruned
 
     def get_working_directory(self):
         return self.repo_path
@@ -192,44 +529,49 @@ class Repository:
             return short_hash if self.object_exists(short_hash) else None
         
         if len(short_hash) < 4:
-            print(f"[Repository] Hash too short: {short_hash} (minimum 4 characters)")
+            log.error("Hash too short: %s (minimum 4 characters)", short_hash)
             return None
         
-        matching_hashes = []
-        all_objects = self.list_objects()
-        
-        for obj_hash in all_objects:
-            if obj_hash.startswith(short_hash):
-                matching_hashes.append(obj_hash)
+        matching_hashes = self.objects_with_prefix(short_hash)
         
         if len(matching_hashes) == 0:
-            print(f"[Repository] No objects found matching: {short_hash}")
+            log.error("No objects found matching: %s", short_hash)
             return None
         elif len(matching_hashes) == 1:
-            print(f"[Repository] Resolved {short_hash} -> {matching_hashes[0]}")
+            log.debug("Resolved %s -> %s", short_hash, matching_hashes[0])
             return matching_hashes[0]
         else:
-            print(f"[Repository] Ambiguous hash {short_hash}, matches:")
+            log.error("Ambiguous hash %s, matches:", short_hash)
             for match in matching_hashes[:5]:
-                print(f"[Repository]   {match}")
+                log.error("  %s", match)
             if len(matching_hashes) > 5:
-                print(f"[Repository]   ... and {len(matching_hashes) - 5} more")
+                log.error("  ... and %d more", len(matching_hashes) - 5)
             return None
 
-    def get_working_files(self):
-        working_files = []
-        minigit_dir = os.path.basename(self.minigit_path)
-        
-        for root, dirs, files in os.walk(self.repo_path):
-            if minigit_dir in dirs:
-                dirs.remove(minigit_dir)
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, self.repo_path)
-                working_files.append(rel_path)
-        
-        return working_files
+    def ignore_matcher(self):
+        """Matcher for the .minigitignore files in the working tree, they are read lazily as the walk reaches them"""
+        return IgnoreMatcher(self.repo_path, always_ignored=(os.path.basename(self.minigit_path),))
+
+    def scan_working_tree(self, top="", untracked_cache=None, jobs=None):
+        """Sorted [(rel_path, stat)] for the files under top that are not ignored, listed on a thread pool
+
+        With an UntrackedCache, directories whose mtime has not changed since they were recorded are
+        only stat'ed, their names come from the cache instead of listing them again.
+        """
+        return walk_working_tree(self.repo_path, self.ignore_matcher(), top, untracked_cache, jobs)
+
+    def get_working_files(self, untracked_cache=None):
+        return [rel_path for rel_path, st in self.scan_working_tree(untracked_cache=untracked_cache)]
+
+    def load_untracked_cache(self):
+        return UntrackedCache.read(self.untracked_cache_file)
+
+    def save_untracked_cache(self, untracked_cache):
+        if untracked_cache.dirty and self.exists():
+            try:
+                untracked_cache.write(self.untracked_cache_file)
+            except Exception as e:
+                log.error("Error writing untracked cache: %s", e)
 
     def get_head_commit(self):
         head_hash = self.get_head()
@@ -258,88 +600,322 @@ class Repository:
             return "deleted"
         
         try:
-            with open(full_path, 'rb') as f:
-                content = f.read()
-            
-            # Use the already loaded Blob class from module imports
-            blob = Blob(content)
-            current_hash = blob.calculate_hash()
+            current_hash = self.hash_working_file(file_path)
             
             head_tree = self.get_head_tree()
             if head_tree is None:
                 return "untracked"
             
-            for entry in head_tree.entries:
-                if entry['name'] == file_path:
-                    if entry['hash'] == current_hash:
-                        return "unmodified"
-                    else:
-                        return "modified"
+            entry = self.lookup_path(head_tree, file_path)
+            if entry is None:
+                return "untracked"
             
-            return "untracked"
+            if entry.hash == current_hash:
+                return "unmodified"
+            else:
+                return "modified"
             
         except Exception:
             return "error"
 
-    def read_index(self):
-        if not os.path.exists(self.index_file):
-            return {}
-        
+    def _index_file_stamp(self):
         try:
-            index = {}
-            with open(self.index_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and ' ' in line:
-                        hash_value, file_path = line.split(' ', 1)
-                        index[file_path] = hash_value
-            print(f"[Repository] Read index with {len(index)} entries")
-            return index
-        except Exception as e:
-            print(f"[Repository] Error reading index: {e}")
-            return {}
+            st = os.stat(self.index_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def load_index(self):
+        """The parsed index, read again only when the file changed since we last saw it"""
+        stamp = self._index_file_stamp()
+        if self._index is None or stamp != self._index_stamp:
+            try:
+                self._index = Index.read(self.index_file)
+            except Exception as e:
+                log.error("Error reading index: %s", e)
+                self._index = Index()
+            self._index_stamp = stamp
+        return self._index
+
+    def save_index(self, index):
+        index.write(self.index_file)
+        self._index = index
+        self._index_stamp = self._index_file_stamp()
+
+    def flush_index(self):
+        """Write back stat data picked up while hashing working files, if there is any
+
+        Returns False if the write failed, True when it succeeded or there was nothing to write.
+        """
+        if self._index is not None and self._index.dirty and self.exists():
+            try:
+                self.save_index(self._index)
+            except Exception as e:
+                log.error("Error writing index: %s", e)
+                return False
+        return True
+
+    def read_index(self):
+        """Staged files as {path: blob hash}"""
+        index = self.load_index().staged()
+        log.trace("Read index with %d staged entries", len(index))
+        return index
 
     def write_index(self, index):
+        """Replace the staged files with {path: blob hash}, unstaged files keep their cached stat data"""
         try:
-            with open(self.index_file, 'w') as f:
-                for file_path, hash_value in sorted(index.items()):
-                    f.write(f"{hash_value} {file_path}\n")
-            print(f"[Repository] Wrote index with {len(index)} entries")
+            current = self.load_index()
+            for path, entry in list(current.entries.items()):
+                if path not in index and entry.staged:
+                    # the entry stays as stat cache, unless there is nothing left to cache
+                    if not entry.mtime_ns or not os.path.isfile(os.path.join(self.repo_path, path)):
+                        del current.entries[path]
+                    else:
+                        entry.staged = False
+            for path, hash_value in index.items():
+                entry = current.entries.get(path)
+                if entry is not None and entry.hash == hash_value:
+                    entry.staged = True
+                else:
+                    current.entries[path] = IndexEntry(path, to_oid(hash_value), staged=True)
+            self.save_index(current)
+            log.debug("Wrote index with %d entries", len(index))
         except Exception as e:
-            print(f"[Repository] Error writing index: {e}")
+            log.error("Error writing index: %s", e)
+
+    def hash_working_file(self, file_path, st=None):
+        """Blob hash of a working file, read from the index when its stat data has not changed"""
+        full_path = os.path.join(self.repo_path, file_path)
+        if st is None:
+            st = os.stat(full_path)
+        index = self.load_index()
+        
+        hash_value = index.cached_hash(file_path, st)
+        if hash_value is not None:
+            return hash_value
+        
+        blob = Blob.from_file_stream(full_path)
+        hash_value = blob.calculate_hash()
+        entry = index.entries.get(file_path)
+        if entry is None or not entry.staged:
+            index.record(file_path, hash_value, blob.stat)
+        elif entry.hash == hash_value:
+            index.record(file_path, hash_value, blob.stat, staged=True)
+        log.trace("Hashed %s -> %s", file_path, hash_value)
+        return hash_value
 
     def add_to_index(self, file_path):
         full_path = os.path.join(self.repo_path, file_path)
         
         if not os.path.exists(full_path):
-            print(f"[Repository] File not found: {file_path}")
+            log.warning("File not found: %s", file_path)
             return None
         
         if os.path.isdir(full_path):
-            print(f"[Repository] Cannot add directory: {file_path}")
+            log.warning("Cannot add directory: %s", file_path)
             return None
         
         try:
-            blob = Blob.from_file(full_path)
-            hash_value = self.store_object(blob)
+            index = self.load_index()
+            st = os.stat(full_path)
+            hash_value = index.cached_hash(file_path, st)
+            
+            if hash_value is None or not self.has_object(hash_value):
+                blob = Blob.from_file_stream(full_path)
+                hash_value = self.store_object(blob)
+                st = blob.stat
             
-            index = self.read_index()
-            index[file_path] = hash_value
-            self.write_index(index)
+            index.record(file_path, hash_value, st, staged=True)
+            self.save_index(index)
             
-            print(f"[Repository] Added {file_path} to index (hash: {hash_value[:8]})")
+            log.debug("Added %s to index (hash: %s)", file_path, hash_value[:8])
             return hash_value
             
         except Exception as e:
-            print(f"[Repository] Error adding {file_path}: {e}")
+            log.error("Error adding %s: %s", file_path, e)
             return None
 
+    def _expand_pathspecs(self, paths, failed, tracked=()):
+        """{path: stat} for the repository relative files under the given files and directories
+
+        Ignored files are left out unless they are tracked, naming an ignored untracked path fails.
+        Stat data is None for files that were not found by walking a directory.
+        """
+        minigit_dir = os.path.basename(self.minigit_path)
+        matcher = self.ignore_matcher()
+        files = {}
+        
+        for path in paths:
+            rel_path = os.path.normpath(path)
+            if rel_path == "." or rel_path == "":
+                rel_path = ""
+            if rel_path == ".." or rel_path.startswith(".." + os.sep) or os.path.isabs(rel_path):
+                failed.append((path, "File is outside repository"))
+                continue
+            if rel_path.split(os.sep)[0] == minigit_dir:
+                failed.append((path, "Cannot add files inside .minigit"))
+                continue
+            
+            full_path = os.path.join(self.repo_path, rel_path) if rel_path else self.repo_path
+            if os.path.isfile(full_path):
+                if rel_path not in tracked and matcher.is_ignored(rel_path):
+                    failed.append((path, "Path is ignored by .minigitignore"))
+                    continue
+                files.setdefault(rel_path, None)
+            elif os.path.isdir(full_path):
+                prefix = rel_path + os.sep if rel_path else ""
+                inside = [
+                    file_path for file_path in tracked
+                    if file_path.startswith(prefix) and os.path.isfile(os.path.join(self.repo_path, file_path))
+                ]
+                if rel_path and matcher.is_ignored(rel_path, is_dir=True):
+                    if not inside:
+                        failed.append((path, "Path is ignored by .minigitignore"))
+                else:
+                    files.update(walk_working_tree(self.repo_path, matcher, rel_path))
+                # tracked files stay tracked inside ignored directories
+                for file_path in inside:
+                    files.setdefault(file_path, None)
+            else:
+                failed.append((path, "File not found"))
+        
+        return files
+
+    def _store_working_file(self, file_path):
+        blob = Blob.from_file_stream(os.path.join(self.repo_path, file_path))
+        return self.store_object(blob), blob.stat
+
+    def _store_working_files(self, file_paths, jobs=None, use_processes=False):
+        """Hash and store files on a pool, returns (hash, stat) or the exception per file, in input order
+
+        sha1 and zlib release the GIL on large buffers so threads already spread over cores,
+        use_processes hands whole files to worker processes instead.
+        """
+        jobs = jobs if jobs and jobs > 0 else os.cpu_count() or 1
+        
+        def collect(futures):
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except (OSError, ValueError) as e:
+                    results.append(e)
+            return results
+        
+        if jobs == 1 or len(file_paths) < 2:
+            results = []
+            for file_path in file_paths:
+                try:
+                    results.append(self._store_working_file(file_path))
+                except (OSError, ValueError) as e:
+                    results.append(e)
+            return results
+        
+        log.debug("Hashing %d files with %d %s", len(file_paths), jobs, "processes" if use_processes else "threads")
+        if use_processes:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                return collect([
+                    pool.submit(store_file_blob, self.objects_path, os.path.join(self.repo_path, file_path))
+                    for file_path in file_paths
+                ])
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return collect([pool.submit(self._store_working_file, file_path) for file_path in file_paths])
+
+    def add_paths(self, paths, update_only=False, jobs=None, use_processes=False):
+        """Stage files and whole directories with one index read and one atomic index write
+
+        update_only stages only files the last commit or the index already track (add -u). Files that
+        match the last commit and are not staged are skipped. Deleted files cannot be staged, commits
+        only add or replace files. Files the stat cache cannot vouch for are hashed and stored on jobs
+        workers (see _store_working_files), the index is updated in sorted path order either way.
+        Returns (added [(path, hash)], failed [(path, reason)]).
+        """
+        failed = []
+        found = {}
+        index = self.load_index()
+        head_tree = self.get_head_tree()
+        committed = self.flatten_tree(head_tree.hash) if head_tree is not None else {}
+        
+        if update_only:
+            tracked = set(committed) | set(index.staged())
+            prefixes = [os.path.normpath(path) for path in paths] or ["."]
+            if "." in prefixes:
+                candidates = sorted(tracked)
+            else:
+                candidates = sorted(
+                    path for path in tracked
+                    if any(path == prefix or path.startswith(prefix + os.sep) for prefix in prefixes)
+                )
+            changed, new_token = self.monitored_changes()
+            if changed is None:
+                candidates = [path for path in candidates if os.path.isfile(os.path.join(self.repo_path, path))]
+            else:
+                working = self._working_files_from_changes(index, changed, tracked)
+                candidates = [path for path in candidates if path in working]
+        else:
+            changed = None
+            found = self._expand_pathspecs(paths, failed, committed.keys() | index.staged().keys())
+            candidates = sorted(found)
+        
+        stored = {}
+        to_store = []
+        for file_path in candidates:
+            entry = index.entries.get(file_path)
+            if (changed is not None and file_path not in changed and entry is not None and not entry.staged
+                    and self.has_object(entry.hash)):
+                # fsmonitor saw no change since this entry was refreshed, and status only hashes files so
+                # the blob may not be stored yet, then it goes through to_store like any other file
+                stored[file_path] = (entry.hash, None)
+                continue
+            try:
+                st = found.get(file_path) or os.stat(os.path.join(self.repo_path, file_path))
+            except OSError as e:
+                failed.append((file_path, str(e)))
+                continue
+            hash_value = index.cached_hash(file_path, st)
+            if hash_value is not None and self.has_object(hash_value):
+                stored[file_path] = (hash_value, st)
+            else:
+                to_store.append(file_path)
+        
+        for file_path, result in zip(to_store, self._store_working_files(to_store, jobs, use_processes)):
+            if isinstance(result, Exception):
+                log.error("Error adding %s: %s", file_path, result)
+                failed.append((file_path, str(result)))
+            else:
+                stored[file_path] = result
+                if use_processes:
+                    self._loose_id_set(result[0][:2]).add(result[0][2:])
+        
+        added = []
+        for file_path in candidates:
+            if file_path not in stored:
+                continue
+            hash_value, st = stored[file_path]
+            entry = index.entries.get(file_path)
+            if committed.get(file_path) == hash_value and (entry is None or not entry.staged):
+                # unchanged since the last commit, only refresh the stat cache
+                if st is not None:
+                    index.record(file_path, hash_value, st)
+                continue
+            
+            if st is None:
+                entry.staged = True
+                index.dirty = True
+            else:
+                index.record(file_path, hash_value, st, staged=True)
+            added.append((file_path, hash_value))
+        
+        self.save_index(index)
+        log.debug("Staged %d of %d files", len(added), len(candidates))
+        return added, failed
+
     def get_staged_files(self):
         return self.read_index()
 
     def is_staged(self, file_path):
-        index = self.read_index()
-        return file_path in index
+        entry = self.load_index().entries.get(file_path)
+        return entry is not None and entry.staged
 
     def get_file_status_detailed(self, file_path):
         full_path = os.path.join(self.repo_path, file_path)
@@ -350,23 +926,18 @@ class Repository:
             return "deleted"
         
         try:
-            with open(full_path, 'rb') as f:
-                content = f.read()
-            
-            blob = Blob(content)
-            current_hash = blob.calculate_hash()
+            current_hash = self.hash_working_file(file_path)
             
-            index = self.read_index()
-            staged_hash = index.get(file_path)
+            entry = self.load_index().entries.get(file_path)
+            staged_hash = entry.hash if entry is not None and entry.staged else None
             
             head_tree = self.get_head_tree()
             committed_hash = None
             
             if head_tree:
-                for entry in head_tree.entries:
-                    if entry['name'] == file_path:
-                        committed_hash = entry['hash']
-                        break
+                entry = self.lookup_path(head_tree, file_path)
+                if entry is not None:
+                    committed_hash = entry.hash
             
             if staged_hash:
                 if staged_hash == current_hash:
@@ -388,67 +959,346 @@ class Repository:
         except Exception:
             return "error"
 
+    def monitored_changes(self):
+        """(changed paths, new token) from the fsmonitor daemon since the saved token
+
+        changed is None when there is no daemon, no saved token or the daemon lost track, the caller has
+        to look at every file then. new_token is None without a daemon.
+        """
+        token = None
+        if os.path.exists(self.fsmonitor_token_file):
+            with open(self.fsmonitor_token_file, 'r') as f:
+                token = f.read().strip() or None
+        
+        response = query_fsmonitor(self.fsmonitor_socket, token)
+        if response is None:
+            return None, None
+        if response['full'] or token is None:
+            log.debug("fsmonitor asks for a full scan")
+            return None, response['token']
+        if any(os.path.basename(path) == IGNORE_FILE for path in response['paths']):
+            # what is ignored may have changed anywhere below that file
+            log.debug("An ignore file changed, scanning everything")
+            return None, response['token']
+        log.debug("fsmonitor reports %d changed paths", len(response['paths']))
+        return set(response['paths']), response['token']
+
+    def save_fsmonitor_token(self, token):
+        with open(self.fsmonitor_token_file, 'w') as f:
+            f.write(token + '\n')
+
+    def _working_files_from_changes(self, index, changed, tracked=()):
+        """Working files derived from the index plus the reported changes, without walking the tree
+
+        The unstaged index entries are the files the last status saw. Directories in changed are walked
+        and their files are added to changed, so callers re-check all of them. Ignored paths that are
+        not tracked are left out.
+        """
+        matcher = self.ignore_matcher()
+        working = {path for path, entry in index.entries.items() if not entry.staged}
+        working.update(
+            path for path, entry in index.entries.items()
+            if entry.staged and os.path.isfile(os.path.join(self.repo_path, path))
+        )
+        
+        removed = []
+        for path in list(changed):
+            full_path = os.path.join(self.repo_path, path)
+            if os.path.isfile(full_path):
+                if path in tracked or not matcher.is_ignored(path):
+                    working.add(path)
+            elif os.path.isdir(full_path):
+                if matcher.is_ignored(path, is_dir=True):
+                    continue
+                for file_path, st in walk_working_tree(self.repo_path, matcher, path):
+                    working.add(file_path)
+                    changed.add(file_path)
+            else:
+                working.discard(path)
+                removed.append(path + os.sep)
+        
+        if removed:
+            removed = tuple(removed)
+            working = {path for path in working if not path.startswith(removed)}
+        return working
+
+    def compute_status(self):
+        """Status of every working, committed and staged file in one pass
+
+        Loads the index and the flattened HEAD tree once, then walks the sorted union of working,
+        committed and staged paths. Returns a dict of sorted path lists: staged, modified, deleted,
+        untracked and unmodified. A file staged and then changed again is in both staged and modified.
+        """
+        index = self.load_index()
+        head_tree = self.get_head_tree()
+        committed = self.flatten_tree(head_tree.hash) if head_tree is not None else {}
+        staged = index.staged()
+        
+        # with the fsmonitor daemon only the paths it saw change are looked at
+        changed, new_token = self.monitored_changes()
+        stats = {}
+        if changed is None:
+            untracked_cache = self.load_untracked_cache()
+            stats = dict(self.scan_working_tree(untracked_cache=untracked_cache))
+            working = set(stats)
+            self.save_untracked_cache(untracked_cache)
+            # the walk skips ignored directories, files in them that are tracked still count
+            working.update(
+                path for path in committed.keys() | staged.keys()
+                if path not in working and os.path.isfile(os.path.join(self.repo_path, path))
+            )
+        else:
+            working = self._working_files_from_changes(index, changed, committed.keys() | staged.keys())
+        
+        status = {'staged': [], 'modified': [], 'deleted': [], 'untracked': [], 'unmodified': []}
+        
+        for file_path in sorted(working | committed.keys() | staged.keys()):
+            staged_hash = staged.get(file_path)
+            committed_hash = committed.get(file_path)
+            
+            if file_path not in working:
+                if staged_hash:
+                    status['staged'].append(file_path)
+                status['deleted'].append(file_path)
+                continue
+            
+            entry = index.entries.get(file_path)
+            if changed is not None and file_path not in changed and entry is not None and not entry.staged:
+                current_hash = entry.hash
+            else:
+                try:
+                    current_hash = self.hash_working_file(file_path, stats.get(file_path))
+                except (OSError, ValueError) as e:
+                    log.error("Error reading %s: %s", file_path, e)
+                    continue
+            
+            if staged_hash:
+                if staged_hash != current_hash:
+                    status['staged'].append(file_path)
+                    status['modified'].append(file_path)
+                elif committed_hash == current_hash:
+                    status['unmodified'].append(file_path)
+                else:
+                    status['staged'].append(file_path)
+            elif committed_hash:
+                status['unmodified' if committed_hash == current_hash else 'modified'].append(file_path)
+            else:
+                status['untracked'].append(file_path)
+        
+        # cache entries of files that are gone are no use to anyone
+        for file_path in [path for path, entry in index.entries.items() if not entry.staged and path not in working]:
+            del index.entries[file_path]
+            index.dirty = True
+        # only once the index holds everything seen up to the token, otherwise the next status would
+        # trust stat data that never reached the disk
+        if self.flush_index() and new_token is not None:
+            self.save_fsmonitor_token(new_token)
+        
+        log.debug("Status: %s", ", ".join(f"{len(paths)} {name}" for name, paths in status.items()))
+        return status
+
     def create_commit(self, message, author=None):
         staged_files = self.get_staged_files()
         
         if not staged_files:
-            print("[Repository] No files staged for commit")
+            log.warning("No files staged for commit")
             return None
         
-        print(f"[Repository] Creating commit with {len(staged_files)} staged files")
+        log.debug("Creating commit with %d staged files", len(staged_files))
         
-        # Build complete tree: staged files + unchanged files from parent
-        all_files = {}
-        
-        # First, get all files from parent commit (if exists)
+        # Start from the parent's root tree and only rewrite the directories that have staged changes,
+        # every other subtree keeps its existing hash
+        parent_tree_oid = None
         parent_hash = self.get_head()
         if parent_hash:
             try:
                 parent_commit = self.load_object(parent_hash)
                 if parent_commit.get_type() == "commit":
-                    parent_tree = self.load_object(parent_commit.tree_hash)
-                    # Add all files from parent tree
-                    for entry in parent_tree.entries:
-                        all_files[entry['name']] = entry['hash']
-                    print(f"[Repository] Inherited {len(parent_tree.entries)} files from parent commit")
+                    parent_tree_oid = parent_commit.tree_oid
             except Exception as e:
-                print(f"[Repository] Warning: Could not load parent commit: {e}")
-        
-        # override with staged files (new/modified files) so that I can see the changes, this works for some reason 
-        all_files.update(staged_files)
+                log.warning("Warning: Could not load parent commit: %s", e)
         
-        tree = Tree()
-        for file_path, hash_value in all_files.items():
-            tree.add_entry("100644", file_path, hash_value)
+        changes = dict(staged_files)
+        if parent_tree_oid and self._is_flat_tree(parent_tree_oid):
+            # older commits stored one flat tree with slashes in the names, rebuild those as real subtrees once
+            inherited = self.flatten_tree(parent_tree_oid)
+            log.debug("Inherited %d files from flat parent tree", len(inherited))
+            inherited.update(changes)
+            changes = inherited
+            parent_tree_oid = None
         
-        tree_hash = self.store_object(tree)
-        print(f"[Repository] Created tree {tree_hash[:8]} with {len(all_files)} total entries ({len(staged_files)} staged)")
+        tree_oid = self._write_tree_changes(parent_tree_oid, changes)
+        log.debug("Created tree %s (%d staged)", tree_oid.hex()[:8], len(staged_files))
         
         parent_hash = self.get_head()
         
         commit = Commit(
-            tree_hash=tree_hash,
+            tree_hash=tree_oid,
             parent_hash=parent_hash,
             author=author,
             message=message
         )
         
         commit_hash = self.store_object(commit)
-        print(f"[Repository] Created commit {commit_hash[:8]}")
+        log.debug("Created commit %s", commit_hash[:8])
+        
+        try:
+            if parent_hash:
+                self.commit_graph_position(parent_hash)
+            self.commit_graph().append([
+                (to_oid(commit_hash), commit.tree_oid, commit.parent_oid, commit.committer_timestamp)
+            ])
+            self._commit_graph_stamp = self._commit_graph_file_stamp()
+        except Exception as e:
+            # the graph is only a cache, the next history walk adds what is missing
+            log.warning("Could not update commit graph: %s", e)
         
         current_branch = self.get_current_branch()
         if current_branch:
             self.update_branch(current_branch, commit_hash)
-            print(f"[Repository] Updated branch {current_branch} -> {commit_hash[:8]}")
+            log.debug("Updated branch %s -> %s", current_branch, commit_hash[:8])
         else:
             self.update_head(commit_hash)
-            print(f"[Repository] Updated HEAD -> {commit_hash[:8]}")
+            log.debug("Updated HEAD -> %s", commit_hash[:8])
         
         self.write_index({})
-        print("[Repository] Cleared staging area")
+        log.debug("Cleared staging area")
         
         return commit_hash
 
+    def _write_tree_changes(self, tree_oid, changes):
+        """Apply {relative path: blob hash} to the tree and store the trees on the changed paths, returns the new tree id"""
+        entries = self._tree_entry_map(tree_oid)
+        
+        subdir_changes = {}
+        for path, hash_value in changes.items():
+            name, sep, rest = path.partition('/')
+            if sep:
+                subdir_changes.setdefault(name, {})[rest] = hash_value
+            else:
+                entries[name] = (BLOB_MODE, to_oid(hash_value))
+        
+        for name, sub_changes in subdir_changes.items():
+            existing = entries.get(name)
+            existing_oid = existing[1] if existing and existing[0] == TREE_MODE else None
+            entries[name] = (TREE_MODE, self._write_tree_changes(existing_oid, sub_changes))
+        
+        tree = Tree.from_entries((mode, name, oid) for name, (mode, oid) in entries.items())
+        self.store_object(tree)
+        return tree.oid
+
+    def _is_flat_tree(self, tree_oid):
+        return any('/' in entry.name for entry in self.load_object(tree_oid).iter_entries())
+
+    def _tree_entry_map(self, tree_oid):
+        if not tree_oid:
+            return {}
+        return {entry.name: (entry.mode, entry.oid) for entry in self.load_object(tree_oid).iter_entries()}
+
+    def iter_tree_files(self, tree_hash, prefix=""):
+        """Yields (path, mode, blob hash) for every file below the tree, depth first"""
+        for entry in self.load_object(tree_hash).iter_entries():
+            path = prefix + entry.name
+            if entry.mode == TREE_MODE:
+                yield from self.iter_tree_files(entry.oid, path + "/")
+            else:
+                yield path, entry.mode, entry.hash
+
+    def flatten_tree(self, tree_hash):
+        return {path: hash_value for path, mode, hash_value in self.iter_tree_files(tree_hash)}
+
+    def lookup_path(self, tree, path):
+        """Walks the subtrees for a slash separated path, returns the entry or None"""
+        name, sep, rest = path.partition('/')
+        entry = tree.lookup(name)
+        if entry is None:
+            # flat trees from older commits keep the whole path as one name
+            return tree.lookup(path) if sep else None
+        if not sep:
+            return entry
+        if entry.mode != TREE_MODE:
+            return None
+        return self.lookup_path(self.load_object(entry.oid), rest)
+
+    def diff_trees(self, old_hash, new_hash, prefix=""):
+        """Yields (path, old blob hash, new blob hash) for files that differ, skipping subtrees with equal ids"""
+        old_oid = to_oid(old_hash) if old_hash else None
+        new_oid = to_oid(new_hash) if new_hash else None
+        if old_oid == new_oid:
+            return
+        
+        old_entries = self._tree_entry_map(old_oid)
+        new_entries = self._tree_entry_map(new_oid)
+        
+        for name in sorted(old_entries.keys() | new_entries.keys()):
+            old = old_entries.get(name)
+            new = new_entries.get(name)
+            if old == new:
+                continue
+            
+            path = prefix + name
+            old_is_tree = old is not None and old[0] == TREE_MODE
+            new_is_tree = new is not None and new[0] == TREE_MODE
+            
+            if old_is_tree or new_is_tree:
+                yield from self.diff_trees(old[1] if old_is_tree else None, new[1] if new_is_tree else None, path + "/")
+                if old is not None and not old_is_tree:
+                    yield path, old[1].hex(), None
+                if new is not None and not new_is_tree:
+                    yield path, None, new[1].hex()
+            else:
+                yield path, old[1].hex() if old else None, new[1].hex() if new else None
+
+    def _commit_graph_file_stamp(self):
+        try:
+            st = os.stat(self.commit_graph_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def commit_graph(self):
+        """The commit graph, opened again only when the file changed since we last saw it"""
+        stamp = self._commit_graph_file_stamp()
+        if self._commit_graph is None or stamp != self._commit_graph_stamp:
+            self._commit_graph = CommitGraph(self.commit_graph_file)
+            self._commit_graph_stamp = stamp
+        return self._commit_graph
+
+    def commit_graph_position(self, commit_hash):
+        """Row of a commit in the commit graph
+
+        Commits made before the graph existed are added on first use, together with the ancestors the
+        graph does not have yet, so their objects are read once and never again.
+        """
+        graph = self.commit_graph()
+        oid = to_oid(commit_hash)
+        pos = graph.position(oid)
+        if pos is not None:
+            return pos
+        
+        missing = []
+        while oid is not None and graph.position(oid) is None:
+            commit = self.load_object(oid)
+            if commit.get_type() != "commit":
+                raise ValueError(f"{oid.hex()} is not a commit")
+            missing.append((oid, commit.tree_oid, commit.parent_oid, commit.committer_timestamp))
+            oid = commit.parent_oid
+        
+        missing.reverse()
+        positions = graph.append(missing)
+        self._commit_graph_stamp = self._commit_graph_file_stamp()
+        return positions[-1]
+
+    def _graph_ancestry(self, start_hash, max_commits=None):
+        """Hashes from start_hash back through its parents, read from the commit graph"""
+        graph = self.commit_graph()
+        history = []
+        for pos in graph.iter_ancestry(self.commit_graph_position(start_hash)):
+            if max_commits is not None and len(history) >= max_commits:
+                break
+            history.append(graph.oid_at(pos).hex())
+        return history
+
     def get_commit_history(self, start_hash=None, max_commits=None):
         if start_hash is None:
             start_hash = self.get_head()
@@ -456,22 +1306,19 @@ class Repository:
         if start_hash is None:
             return []
         
-        history = []
-        current_hash = start_hash
-        count = 0
+        try:
+            hashes = self._graph_ancestry(start_hash, max_commits)
+        except Exception as e:
+            log.error("Error loading commit %s: %s", start_hash, e)
+            return []
         
-        while current_hash and (max_commits is None or count < max_commits):
+        # the walk itself only reads the graph, the commits are loaded for what callers print
+        history = []
+        for current_hash in hashes:
             try:
-                commit = self.load_object(current_hash)
-                if commit.get_type() != "commit":
-                    break
-                
-                history.append((current_hash, commit))
-                current_hash = commit.parent_hash
-                count += 1
-                
+                history.append((current_hash, self.load_object(current_hash)))
             except Exception as e:
-                print(f"[Repository] Error loading commit {current_hash}: {e}")
+                log.error("Error loading commit %s: %s", current_hash, e)
                 break
         
         return history
@@ -493,23 +1340,11 @@ class Repository:
         if not branch_head:
             return []
         
-        history = []
-        current_hash = branch_head
-        
-        while current_hash:
-            try:
-                commit = self.load_object(current_hash)
-                if commit.get_type() != "commit":
-                    break
-                    
-                history.append(current_hash)
-                current_hash = commit.parent_hash
-                
-            except Exception as e:
-                print(f"[Repository] Error loading commit {current_hash}: {e}")
-                break
-        
-        return history
+        try:
+            return self._graph_ancestry(branch_head)
+        except Exception as e:
+            log.error("Error loading commit %s: %s", branch_head, e)
+            return []
 
     def get_current_commit_position(self):
         """Get current commit and its position in the chain"""
@@ -528,46 +1363,48 @@ class Repository:
         """Simple commit switching - overwrites working directory with commit state"""
         full_hash = self.resolve_hash(target_hash)
         if not full_hash:
-            print(f"[Repository] Error: Could not resolve hash {target_hash}")
+            log.error("Error: Could not resolve hash %s", target_hash)
             return False
 
         try:
             # Load commit and tree
             commit = self.load_object(full_hash)
             if commit.get_type() != "commit":
-                print(f"[Repository] Error: {target_hash} is not a commit")
+                log.error("Error: %s is not a commit", target_hash)
                 return False
 
             tree = self.load_object(commit.tree_hash)
-            print(f"[Repository] Moving to commit {full_hash[:8]}: {commit.message}")
+            log.info("Moving to commit %s: %s", full_hash[:8], commit.message)
             
-            # Simple approach: remove tracked files and restore from tree
-            self._restore_commit_state(tree)
+            current_commit = self.get_head_commit()
+            current_tree_hash = current_commit.tree_hash if current_commit is not None else None
+            
+            self._restore_commit_state(tree, current_tree_hash)
             
             # Update HEAD directly
             with open(self.head_file, 'w') as f:
                 f.write(full_hash)
-            print(f"[Repository] Updated HEAD to {full_hash[:8]}")
+            log.debug("Updated HEAD to %s", full_hash[:8])
             
             # Clear staging
             self.write_index({})
             
-            print(f"[Repository] ✅ Now at {full_hash[:8]}")
+            log.info("✅ Now at %s", full_hash[:8])
             return True
             
         except Exception as e:
-            print(f"[Repository] Error moving to commit: {e}")
+            log.error("Error moving to commit: %s", e)
             return False
 
     def move_up(self):
         """Move to newer commit (child of current)"""
         current_hash, position = self.get_current_commit_position()
         if current_hash is None:
-            print("[Repository] No commits found")
+            log.warning("No commits found")
             return False
             
         if position == 0:
-            print("[Repository] Already at the newest commit")
+            log.info("Already at the newest commit")
             return False
             
         chain = self.get_commit_chain()
@@ -578,58 +1415,75 @@ class Repository:
         """Move to older commit (parent of current)"""
         current_hash, position = self.get_current_commit_position()
         if current_hash is None:
-            print("[Repository] No commits found")
+            log.warning("No commits found")
             return False
             
         chain = self.get_commit_chain()
         if position >= len(chain) - 1:
-            print("[Repository] Already at the oldest commit")
+            log.info("Already at the oldest commit")
             return False
             
         older_hash = chain[position + 1]
         return self.move_to_commit(older_hash)
 
-    def _restore_commit_state(self, tree):
+    def _restore_commit_state(self, tree, current_tree_hash=None):
         """Restore working directory to match tree state"""
-        current_files = set()
-        for root, dirs, files in os.walk(self.repo_path):
-            # Skip .minigit
-            if '.minigit' in dirs:
-                dirs.remove('.minigit')
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
+        if current_tree_hash:
+            # only touch files that differ between the two commits, identical subtrees are skipped whole
+            changes = list(self.diff_trees(current_tree_hash, tree.hash))
+            for file_path, old_hash, new_hash in changes:
+                if new_hash is None:
+                    self._remove_working_file(file_path)
+            for file_path, old_hash, new_hash in changes:
+                if new_hash is not None:
+                    self._restore_working_file(file_path, new_hash)
+            return
+        
+        # .minigit and ignored paths are never removed, neither are dot files or anything under a dot directory
+        current_files = {
+            rel_path for rel_path, st in self.scan_working_tree()
+            if not rel_path.endswith('.pyc') and not any(part.startswith('.') for part in rel_path.split(os.sep))
+        }
+        
+        tree_files = self.flatten_tree(tree.hash)
+        
+        for file_path in current_files - tree_files.keys():
+            self._remove_working_file(file_path)
+        
+        for file_path, hash_value in tree_files.items():
+            self._restore_working_file(file_path, hash_value)
+
+    def _remove_working_file(self, file_path):
+        full_path = os.path.join(self.repo_path, file_path)
+        try:
+            os.remove(full_path)
+            log.debug("Removed: %s", file_path)
+            # drop directories that became empty so a file can take their place
+            parent = os.path.dirname(full_path)
+            while parent != self.repo_path and not os.listdir(parent):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+        except Exception as e:
+            log.warning("Warning: Could not remove %s: %s", file_path, e)
+
+    def _restore_working_file(self, file_path, hash_value):
+        try:
+            obj_type, size, chunks = self.open_object_stream(hash_value)
+            if obj_type != "blob":
+                raise ValueError(f"{hash_value} is a {obj_type}, not a blob")
             
-            for file in files:
-                if not file.startswith('.') and not file.endswith('.pyc'):
-                    rel_path = os.path.relpath(os.path.join(root, file), self.repo_path)
-                    current_files.add(rel_path)
-        
-        tree_files = {entry['name'] for entry in tree.entries}
-        
-        for file_path in current_files - tree_files:
             full_path = os.path.join(self.repo_path, file_path)
-            try:
-                os.remove(full_path)
-                print(f"[Repository] Removed: {file_path}")
-            except Exception as e:
-                print(f"[Repository] Warning: Could not remove {file_path}: {e}")
-        
-        for entry in tree.entries:
-            file_path = entry['name']
-            hash_value = entry['hash']
             
-            try:
-                blob = self.load_object(hash_value)
-                full_path = os.path.join(self.repo_path, file_path)
-                
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                
-                with open(full_path, 'wb') as f:
-                    f.write(blob.data)
-                
-                print(f"[Repository] Restored: {file_path}")
-                
-            except Exception as e:
-                print(f"[Repository] Error restoring {file_path}: {e}")
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            
+            with open(full_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            
+            log.debug("Restored: %s", file_path)
+            
+        except Exception as e:
+            log.error("Error restoring %s: %s", file_path, e)
 
     @classmethod
     def find_repository(cls, start_path="."):
@@ -638,7 +1492,7 @@ class Repository:
         while True:
             repo = cls(current_path)
             if repo.exists():
-                print(f"[Repository] Found repository at {current_path}")
+                log.debug("Found repository at %s", current_path)
                 return repo
             
             parent_path = os.path.dirname(current_path)
@@ -646,5 +1500,5 @@ class Repository:
                 break
             current_path = parent_path
         
-        print(f"[Repository] No repository found starting from {start_path}")
+        log.debug("No repository found starting from %s", start_path)
         return None
@@ -34,6 +34,13 @@ class TestBlob(unittest.TestCase):
         self.assertEqual(len(hash_value), 40)
         self.assertEqual(hash_value, "b6fc4c620b67d95f953a5c1c1230aaab5db5a1b0")
 
+    def test_blob_uses_slots(self):
+        blob = Blob("hello")
+        
+        self.assertFalse(hasattr(blob, '__dict__'))
+        with self.assertRaises(AttributeError):
+            blob.unexpected = 1
+
     def test_blob_from_file(self):
         with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
             test_content = "This is a test file content"
@@ -47,6 +54,35 @@ class TestBlob(unittest.TestCase):
             
             os.unlink(f.name)
 
+    def test_blob_from_file_stream_matches_from_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(os.urandom(200 * 1024))
+        
+        try:
+            streamed = Blob.from_file_stream(f.name)
+            loaded = Blob.from_file(f.name)
+            
+            self.assertEqual(streamed.get_size(), 200 * 1024)
+            self.assertGreater(len(list(streamed.iter_data_chunks())), 1)
+            self.assertEqual(streamed.calculate_hash(), loaded.calculate_hash())
+            self.assertEqual(streamed.data, loaded.data)
+        finally:
+            os.unlink(f.name)
+
+    def test_blob_from_file_stream_detects_size_change(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b"original content")
+        
+        try:
+            blob = Blob.from_file_stream(f.name)
+            with open(f.name, 'wb') as changed:
+                changed.write(b"short")
+            
+            with self.assertRaises(ValueError):
+                blob.calculate_hash()
+        finally:
+            os.unlink(f.name)
+
     def test_blob_save_to_file(self):
         original_data = b"Test content for saving"
         blob = Blob(original_data)
@@ -0,0 +1,52 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import ObjectCache, ENTRY_OVERHEAD
+
+
+class TestObjectCache(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        cache = ObjectCache(10000)
+        
+        self.assertIsNone(cache.get(b"a" * 20))
+        cache.put(b"a" * 20, "object a", 10)
+        
+        self.assertEqual(cache.get(b"a" * 20), "object a")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = ObjectCache(3 * (100 + ENTRY_OVERHEAD))
+        for name in (b"a", b"b", b"c"):
+            cache.put(name * 20, name, 100)
+        
+        cache.get(b"a" * 20)
+        cache.put(b"d" * 20, b"d", 100)
+        
+        self.assertIsNone(cache.get(b"b" * 20))
+        self.assertEqual(cache.get(b"a" * 20), b"a")
+        self.assertEqual(cache.get(b"d" * 20), b"d")
+        self.assertLessEqual(cache.current_bytes, cache.max_bytes)
+
+    def test_objects_over_budget_are_not_cached(self):
+        cache = ObjectCache(1000)
+        cache.put(b"a" * 20, "small", 10)
+        cache.put(b"b" * 20, "huge", 5000)
+        
+        self.assertIsNone(cache.get(b"b" * 20))
+        self.assertEqual(cache.get(b"a" * 20), "small")
+
+    def test_replacing_an_entry_keeps_the_byte_count(self):
+        cache = ObjectCache(10000)
+        cache.put(b"a" * 20, "first", 100)
+        cache.put(b"a" * 20, "second", 300)
+        
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.current_bytes, 300 + ENTRY_OVERHEAD)
+        self.assertEqual(cache.stats()['entries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -153,5 +153,123 @@ class TestCLI(unittest.TestCase):
         self.assertNotEqual(exit_code, 0)
 
 
+    def test_cat_file_streams_blob_content(self):
+        self.run_cli(["init"])
+        with open(os.path.join(self.test_dir, "hello.txt"), 'w') as f:
+            f.write("hello from a blob\n")
+        self.run_cli(["add", "hello.txt"])
+        
+        # "hello from a blob\n" hashed as a blob
+        exit_code, stdout, stderr = self.run_cli(["cat-file", "-p", "6a1eb180"])
+        
+        self.assertEqual(exit_code, 0)
+        self.assertIn("Object type: blob", stdout)
+        self.assertTrue(stdout.endswith("hello from a blob\n"))
+
+
+    def test_cat_file_type_and_size(self):
+        self.run_cli(["init"])
+        with open(os.path.join(self.test_dir, "hello.txt"), 'w') as f:
+            f.write("hello from a blob\n")
+        self.run_cli(["add", "hello.txt"])
+        
+        exit_code, stdout, stderr = self.run_cli(["cat-file", "-t", "6a1eb180"])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout.strip().splitlines()[-1], "blob")
+        
+        exit_code, stdout, stderr = self.run_cli(["cat-file", "-s", "6a1eb180"])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout.strip().splitlines()[-1], "18")
+
+
+    def test_add_directory_and_update(self):
+        self.run_cli(["init"])
+        os.makedirs(os.path.join(self.test_dir, "src", "lib"))
+        for rel_path in ("top.txt", "src/a.py", "src/lib/b.py"):
+            with open(os.path.join(self.test_dir, rel_path), 'w') as f:
+                f.write(rel_path)
+        
+        exit_code, stdout, stderr = self.run_cli(["add", "src"])
+        self.assertEqual(exit_code, 0)
+        self.assertIn("Added: src/a.py", stdout)
+        self.assertIn("Added: src/lib/b.py", stdout)
+        self.assertNotIn("top.txt", stdout)
+        
+        self.run_cli(["add", "."])
+        self.run_cli(["commit", "-m", "first"])
+        with open(os.path.join(self.test_dir, "src", "a.py"), 'w') as f:
+            f.write("changed")
+        with open(os.path.join(self.test_dir, "new.txt"), 'w') as f:
+            f.write("untracked")
+        
+        exit_code, stdout, stderr = self.run_cli(["add", "-u"])
+        self.assertEqual(exit_code, 0)
+        self.assertIn("Added: src/a.py", stdout)
+        self.assertNotIn("new.txt", stdout)
+        self.assertNotIn("top.txt", stdout)
+
+
+    def test_status_reports_deleted_files(self):
+        self.run_cli(["init"])
+        for name in ("keep.txt", "gone.txt"):
+            with open(os.path.join(self.test_dir, name), 'w') as f:
+                f.write(name)
+        self.run_cli(["add", "."])
+        self.run_cli(["commit", "-m", "first"])
+        os.remove(os.path.join(self.test_dir, "gone.txt"))
+        
+        exit_code, stdout, stderr = self.run_cli(["status"])
+        
+        self.assertEqual(exit_code, 0)
+        self.assertIn("deleted:  gone.txt", stdout)
+        self.assertNotIn("keep.txt", stdout.split("Changes not staged for commit:")[1])
+        self.assertIn("1 deleted", stdout)
+
+
+    def test_repack_reports_objects_written(self):
+        self.run_cli(["init"])
+        with open(os.path.join(self.test_dir, "a.txt"), 'w') as f:
+            f.write("a")
+        self.run_cli(["add", "a.txt"])
+        self.run_cli(["commit", "-m", "first"])
+        
+        returncode, stdout, stderr = self.run_cli(["repack", "-d"])
+        self.assertEqual(returncode, 0)
+        self.assertIn("Packed 3 object(s)", stdout)
+        self.assertIn("Removed 3 loose object(s)", stdout)
+        
+        with open(os.path.join(self.test_dir, "b.txt"), 'w') as f:
+            f.write("b")
+        self.run_cli(["add", "b.txt"])
+        
+        # the new blob is the only loose object, -a packs it together with the 3 packed ones
+        returncode, stdout, stderr = self.run_cli(["repack", "-a"])
+        self.assertEqual(returncode, 0)
+        self.assertIn("Packed 4 object(s)", stdout)
+
+    def test_repack_rejects_depth_above_maximum(self):
+        self.run_cli(["init"])
+        with open(os.path.join(self.test_dir, "a.txt"), 'w') as f:
+            f.write("a")
+        self.run_cli(["add", "a.txt"])
+        
+        returncode, stdout, stderr = self.run_cli(["repack", "-d", "--depth", "100"])
+        self.assertNotEqual(returncode, 0)
+        self.assertIn("depth must be between 0 and 50", stderr)
+        self.assertTrue(os.listdir(os.path.join(self.test_dir, ".minigit", "objects")))
+
+    def test_internal_logs_hidden_by_default(self):
+        exit_code, stdout, stderr = self.run_cli(["init"])
+        
+        self.assertEqual(exit_code, 0)
+        self.assertNotIn("[Repository]", stdout)
+
+    def test_verbose_flag_shows_internal_logs(self):
+        exit_code, stdout, stderr = self.run_cli(["init", "-v"])
+        
+        self.assertEqual(exit_code, 0)
+        self.assertIn("[Repository] Creating new repository", stdout)
+
+
 if __name__ == '__main__':
     unittest.main()
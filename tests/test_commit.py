@@ -134,6 +134,56 @@ class TestCommit(unittest.TestCase):
         self.assertTrue(parsed.is_initial_commit())
         self.assertEqual(parsed.message, original.message)
 
+    def test_parse_keeps_raw_data_and_timestamps(self):
+        raw = (
+            "tree " + "a" * 40 + "\n"
+            "parent " + "b" * 40 + "\n"
+            "author Test Author <test@example.com> 1700000000 +0530\n"
+            "committer Other Person <other@example.com> 1700000100 -0800\n"
+            "\n"
+            "Old commit\nwith two lines"
+        ).encode('utf-8')
+        
+        parsed = Commit.parse_commit_data(raw)
+        
+        self.assertIs(parsed.data, raw)
+        self.assertEqual(parsed.author, "Test Author <test@example.com>")
+        self.assertEqual(parsed.timestamp, 1700000000)
+        self.assertEqual(parsed.timezone, "+0530")
+        self.assertEqual(parsed.committer, "Other Person <other@example.com>")
+        self.assertEqual(parsed.committer_timestamp, 1700000100)
+        self.assertEqual(parsed.committer_timezone, "-0800")
+        self.assertEqual(parsed.message, "Old commit\nwith two lines")
+
+    def test_parse_round_trip_hash(self):
+        original = Commit(
+            tree_hash="a" * 40,
+            author="Test Author <test@example.com>",
+            message="Round trip"
+        )
+        original.timestamp = 1600000000
+        original.committer_timestamp = 1600000000
+        original._build_commit_data()
+        
+        parsed = Commit.parse_commit_data(original.data)
+        
+        self.assertEqual(parsed.timestamp, 1600000000)
+        self.assertEqual(parsed.calculate_hash(), original.calculate_hash())
+
+    def test_format_date(self):
+        commit = Commit.parse_commit_data(
+            b"tree " + b"a" * 40 + b"\nauthor A <a@b.c> 0 +0530\ncommitter A <a@b.c> 0 +0530\n\nmsg"
+        )
+        
+        self.assertEqual(commit.format_date(), "Thu Jan 01 05:30:00 1970 +0530")
+
+    def test_commit_stores_binary_ids(self):
+        commit = Commit(tree_hash="a" * 40, parent_hash="b" * 40, message="ids")
+        
+        self.assertEqual(commit.tree_oid, b"\xaa" * 20)
+        self.assertEqual(commit.parent_oid, b"\xbb" * 20)
+        self.assertFalse(hasattr(commit, '__dict__'))
+
     def test_get_commit_info(self):
         tree_hash = "a" * 40
         parent_hash = "b" * 40
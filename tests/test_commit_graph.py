@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from commit_graph import CommitGraph, HEADER, ROW
+
+
+def oid(n):
+    return bytes([n]) * 20
+
+
+class TestCommitGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "info", "commit-graph")
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_append_and_read_back(self):
+        graph = CommitGraph(self.path)
+        self.assertEqual(len(graph), 0)
+        
+        positions = graph.append([(oid(1), oid(101), None, 1000), (oid(2), oid(102), oid(1), 2000)])
+        reopened = CommitGraph(self.path)
+        
+        self.assertEqual(positions, [0, 1])
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.row(0), (oid(1), oid(101), None, 1000, 1))
+        self.assertEqual(reopened.row(1), (oid(2), oid(102), 0, 2000, 2))
+        self.assertEqual(reopened.position(oid(2)), 1)
+        self.assertIsNone(reopened.position(oid(3)))
+        self.assertEqual(reopened.tree_at(1), oid(102))
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + 2 * ROW.size)
+
+    def test_incremental_append_keeps_existing_rows(self):
+        graph = CommitGraph(self.path)
+        graph.append([(oid(1), oid(101), None, 1000)])
+        
+        positions = CommitGraph(self.path).append([(oid(1), oid(101), None, 1000), (oid(2), oid(102), oid(1), 2000)])
+        graph = CommitGraph(self.path)
+        graph.append([(oid(3), oid(103), oid(2), 3000)])
+        
+        self.assertEqual(positions, [0, 1])
+        self.assertEqual(list(CommitGraph(self.path).iter_ancestry(2)), [2, 1, 0])
+        self.assertEqual(graph.generation_at(2), 3)
+        self.assertEqual(graph.oid_at(graph.parent_at(2)), oid(2))
+
+    def test_parent_must_be_known(self):
+        graph = CommitGraph(self.path)
+        
+        with self.assertRaises(ValueError):
+            graph.append([(oid(2), oid(102), oid(1), 2000)])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_rows_past_the_count_are_overwritten(self):
+        graph = CommitGraph(self.path)
+        graph.append([(oid(1), oid(101), None, 1000)])
+        # an append that died before writing the new count
+        with open(self.path, 'ab') as f:
+            f.write(ROW.pack(oid(9), oid(109), 0, 9000, 2))
+        
+        graph = CommitGraph(self.path)
+        self.assertEqual(len(graph), 1)
+        self.assertIsNone(graph.position(oid(9)))
+        graph.append([(oid(2), oid(102), oid(1), 2000)])
+        
+        self.assertEqual(CommitGraph(self.path).row(1)[0], oid(2))
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + 2 * ROW.size)
+
+    def test_damaged_file_is_rewritten(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(b"garbage")
+        
+        graph = CommitGraph(self.path)
+        self.assertEqual(len(graph), 0)
+        graph.append([(oid(1), oid(101), None, 1000)])
+        
+        self.assertEqual(CommitGraph(self.path).position(oid(1)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
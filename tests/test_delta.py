@@ -0,0 +1,49 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delta import create_delta, apply_delta
+
+
+class TestDelta(unittest.TestCase):
+
+    def round_trip(self, base, target):
+        delta = create_delta(base, target)
+        self.assertEqual(apply_delta(base, delta), target)
+        return delta
+
+    def test_identical_content(self):
+        content = b"line\n" * 1000
+        delta = self.round_trip(content, content)
+        self.assertLess(len(delta), 20)
+
+    def test_small_edit_in_large_file(self):
+        base = b"".join(f"setting_{i} = {i}\n".encode('utf-8') for i in range(20000))
+        target = base.replace(b"setting_500 = 500", b"setting_500 = changed").replace(b"setting_19000 =", b"renamed =")
+        delta = self.round_trip(base, target)
+        self.assertLess(len(delta), 200)
+
+    def test_moved_blocks(self):
+        first = os.urandom(4096)
+        second = os.urandom(4096)
+        delta = self.round_trip(first + second, second + b"inserted" + first)
+        self.assertLess(len(delta), 100)
+
+    def test_unrelated_and_empty_content(self):
+        self.round_trip(os.urandom(500), os.urandom(700))
+        self.round_trip(b"", b"new content")
+        self.round_trip(b"old content", b"")
+
+    def test_large_copies_are_split(self):
+        base = os.urandom(17 * 1024 * 1024)
+        self.round_trip(base, base + b"tail")
+
+    def test_wrong_base_is_rejected(self):
+        delta = create_delta(b"base content", b"base content plus")
+        with self.assertRaises(ValueError):
+            apply_delta(b"other", delta)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import errno
+from unittest import mock
+import tempfile
+import shutil
+import threading
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fsmonitor
+
+try:
+    fsmonitor.Inotify().close()
+    HAVE_INOTIFY = True
+except OSError:
+    HAVE_INOTIFY = False
+
+
+@unittest.skipUnless(HAVE_INOTIFY, "inotify is not available")
+class TestFSMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, ".minigit"))
+        os.makedirs(os.path.join(self.test_dir, "src"))
+        self.write("src/a.txt", "a")
+        self.socket_path = os.path.join(self.test_dir, ".minigit", "fsmonitor.sock")
+        self.daemon = fsmonitor.FSMonitorDaemon(self.test_dir, self.socket_path)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+        for _ in range(200):
+            if fsmonitor.send_command(self.socket_path, 'status') is not None:
+                break
+            threading.Event().wait(0.01)
+
+    def tearDown(self):
+        fsmonitor.send_command(self.socket_path, 'stop')
+        self.thread.join(5)
+        shutil.rmtree(self.test_dir)
+
+    def write(self, rel_path, content):
+        with open(os.path.join(self.test_dir, rel_path), 'w') as f:
+            f.write(content)
+
+    def test_reports_changes_since_token(self):
+        first = fsmonitor.query_fsmonitor(self.socket_path, None)
+        self.assertTrue(first['full'])
+        
+        self.write("src/a.txt", "changed")
+        self.write("new.txt", "new")
+        os.makedirs(os.path.join(self.test_dir, "made", "deep"))
+        self.write("made/deep/file.txt", "x")
+        self.write(".minigit/index", "ignored")
+        
+        second = fsmonitor.query_fsmonitor(self.socket_path, first['token'])
+        self.assertFalse(second['full'])
+        self.assertIn("src/a.txt", second['paths'])
+        self.assertIn("new.txt", second['paths'])
+        self.assertIn("made/deep/file.txt", second['paths'])
+        self.assertFalse(any(path.startswith(".minigit") for path in second['paths']))
+        
+        third = fsmonitor.query_fsmonitor(self.socket_path, second['token'])
+        self.assertEqual(third['paths'], [])
+
+    def test_reports_deleted_directories(self):
+        token = fsmonitor.query_fsmonitor(self.socket_path, None)['token']
+        shutil.rmtree(os.path.join(self.test_dir, "src"))
+        
+        response = fsmonitor.query_fsmonitor(self.socket_path, token)
+        
+        self.assertIn("src", response['paths'])
+        self.assertIn("src/a.txt", response['paths'])
+
+    def test_foreign_token_needs_full_scan(self):
+        response = fsmonitor.query_fsmonitor(self.socket_path, "another-daemon:5")
+        self.assertTrue(response['full'])
+
+    def test_failed_watch_forces_full_scans(self):
+        daemon = fsmonitor.FSMonitorDaemon(self.test_dir, os.path.join(self.test_dir, "other.sock"))
+        self.addCleanup(daemon.inotify.close)
+        add_watch = daemon.inotify.add_watch
+        
+        def limited(path):
+            if os.path.basename(path) == "src":
+                raise OSError(errno.ENOSPC, "No space left on device")
+            return add_watch(path)
+        
+        token = daemon.query(None)['token']
+        with mock.patch.object(daemon.inotify, "add_watch", side_effect=limited):
+            daemon._watch_tree("")
+        
+        self.assertEqual(daemon.unwatched, {"src"})
+        self.assertTrue(daemon.query(token)['full'])
+        self.assertTrue(daemon.query(daemon.query(token)['token'])['full'])
+
+    def test_new_directory_is_watched_before_it_is_listed(self):
+        daemon = fsmonitor.FSMonitorDaemon(self.test_dir, os.path.join(self.test_dir, "other.sock"))
+        self.addCleanup(daemon.inotify.close)
+        os.makedirs(os.path.join(self.test_dir, "made"))
+        add_watch = daemon.inotify.add_watch
+        
+        def racing(path):
+            # a file shows up right as the watch is being set up
+            if os.path.basename(path) == "made":
+                self.write("made/early.txt", "early")
+            return add_watch(path)
+        
+        with mock.patch.object(daemon.inotify, "add_watch", side_effect=racing):
+            daemon._watch_tree("made", report=True)
+        
+        self.assertIn(os.path.join("made", "early.txt"), daemon.change_paths)
+
+    def test_trimming_the_change_log_expires_old_tokens(self):
+        daemon = fsmonitor.FSMonitorDaemon(self.test_dir, os.path.join(self.test_dir, "other.sock"))
+        self.addCleanup(daemon.inotify.close)
+        daemon._watch_tree("")
+        
+        old_token = daemon.query(None)['token']
+        with mock.patch.object(fsmonitor, "MAX_CHANGES", 10):
+            for i in range(8):
+                daemon._mark(f"early{i}.txt")
+            recent_token = daemon.query(None)['token']
+            for i in range(5):
+                daemon._mark(f"late{i}.txt")
+        
+        self.assertLessEqual(len(daemon.change_seqs), 10)
+        self.assertTrue(daemon.query(old_token)['full'])
+        recent = daemon.query(recent_token)
+        self.assertFalse(recent['full'])
+        self.assertEqual(recent['paths'], [f"late{i}.txt" for i in range(5)])
+
+    def test_no_daemon(self):
+        self.assertIsNone(fsmonitor.query_fsmonitor(os.path.join(self.test_dir, "missing.sock"), None))
+
+
+if __name__ == '__main__':
+    unittest.main()
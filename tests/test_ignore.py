@@ -0,0 +1,142 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ignore import IgnoreMatcher, IgnoreRules, parse_patterns, IGNORE_FILE
+
+
+def rules(*lines):
+    return IgnoreRules(parse_patterns(lines))
+
+
+class TestIgnoreRules(unittest.TestCase):
+
+    def test_comments_and_blank_lines(self):
+        self.assertEqual(parse_patterns(["# comment\n", "\n", "   \n", "\\#hash\n"]), parse_patterns(["\\#hash"]))
+        self.assertTrue(rules("\\#hash").match("#hash", False))
+
+    def test_basename_pattern_matches_at_any_depth(self):
+        r = rules("*.log")
+        self.assertTrue(r.match("a.log", False))
+        self.assertTrue(r.match("deep/dir/a.log", False))
+        self.assertIsNone(r.match("a.log.txt", False))
+
+    def test_slash_anchors_pattern(self):
+        r = rules("/build", "docs/*.html")
+        self.assertTrue(r.match("build", True))
+        self.assertIsNone(r.match("src/build", True))
+        self.assertTrue(r.match("docs/index.html", False))
+        self.assertIsNone(r.match("docs/api/index.html", False))
+
+    def test_dir_only_pattern(self):
+        r = rules("cache/")
+        self.assertTrue(r.match("cache", True))
+        self.assertTrue(r.match("src/cache", True))
+        self.assertIsNone(r.match("cache", False))
+
+    def test_double_star(self):
+        r = rules("**/tmp", "logs/**", "a/**/z")
+        self.assertTrue(r.match("tmp", True))
+        self.assertTrue(r.match("x/y/tmp", False))
+        self.assertTrue(r.match("logs/one/two.txt", False))
+        self.assertIsNone(r.match("logs", True))
+        self.assertTrue(r.match("a/z", False))
+        self.assertTrue(r.match("a/b/c/z", False))
+
+    def test_wildcards_and_classes(self):
+        r = rules("file?.[ch]", "[!a]x")
+        self.assertTrue(r.match("file1.c", False))
+        self.assertTrue(r.match("fileX.h", False))
+        self.assertIsNone(r.match("file10.c", False))
+        self.assertIsNone(r.match("dir/file1.o", False))
+        self.assertTrue(r.match("bx", False))
+        self.assertIsNone(r.match("ax", False))
+
+    def test_last_matching_line_wins(self):
+        r = rules("*.log", "!keep.log", "keep.log.d/", "*.tmp", "!*.tmp")
+        self.assertTrue(r.match("a.log", False))
+        self.assertFalse(r.match("keep.log", False))
+        self.assertFalse(r.match("x.tmp", False))
+
+    def test_same_kind_lines_are_combined(self):
+        r = rules("a", "b", "c", "!d", "e/", "f/")
+        self.assertEqual([(negate, dir_only) for negate, dir_only, regex in r.groups],
+                         [(False, False), (True, False), (False, True)])
+
+    def test_escapes_and_trailing_spaces(self):
+        r = rules("name  ", "space\\ ", "\\!bang", "a+b(c)")
+        self.assertTrue(r.match("name", False))
+        self.assertTrue(r.match("space ", False))
+        self.assertTrue(r.match("!bang", False))
+        self.assertTrue(r.match("a+b(c)", False))
+
+
+class TestIgnoreMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def write_ignore(self, rel_dir, *lines):
+        path = os.path.join(self.test_dir, rel_dir, IGNORE_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def test_nested_ignore_file_overrides_parent(self):
+        self.write_ignore("", "*.log", "/out")
+        self.write_ignore("src", "!important.log", "gen/")
+        matcher = IgnoreMatcher(self.test_dir)
+        
+        self.assertTrue(matcher.is_ignored("a.log"))
+        self.assertTrue(matcher.is_ignored(os.path.join("src", "a.log")))
+        self.assertFalse(matcher.is_ignored(os.path.join("src", "important.log")))
+        self.assertTrue(matcher.is_ignored(os.path.join("src", "gen"), is_dir=True))
+        self.assertFalse(matcher.is_ignored(os.path.join("lib", "gen"), is_dir=True))
+        self.assertTrue(matcher.is_ignored("out", is_dir=True))
+        self.assertFalse(matcher.is_ignored(os.path.join("src", "out"), is_dir=True))
+
+    def test_files_in_ignored_directory_are_ignored(self):
+        self.write_ignore("", "build/", "!build/keep.txt")
+        matcher = IgnoreMatcher(self.test_dir)
+        
+        #git cannot re-include a file whose directory is excluded
+        self.assertTrue(matcher.is_ignored(os.path.join("build", "keep.txt")))
+        self.assertTrue(matcher.is_ignored(os.path.join("build", "sub", "x.o")))
+
+    def test_minigit_is_always_ignored(self):
+        matcher = IgnoreMatcher(self.test_dir)
+        
+        self.assertTrue(matcher.is_ignored(".minigit", is_dir=True))
+        self.assertTrue(matcher.is_ignored(os.path.join(".minigit", "index")))
+        self.assertFalse(matcher.is_ignored(os.path.join("src", ".minigit"), is_dir=True))
+
+    def test_prune_stops_the_walk_at_ignored_directories(self):
+        self.write_ignore("", "node_modules/", "*.pyc")
+        for path in ["node_modules/pkg/index.js", "src/main.py", "src/main.pyc", ".minigit/HEAD"]:
+            full_path = os.path.join(self.test_dir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            open(full_path, 'w').close()
+        matcher = IgnoreMatcher(self.test_dir)
+        
+        visited = []
+        found = []
+        for root, dirs, files in os.walk(self.test_dir):
+            rel_root = os.path.relpath(root, self.test_dir)
+            rel_root = "" if rel_root == "." else rel_root
+            visited.append(rel_root)
+            matcher.prune(rel_root, dirs, files)
+            found.extend(os.path.join(rel_root, name) for name in files)
+        
+        self.assertEqual(sorted(visited), ["", "src"])
+        self.assertEqual(sorted(found), [IGNORE_FILE, os.path.join("src", "main.py")])
+
+
+if __name__ == '__main__':
+    unittest.main()
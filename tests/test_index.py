@@ -0,0 +1,146 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import Index, IndexEntry, UntrackedCache, SIGNATURE
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.test_dir, "index")
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return os.stat(path)
+
+    def test_round_trip(self):
+        index = Index()
+        st = self.write_file("a.txt", "a")
+        index.record("a.txt", "aa" * 20, st, staged=True)
+        index.record("dir/long name " * 20, "bb" * 20, st)
+        index.write(self.index_file)
+        
+        loaded = Index.read(self.index_file)
+        
+        self.assertEqual(sorted(loaded.entries), sorted(index.entries))
+        self.assertEqual(loaded.staged(), {"a.txt": "aa" * 20})
+        entry = loaded.entries["a.txt"]
+        self.assertTrue(entry.matches(st))
+        self.assertEqual(entry.size, 1)
+        with open(self.index_file, 'rb') as f:
+            self.assertEqual(f.read(4), SIGNATURE)
+
+    def test_reads_text_index(self):
+        with open(self.index_file, 'w') as f:
+            f.write(f"{'cc' * 20} some/file.txt\n")
+        
+        index = Index.read(self.index_file)
+        
+        self.assertEqual(index.staged(), {"some/file.txt": "cc" * 20})
+        self.assertTrue(index.dirty)
+        self.assertIsNone(index.cached_hash("some/file.txt", self.write_file("x", "x")))
+
+    def test_checksum_is_verified(self):
+        index = Index()
+        index.entries["a"] = IndexEntry("a", b"\x01" * 20, staged=True)
+        index.write(self.index_file)
+        with open(self.index_file, 'r+b') as f:
+            f.seek(30)
+            f.write(b"\xff")
+        
+        with self.assertRaises(ValueError):
+            Index.read(self.index_file)
+
+    def test_cached_hash_needs_matching_stat(self):
+        st = self.write_file("a.txt", "first")
+        index = Index()
+        index.record("a.txt", "aa" * 20, st)
+        
+        self.assertEqual(index.cached_hash("a.txt", st), "aa" * 20)
+        os.utime(os.path.join(self.test_dir, "a.txt"), ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertIsNone(index.cached_hash("a.txt", os.stat(os.path.join(self.test_dir, "a.txt"))))
+
+    def test_racy_entries_are_not_trusted(self):
+        st = self.write_file("a.txt", "racy")
+        index = Index()
+        index.record("a.txt", "aa" * 20, st)
+        index.write(self.index_file)
+        
+        loaded = Index.read(self.index_file)
+        loaded.mtime_ns = st.st_mtime_ns
+        self.assertIsNone(loaded.cached_hash("a.txt", st))
+        loaded.mtime_ns = st.st_mtime_ns + 1
+        self.assertEqual(loaded.cached_hash("a.txt", st), "aa" * 20)
+
+
+
+class TestUntrackedCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.test_dir, "untracked-cache")
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        cache = UntrackedCache()
+        cache.record("", 100, ["b.txt", "a.txt"], ["src"])
+        cache.record("src", 200, [], ["empty"])
+        cache.record("src/empty", 300, [], [])
+        cache.write(self.cache_file)
+        
+        loaded = UntrackedCache.read(self.cache_file)
+        
+        self.assertEqual(loaded.dirs, cache.dirs)
+        self.assertEqual(loaded.lookup("", 100), (["a.txt", "b.txt"], ["src"]))
+        self.assertIsNone(loaded.lookup("", 101))
+        self.assertIsNone(loaded.lookup("missing", 100))
+        self.assertFalse(loaded.dirty)
+
+    def test_racy_directories_are_listed_again(self):
+        cache = UntrackedCache()
+        cache.record("", 100, ["a.txt"], [])
+        self.assertIsNone(cache.lookup("", 100))
+        cache.mtime_ns = 100
+        self.assertIsNone(cache.lookup("", 100))
+        cache.mtime_ns = 101
+        self.assertEqual(cache.lookup("", 100), (["a.txt"], []))
+
+    def test_damaged_file_gives_empty_cache(self):
+        cache = UntrackedCache()
+        cache.record("", 100, ["a.txt"], [])
+        cache.write(self.cache_file)
+        with open(self.cache_file, 'r+b') as f:
+            f.seek(20)
+            f.write(b"\xff")
+        
+        self.assertEqual(UntrackedCache.read(self.cache_file).dirs, {})
+        self.assertEqual(UntrackedCache.read(os.path.join(self.test_dir, "missing")).dirs, {})
+
+    def test_retain_drops_unvisited_directories(self):
+        cache = UntrackedCache()
+        cache.record("", 100, [], ["a", "b"])
+        cache.record("a", 100, [], [])
+        cache.record("b", 100, [], [])
+        cache.dirty = False
+        
+        cache.retain({"", "a"})
+        
+        self.assertEqual(sorted(cache.dirs), ["", "a"])
+        self.assertTrue(cache.dirty)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger
+
+
+class TestLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.original_level = logger.get_level()
+        logger.set_level(logger.INFO)
+        self.log = logger.get_logger("TestTag")
+
+    def tearDown(self):
+        logger.set_level(self.original_level)
+
+    def capture(self, func, *args):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            func(*args)
+        return output.getvalue()
+
+    def test_disabled_levels_are_silent(self):
+        self.assertEqual(self.capture(self.log.debug, "hidden %s", "value"), "")
+        self.assertEqual(self.capture(self.log.trace, "hidden"), "")
+
+    def test_enabled_levels_keep_tag_format(self):
+        output = self.capture(self.log.error, "Hash too short: %s", "abc")
+        self.assertEqual(output, "[TestTag] Hash too short: abc\n")
+
+    def test_set_level_updates_existing_loggers(self):
+        logger.set_level(logger.TRACE)
+        
+        output = self.capture(self.log.trace, "Stored %d bytes", 12)
+        
+        self.assertEqual(output, "[TestTag] Stored 12 bytes\n")
+        self.assertTrue(self.log.is_enabled(logger.DEBUG))
+
+    def test_get_logger_returns_same_instance(self):
+        self.assertIs(logger.get_logger("TestTag"), self.log)
+
+    def test_level_from_verbosity(self):
+        self.assertEqual(logger.level_from_verbosity(0), logger.INFO)
+        self.assertEqual(logger.level_from_verbosity(1), logger.DEBUG)
+        self.assertEqual(logger.level_from_verbosity(3), logger.TRACE)
+
+    def test_level_from_env(self):
+        self.assertIsNone(logger.level_from_env(None))
+        self.assertIsNone(logger.level_from_env("0"))
+        self.assertEqual(logger.level_from_env("1"), logger.TRACE)
+        self.assertEqual(logger.level_from_env("debug"), logger.DEBUG)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from minigit import MinigitObject
+from minigit import MinigitObject, to_oid, to_hex
 
 
 class TestObject(MinigitObject):
@@ -57,6 +57,26 @@ class TestMinigitObject(unittest.TestCase):
         self.assertEqual(len(filename), 38)
         self.assertEqual(dir_name + filename, self.obj.hash)
 
+    def test_hash_is_stored_as_binary_oid(self):
+        hash_value = self.obj.calculate_hash()
+        
+        self.assertEqual(self.obj.oid, bytes.fromhex(hash_value))
+        self.assertEqual(len(self.obj.oid), 20)
+        
+        self.obj.hash = None
+        self.assertIsNone(self.obj.oid)
+
+    def test_to_oid_and_to_hex(self):
+        hex_id = "7ab07d1e300bdb11548ea510ff4183ae6b95d187"
+        
+        self.assertEqual(to_oid(hex_id), bytes.fromhex(hex_id))
+        self.assertEqual(to_oid(bytes.fromhex(hex_id)), bytes.fromhex(hex_id))
+        self.assertEqual(to_hex(bytes.fromhex(hex_id)), hex_id)
+        self.assertEqual(to_hex(hex_id), hex_id)
+        self.assertIsNone(to_hex(None))
+        with self.assertRaises(ValueError):
+            to_oid("abc")
+
     def test_round_trip_integrity(self):
         compressed = self.obj.compress_data()
         decompressed = MinigitObject.decompress_data(compressed)
@@ -0,0 +1,142 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+import hashlib
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pack import Pack, PackIndex, write_pack, find_deltas, encode_varint, decode_varint, MAX_DELTA_DEPTH
+from delta import create_delta
+
+
+def object_id(obj_type, content):
+    return hashlib.sha1(f"{obj_type} {len(content)}\0".encode('utf-8') + content).digest()
+
+
+class TestPack(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def write(self, contents):
+        objects = [(object_id("blob", content), "blob", len(content), [content]) for content in contents]
+        return write_pack(self.test_dir, objects), objects
+
+    def test_varint_round_trip(self):
+        for value in (0, 1, 127, 128, 300, 2 ** 40):
+            encoded = encode_varint(value)
+            self.assertEqual(decode_varint(encoded, 0), (value, len(encoded)))
+
+    def test_write_and_read_objects(self):
+        contents = [f"content {i}\n".encode('utf-8') for i in range(300)]
+        idx_path, objects = self.write(contents)
+        pack = Pack(idx_path)
+        
+        self.assertEqual(len(pack.index), 300)
+        for oid, obj_type, size, chunks in objects:
+            self.assertIn(oid, pack)
+            self.assertEqual(pack.read_header(oid), ("blob", size))
+            read_type, read_size, read_chunks = pack.open_stream(oid)
+            self.assertEqual((read_type, read_size), ("blob", size))
+            self.assertEqual(b''.join(read_chunks), chunks[0])
+
+    def test_index_is_sorted_with_fanout(self):
+        idx_path, objects = self.write([bytes([i]) * 10 for i in range(50)])
+        index = PackIndex(idx_path)
+        oids = list(index.iter_oids())
+        
+        self.assertEqual(oids, sorted(oid for oid, _, _, _ in objects))
+        for byte in range(256):
+            self.assertEqual(index.fanout[byte], sum(1 for oid in oids if oid[0] <= byte))
+
+    def test_iter_prefix(self):
+        idx_path, objects = self.write([f"blob {i}".encode('utf-8') for i in range(500)])
+        index = PackIndex(idx_path)
+        
+        for oid, _, _, _ in objects[:20]:
+            for length in (2, 3, 6, 40):
+                prefix = oid.hex()[:length]
+                expected = sorted(o for o, _, _, _ in objects if o.hex().startswith(prefix))
+                self.assertEqual(list(index.iter_prefix(prefix)), expected)
+        self.assertEqual(list(index.iter_prefix("ff" * 20)), [])
+
+    def test_missing_object(self):
+        idx_path, _ = self.write([b"only one"])
+        pack = Pack(idx_path)
+        missing = object_id("blob", b"not packed")
+        
+        self.assertNotIn(missing, pack)
+        self.assertIsNone(pack.read_header(missing))
+        self.assertIsNone(pack.open_stream(missing))
+
+    def test_large_object_streams_in_chunks(self):
+        content = os.urandom(300 * 1024)
+        idx_path, objects = self.write([content])
+        pack = Pack(idx_path)
+        _, size, chunks = pack.open_stream(objects[0][0])
+        pieces = list(chunks)
+        
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(b''.join(pieces), content)
+
+    def test_delta_entries_resolve_through_their_base(self):
+        base = b"".join(f"key{i} = {i}\n".encode('utf-8') for i in range(2000))
+        revisions = [base]
+        for i in range(5):
+            revisions.append(revisions[-1].replace(f"key{i * 100} =".encode('utf-8'), b"edited ="))
+        oids = [object_id("blob", content) for content in revisions]
+        contents = dict(zip(oids, revisions))
+        
+        candidates = [(oid, "blob", "config.ini", len(contents[oid])) for oid in oids]
+        deltas = find_deltas(candidates, contents.__getitem__)
+        objects = [(oid, "blob", len(contents[oid]), None if oid in deltas else [contents[oid]]) for oid in oids]
+        pack = Pack(write_pack(self.test_dir, objects, deltas))
+        
+        self.assertGreaterEqual(len(deltas), 4)
+        self.assertLess(os.path.getsize(pack.pack_path), len(base))
+        for oid in oids:
+            self.assertEqual(pack.read_header(oid), ("blob", len(contents[oid])))
+            self.assertEqual(b''.join(pack.open_stream(oid)[2]), contents[oid])
+
+    def test_find_deltas_respects_depth_and_size(self):
+        base = b"x" * 1000
+        revisions = [base + bytes([i]) * (i + 1) for i in range(6)]
+        oids = [object_id("blob", content) for content in revisions]
+        contents = dict(zip(oids, revisions))
+        candidates = [(oid, "blob", "a.txt", len(contents[oid])) for oid in oids]
+        candidates.append((object_id("blob", b"tiny"), "blob", "a.txt", 4))
+        contents[candidates[-1][0]] = b"tiny"
+        
+        deltas = find_deltas(candidates, contents.__getitem__, max_depth=2)
+        
+        def depth(oid):
+            return depth(deltas[oid][0]) + 1 if oid in deltas else 0
+        self.assertTrue(deltas)
+        self.assertTrue(all(depth(oid) <= 2 for oid in deltas))
+        self.assertNotIn(candidates[-1][0], deltas)
+
+    def test_overlong_delta_chain_is_rejected(self):
+        contents = [b"version 0 " * 100]
+        for i in range(1, MAX_DELTA_DEPTH + 2):
+            contents.append(contents[-1] + f"version {i}".encode('utf-8'))
+        oids = [object_id("blob", content) for content in contents]
+        deltas = {oids[i]: (oids[i - 1], create_delta(contents[i - 1], contents[i])) for i in range(1, len(oids))}
+        objects = [(oid, "blob", len(content), [content]) for oid, content in zip(oids, contents)]
+        pack = Pack(write_pack(self.test_dir, objects, deltas))
+        
+        self.assertEqual(b''.join(pack.open_stream(oids[MAX_DELTA_DEPTH])[2]), contents[MAX_DELTA_DEPTH])
+        with self.assertRaises(ValueError):
+            pack.open_stream(oids[-1])
+
+    def test_empty_pack_is_not_written(self):
+        self.assertIsNone(write_pack(self.test_dir, []))
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
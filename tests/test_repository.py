@@ -1,4 +1,6 @@
 import unittest
+import threading
+from unittest import mock
 import tempfile
 import shutil
 import os
@@ -84,6 +86,735 @@ class TestRepository(unittest.TestCase):
         
         self.assertEqual(hash1, hash2)
 
+    def test_store_object_matches_calculated_hash(self):
+        self.repo.create()
+        
+        blob = Blob(b"streamed " * 10000)
+        expected_hash = Blob(blob.data).calculate_hash()
+        
+        hash_value = self.repo.store_object(blob)
+        
+        self.assertEqual(hash_value, expected_hash)
+        self.assertEqual(blob.hash, expected_hash)
+        self.assertEqual(self.repo.load_object(hash_value).data, blob.data)
+
+    def test_store_object_leaves_no_temp_files(self):
+        self.repo.create()
+        
+        self.repo.store_object(Blob("first"))
+        self.repo.store_object(Blob("first"))
+        
+        leftovers = [name for name in os.listdir(self.repo.objects_path) if name.startswith("tmp_obj_")]
+        self.assertEqual(leftovers, [])
+
+    def test_add_to_index_streams_file(self):
+        self.repo.create()
+        
+        content = os.urandom(300 * 1024)
+        with open(os.path.join(self.test_dir, "big.bin"), 'wb') as f:
+            f.write(content)
+        
+        hash_value = self.repo.add_to_index("big.bin")
+        
+        self.assertEqual(hash_value, Blob(content).calculate_hash())
+        self.assertEqual(self.repo.read_index(), {"big.bin": hash_value})
+        self.assertEqual(self.repo.load_object(hash_value).data, content)
+
+    def test_open_object_stream_yields_chunks(self):
+        self.repo.create()
+        
+        content = os.urandom(300 * 1024)
+        hash_value = self.repo.store_object(Blob(content))
+        
+        obj_type, size, chunks = self.repo.open_object_stream(hash_value)
+        pieces = list(chunks)
+        
+        self.assertEqual(obj_type, "blob")
+        self.assertEqual(size, len(content))
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(b''.join(pieces), content)
+
+    def test_read_object_header(self):
+        self.repo.create()
+        
+        content = os.urandom(300 * 1024)
+        hash_value = self.repo.store_object(Blob(content))
+        
+        self.assertEqual(self.repo.read_object_header(hash_value), ("blob", len(content)))
+
+    def test_read_object_header_missing_object(self):
+        self.repo.create()
+        
+        with self.assertRaises(FileNotFoundError):
+            self.repo.read_object_header("a" * 40)
+
+    def test_move_to_commit_restores_file_content(self):
+        self.repo.create()
+        
+        file_path = os.path.join(self.test_dir, "data.bin")
+        original = os.urandom(200 * 1024)
+        with open(file_path, 'wb') as f:
+            f.write(original)
+        self.repo.add_to_index("data.bin")
+        first_commit = self.repo.create_commit("first")
+        
+        with open(file_path, 'wb') as f:
+            f.write(b"changed")
+        self.repo.add_to_index("data.bin")
+        self.repo.create_commit("second")
+        
+        self.assertTrue(self.repo.move_to_commit(first_commit))
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+
+    def write_file(self, rel_path, content):
+        full_path = os.path.join(self.test_dir, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w') as f:
+            f.write(content)
+
+    def commit_files(self, files, message):
+        for rel_path, content in files.items():
+            self.write_file(rel_path, content)
+            self.repo.add_to_index(rel_path)
+        return self.repo.create_commit(message)
+
+    def test_commit_writes_nested_trees(self):
+        self.repo.create()
+        
+        commit_hash = self.commit_files({"README": "hi", "src/app.py": "app", "src/lib/util.py": "util"}, "nested")
+        root = self.repo.load_object(self.repo.load_object(commit_hash).tree_hash)
+        
+        self.assertEqual(sorted(entry['name'] for entry in root.entries), ["README", "src"])
+        self.assertEqual(root.lookup("src")['mode'], "040000")
+        self.assertEqual(self.repo.lookup_path(root, "src/lib/util.py")['hash'], Blob("util").calculate_hash())
+        self.assertIsNone(self.repo.lookup_path(root, "src/missing.py"))
+        self.assertEqual(
+            self.repo.flatten_tree(root.hash),
+            {
+                "README": Blob("hi").calculate_hash(),
+                "src/app.py": Blob("app").calculate_hash(),
+                "src/lib/util.py": Blob("util").calculate_hash()
+            }
+        )
+
+    def test_commit_reuses_unchanged_subtrees(self):
+        self.repo.create()
+        
+        first = self.commit_files({"docs/guide.md": "guide", "src/app.py": "v1"}, "first")
+        second = self.commit_files({"src/app.py": "v2"}, "second")
+        
+        first_root = self.repo.load_object(self.repo.load_object(first).tree_hash)
+        second_root = self.repo.load_object(self.repo.load_object(second).tree_hash)
+        
+        self.assertEqual(first_root.lookup("docs")['hash'], second_root.lookup("docs")['hash'])
+        self.assertNotEqual(first_root.lookup("src")['hash'], second_root.lookup("src")['hash'])
+        self.assertEqual(
+            list(self.repo.diff_trees(first_root.hash, second_root.hash)),
+            [("src/app.py", Blob("v1").calculate_hash(), Blob("v2").calculate_hash())]
+        )
+
+    def test_commit_converts_flat_parent_tree(self):
+        self.repo.create()
+        
+        # a commit in the old layout, one tree with slashes in the names
+        flat_tree = repo_module.Tree.from_entries([("100644", "src/old.py", self.repo.store_object(Blob("old")))])
+        flat_commit = repo_module.Commit(tree_hash=self.repo.store_object(flat_tree), message="flat")
+        self.repo.update_branch("main", self.repo.store_object(flat_commit))
+        
+        new_commit = self.commit_files({"src/new.py": "new"}, "nested")
+        tree_hash = self.repo.load_object(new_commit).tree_hash
+        
+        self.assertEqual(sorted(self.repo.flatten_tree(tree_hash)), ["src/new.py", "src/old.py"])
+        self.assertFalse(self.repo._is_flat_tree(tree_hash))
+
+    def test_move_between_nested_commits(self):
+        self.repo.create()
+        
+        first = self.commit_files({"keep/a.txt": "a", "same/b.txt": "b"}, "first")
+        self.commit_files({"keep/a.txt": "a2", "new/c.txt": "c"}, "second")
+        
+        self.assertTrue(self.repo.move_to_commit(first))
+        
+        with open(os.path.join(self.test_dir, "keep", "a.txt")) as f:
+            self.assertEqual(f.read(), "a")
+        with open(os.path.join(self.test_dir, "same", "b.txt")) as f:
+            self.assertEqual(f.read(), "b")
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, "new")))
+
+    def test_repack_moves_objects_into_pack(self):
+        self.repo.create()
+        
+        first = self.commit_files({"src/app.py": "v1", "README": "hi"}, "first")
+        loose = sorted(self.repo.list_objects())
+        
+        idx_path = self.repo.repack(delete_loose=True)
+        
+        self.assertTrue(os.path.exists(idx_path))
+        self.assertEqual(self.repo.list_loose_objects(), [])
+        self.assertEqual(sorted(self.repo.list_objects()), loose)
+        for hash_value in loose:
+            self.assertTrue(self.repo.object_exists(hash_value))
+        self.assertEqual(self.repo.load_object(first).message, "first")
+        self.assertEqual(self.repo.read_object_header(Blob("v1").calculate_hash()), ("blob", 2))
+        self.assertEqual(self.repo.resolve_hash(first[:8]), first)
+
+    def test_repack_all_folds_existing_packs(self):
+        self.repo.create()
+        
+        self.commit_files({"a.txt": "a"}, "first")
+        self.repo.repack(delete_loose=True)
+        second = self.commit_files({"b.txt": "b"}, "second")
+        
+        idx_path = self.repo.repack(all_objects=True, delete_loose=True)
+        
+        self.assertEqual([name for name in os.listdir(self.repo.pack_path) if name.endswith(".idx")], [os.path.basename(idx_path)])
+        self.assertTrue(self.repo.move_to_commit(self.repo.load_object(second).parent_hash))
+        with open(os.path.join(self.test_dir, "a.txt")) as f:
+            self.assertEqual(f.read(), "a")
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, "b.txt")))
+
+    def test_repack_stores_revisions_as_deltas(self):
+        self.repo.create()
+        
+        lines = [f"option_{i} = {i}\n" for i in range(5000)]
+        commits = []
+        for revision in range(10):
+            lines[revision * 7] = f"option_{revision * 7} = edited\n"
+            commits.append(self.commit_files({"config/app.ini": "".join(lines)}, f"revision {revision}"))
+        
+        file_size = len("".join(lines))
+        self.repo.repack(delete_loose=True)
+        pack = self.repo.get_packs()[0]
+        
+        self.assertLess(os.path.getsize(pack.pack_path), file_size)
+        self.assertTrue(self.repo.move_to_commit(commits[3]))
+        with open(os.path.join(self.test_dir, "config", "app.ini")) as f:
+            self.assertIn("option_21 = edited\n", f.read())
+
+    def test_repack_rejects_depth_readers_cannot_follow(self):
+        self.repo.create()
+        
+        lines = [f"line {i}\n" for i in range(200)]
+        hashes = []
+        for revision in range(70):
+            lines[revision] = f"line {revision} edited\n"
+            hashes.append(self.repo.store_object(Blob("".join(lines))))
+        
+        with self.assertRaises(ValueError):
+            self.repo.repack(delete_loose=True, window=1, depth=100)
+        self.assertEqual(self.repo.get_packs(), [])
+        self.assertEqual(sorted(self.repo.list_loose_objects()), sorted(hashes))
+        
+        self.repo.repack(delete_loose=True, window=1, depth=repo_module.MAX_DELTA_DEPTH)
+        self.assertEqual(self.repo.list_loose_objects(), [])
+        for hash_value in hashes:
+            self.assertEqual(self.repo.read_object_header(hash_value)[0], "blob")
+            self.assertEqual(self.repo.load_object(hash_value).calculate_hash(), hash_value)
+
+    def test_repack_keeps_loose_objects_when_pack_does_not_verify(self):
+        self.repo.create()
+        
+        self.commit_files({"a.txt": "a"}, "first")
+        loose = sorted(self.repo.list_loose_objects())
+        
+        with mock.patch.object(repo_module.Pack, "verify", side_effect=ValueError("bad pack")):
+            with self.assertRaises(ValueError):
+                self.repo.repack(delete_loose=True)
+        
+        self.assertEqual(sorted(self.repo.list_loose_objects()), loose)
+        self.assertEqual(os.listdir(self.repo.pack_path), [])
+
+    def age_object(self, hash_value, seconds):
+        object_file = os.path.join(self.repo.objects_path, hash_value[:2], hash_value[2:])
+        old = os.stat(object_file).st_mtime - seconds
+        os.utime(object_file, (old, old))
+
+    def test_gc_prunes_old_unreachable_objects(self):
+        self.repo.create()
+        
+        self.write_file("a.txt", "first draft")
+        self.repo.add_to_index("a.txt")
+        draft = Blob("first draft").calculate_hash()
+        commit = self.commit_files({"a.txt": "final"}, "first")
+        recent = self.repo.store_object(Blob("recent orphan"))
+        self.write_file("b.txt", "staged")
+        self.repo.add_to_index("b.txt")
+        staged = Blob("staged").calculate_hash()
+        self.age_object(draft, 30 * 24 * 60 * 60)
+        self.age_object(staged, 30 * 24 * 60 * 60)
+        
+        pruned = self.repo.gc()
+        
+        self.assertEqual(pruned, [draft])
+        self.assertFalse(self.repo.object_exists(draft))
+        self.assertTrue(self.repo.object_exists(recent))
+        self.assertTrue(self.repo.object_exists(staged))
+        self.assertEqual(self.repo.load_object(commit).message, "first")
+        self.assertEqual(self.repo.gc(prune_expire=0), [recent])
+
+    def test_gc_keeps_detached_head_history(self):
+        self.repo.create()
+        
+        first = self.commit_files({"a.txt": "one"}, "first")
+        second = self.commit_files({"a.txt": "two"}, "second")
+        self.assertTrue(self.repo.move_to_commit(first))
+        # the branch moves back, only the detached HEAD still reaches the second commit
+        self.repo.update_branch("main", first)
+        with open(self.repo.head_file, 'w') as f:
+            f.write(second + "\n")
+        
+        self.assertEqual(self.repo.gc(prune_expire=0), [])
+        
+        with open(self.repo.head_file, 'w') as f:
+            f.write("ref: refs/heads/main\n")
+        pruned = self.repo.gc(prune_expire=0)
+        
+        self.assertIn(second, pruned)
+        self.assertIn(Blob("two").calculate_hash(), pruned)
+        self.assertTrue(self.repo.object_exists(Blob("one").calculate_hash()))
+
+    def test_gc_removes_stale_temp_files(self):
+        self.repo.create()
+        
+        stale = os.path.join(self.repo.objects_path, "tmp_obj_stale")
+        with open(stale, 'wb') as f:
+            f.write(b"partial")
+        os.utime(stale, (0, 0))
+        
+        self.repo.gc()
+        
+        self.assertFalse(os.path.exists(stale))
+
+    def test_load_object_uses_cache(self):
+        self.repo.create()
+        commit_hash = self.commit_files({"a.txt": "cached"}, "first")
+        self.repo.object_cache.clear()
+        
+        first = self.repo.load_object(commit_hash)
+        misses = self.repo.object_cache.misses
+        second = self.repo.load_object(commit_hash)
+        
+        self.assertIs(first, second)
+        self.assertEqual(self.repo.object_cache.misses, misses)
+        self.assertGreaterEqual(self.repo.object_cache.hits, 1)
+
+    def test_object_cache_can_be_disabled(self):
+        repo = Repository(self.test_dir, cache_size=0)
+        repo.create()
+        blob_hash = repo.store_object(Blob("uncached"))
+        
+        self.assertIsNone(repo.object_cache)
+        self.assertIsNot(repo.load_object(blob_hash), repo.load_object(blob_hash))
+        self.assertEqual(repo.load_object(blob_hash).data, b"uncached")
+
+    def test_store_existing_object_skips_write(self):
+        self.repo.create()
+        first = self.repo.store_object(Blob("same content"))
+        
+        with mock.patch.object(repo_module, "write_object_stream", side_effect=AssertionError("rewritten")), \
+                mock.patch.object(repo_module.os.path, "exists", side_effect=AssertionError("stat called")):
+            self.assertEqual(self.repo.store_object(Blob("same content")), first)
+            self.assertTrue(self.repo.object_exists(first))
+            self.assertFalse(self.repo.object_exists(first[:2] + "0" * 38))
+
+    def test_known_objects_follow_prune_and_repack(self):
+        self.repo.create()
+        orphan = self.repo.store_object(Blob("orphan"))
+        self.assertTrue(self.repo.object_exists(orphan))
+        
+        self.repo.gc(prune_expire=0)
+        self.assertFalse(self.repo.object_exists(orphan))
+        
+        kept = self.commit_files({"a.txt": "kept"}, "first")
+        self.repo.repack(delete_loose=True)
+        self.assertTrue(self.repo.object_exists(kept))
+        self.assertEqual(self.repo.list_loose_objects(), [])
+
+    def colliding_blobs(self, length):
+        # two contents whose ids share the first length characters, found by birthday search
+        seen = {}
+        i = 0
+        while True:
+            content = f"content {i}"
+            prefix = Blob(content).calculate_hash()[:length]
+            if prefix in seen:
+                return seen[prefix], content
+            seen[prefix] = content
+            i += 1
+
+    def test_shortest_unique_abbrev(self):
+        self.repo.create()
+        first, second = (self.repo.store_object(Blob(content)) for content in self.colliding_blobs(5))
+        lone = self.repo.store_object(Blob("lone"))
+        
+        self.assertGreaterEqual(len(self.repo.shortest_unique_abbrev(first)), 6)
+        self.assertEqual(self.repo.resolve_hash(self.repo.shortest_unique_abbrev(first)), first)
+        self.assertEqual(self.repo.resolve_hash(self.repo.shortest_unique_abbrev(second)), second)
+        self.assertIsNone(self.repo.resolve_hash(first[:5]))
+        self.assertEqual(self.repo.shortest_unique_abbrev(lone), lone[:4])
+
+    def test_resolve_hash_in_packs(self):
+        self.repo.create()
+        first, second = (self.repo.store_object(Blob(content)) for content in self.colliding_blobs(4))
+        self.repo.repack(delete_loose=True)
+        
+        self.assertEqual(self.repo.objects_with_prefix(first[:4]), sorted([first, second]))
+        self.assertEqual(self.repo.resolve_hash(first[:10]), first)
+        self.assertEqual(self.repo.resolve_hash(self.repo.shortest_unique_abbrev(second)), second)
+        self.assertEqual(sorted(self.repo.iter_objects()), sorted([first, second]))
+
+    def age_file(self, rel_path, seconds):
+        full_path = os.path.join(self.test_dir, rel_path)
+        old = os.stat(full_path).st_mtime - seconds
+        os.utime(full_path, (old, old))
+
+    def test_status_uses_stat_cache(self):
+        self.repo.create()
+        self.commit_files({"a.txt": "cached", "b.txt": "other"}, "first")
+        self.age_file("a.txt", 60)
+        self.age_file("b.txt", 60)
+        self.assertEqual(self.repo.get_file_status_detailed("a.txt"), "unmodified")
+        self.repo.flush_index()
+        
+        fresh = Repository(self.test_dir)
+        with mock.patch.object(repo_module.Blob, "from_file_stream", side_effect=AssertionError("rehashed")):
+            self.assertEqual(fresh.get_file_status_detailed("a.txt"), "unmodified")
+        
+        self.write_file("a.txt", "changed")
+        self.assertEqual(fresh.get_file_status_detailed("a.txt"), "modified")
+
+    def test_racy_file_is_rehashed(self):
+        self.repo.create()
+        self.commit_files({"a.txt": "one"}, "first")
+        self.age_file("a.txt", 60)
+        self.repo.get_file_status_detailed("a.txt")
+        self.repo.flush_index()
+        
+        # same size and same mtime as the cached entry, only the content differs
+        st = os.stat(os.path.join(self.test_dir, "a.txt"))
+        self.write_file("a.txt", "two")
+        os.utime(os.path.join(self.test_dir, "a.txt"), ns=(st.st_atime_ns, st.st_mtime_ns))
+        index = self.repo.load_index()
+        index.mtime_ns = st.st_mtime_ns
+        
+        self.assertEqual(self.repo.hash_working_file("a.txt"), Blob("two").calculate_hash())
+
+    def test_text_index_is_still_read(self):
+        self.repo.create()
+        blob_hash = self.repo.store_object(Blob("legacy"))
+        with open(self.repo.index_file, 'w') as f:
+            f.write(f"{blob_hash} legacy.txt\n")
+        
+        self.assertEqual(self.repo.read_index(), {"legacy.txt": blob_hash})
+        self.repo.write_index(self.repo.read_index())
+        with open(self.repo.index_file, 'rb') as f:
+            self.assertEqual(f.read(4), b"DIRC")
+        self.assertEqual(Repository(self.test_dir).read_index(), {"legacy.txt": blob_hash})
+
+    def test_add_paths_writes_index_once(self):
+        self.repo.create()
+        for i in range(20):
+            self.write_file(f"dir/sub{i % 3}/file{i}.txt", f"content {i}")
+        
+        with mock.patch.object(self.repo, "save_index", wraps=self.repo.save_index) as save_index:
+            added, failed = self.repo.add_paths(["dir", "missing.txt"])
+        
+        self.assertEqual(save_index.call_count, 1)
+        self.assertEqual(len(added), 20)
+        self.assertEqual([path for path, hash_value in added], sorted(path for path, hash_value in added))
+        self.assertEqual(failed, [("missing.txt", "File not found")])
+        self.assertEqual(self.repo.read_index()["dir/sub1/file4.txt"], Blob("content 4").calculate_hash())
+
+    def test_add_paths_skips_unchanged_and_updates_tracked(self):
+        self.repo.create()
+        self.commit_files({"a.txt": "a", "docs/b.txt": "b"}, "first")
+        self.write_file("docs/b.txt", "b2")
+        self.write_file("untracked.txt", "new")
+        
+        added, failed = self.repo.add_paths(["docs"], update_only=True)
+        self.assertEqual(added, [("docs/b.txt", Blob("b2").calculate_hash())])
+        
+        added, failed = self.repo.add_paths(["."])
+        self.assertEqual([path for path, hash_value in added], ["docs/b.txt", "untracked.txt"])
+        self.assertNotIn("a.txt", self.repo.read_index())
+        self.assertFalse(any(path.startswith(".minigit") for path in self.repo.read_index()))
+
+    def test_add_paths_in_parallel_matches_serial(self):
+        self.repo.create()
+        files = {f"pkg{i % 4}/mod{i}.py": f"print({i})\n" * (i + 1) for i in range(40)}
+        for rel_path, content in files.items():
+            self.write_file(rel_path, content)
+        
+        serial, _ = self.repo.add_paths(["."], jobs=1)
+        os.remove(self.repo.index_file)
+        threaded, _ = Repository(self.test_dir).add_paths(["."], jobs=4)
+        os.remove(self.repo.index_file)
+        shutil.rmtree(self.repo.objects_path)
+        os.makedirs(self.repo.objects_path)
+        processes, _ = Repository(self.test_dir).add_paths(["."], jobs=2, use_processes=True)
+        
+        expected = sorted((path, Blob(content).calculate_hash()) for path, content in files.items())
+        self.assertEqual(serial, expected)
+        self.assertEqual(threaded, expected)
+        self.assertEqual(processes, expected)
+        for path, hash_value in expected:
+            self.assertEqual(self.repo.load_object(hash_value).data, files[path].encode('utf-8'))
+
+    def test_new_file_is_read_once(self):
+        import minigit
+        self.repo.create()
+        self.write_file("big.bin", "x" * (3 * minigit.STREAM_CHUNK_SIZE))
+        full_path = os.path.join(self.test_dir, "big.bin")
+        
+        with mock.patch.object(repo_module.blob_module, "iter_file_chunks", wraps=minigit.iter_file_chunks) as reads, \
+                mock.patch.object(minigit, "iter_file_chunks", wraps=minigit.iter_file_chunks) as worker_reads:
+            hash_value = self.repo.add_to_index("big.bin")
+            os.remove(os.path.join(self.repo.objects_path, hash_value[:2], hash_value[2:]))
+            worker_hash, st = minigit.store_file_blob(self.repo.objects_path, full_path)
+        
+        self.assertEqual(reads.call_count, 1)
+        self.assertEqual(worker_reads.call_count, 1)
+        self.assertEqual(worker_hash, hash_value)
+        self.assertTrue(os.path.exists(os.path.join(self.repo.objects_path, hash_value[:2], hash_value[2:])))
+
+    def test_add_paths_accepts_names_starting_with_dots(self):
+        self.repo.create()
+        self.write_file("..env", "secret")
+        
+        added, failed = self.repo.add_paths(["..env", "../outside.txt", ".."])
+        
+        self.assertEqual([path for path, hash_value in added], ["..env"])
+        self.assertEqual(failed, [("../outside.txt", "File is outside repository"), ("..", "File is outside repository")])
+
+    def test_add_paths_reports_files_that_fail(self):
+        self.repo.create()
+        self.write_file("good.txt", "good")
+        self.write_file("bad.txt", "bad")
+        
+        original = self.repo._store_working_file
+        def store(file_path):
+            if file_path == "bad.txt":
+                raise OSError("unreadable")
+            return original(file_path)
+        
+        with mock.patch.object(self.repo, "_store_working_file", side_effect=store):
+            added, failed = self.repo.add_paths(["."], jobs=2)
+        
+        self.assertEqual([path for path, hash_value in added], ["good.txt"])
+        self.assertEqual(failed, [("bad.txt", "unreadable")])
+
+    def test_compute_status(self):
+        self.repo.create()
+        self.commit_files({"same.txt": "same", "edit.txt": "v1", "gone.txt": "bye", "src/restage.txt": "r1"}, "first")
+        self.write_file("edit.txt", "v2")
+        os.remove(os.path.join(self.test_dir, "gone.txt"))
+        self.write_file("new.txt", "new")
+        self.write_file("src/staged.txt", "staged")
+        self.repo.add_to_index("src/staged.txt")
+        self.write_file("src/restage.txt", "r2")
+        self.repo.add_to_index("src/restage.txt")
+        self.write_file("src/restage.txt", "r3")
+        
+        status = self.repo.compute_status()
+        
+        self.assertEqual(status, {
+            'staged': ["src/restage.txt", "src/staged.txt"],
+            'modified': ["edit.txt", "src/restage.txt"],
+            'deleted': ["gone.txt"],
+            'untracked': ["new.txt"],
+            'unmodified': ["same.txt"],
+        })
+
+    def test_compute_status_reads_tree_once(self):
+        self.repo.create()
+        self.commit_files({f"dir{i}/file{i}.txt": str(i) for i in range(10)}, "first")
+        
+        with mock.patch.object(self.repo, "get_head_tree", wraps=self.repo.get_head_tree) as get_head_tree, \
+                mock.patch.object(self.repo, "read_index", wraps=self.repo.read_index) as read_index:
+            status = self.repo.compute_status()
+        
+        self.assertEqual(len(status['unmodified']), 10)
+        self.assertEqual(get_head_tree.call_count, 1)
+        self.assertEqual(read_index.call_count, 0)
+
+    def test_status_reuses_unchanged_directory_listings(self):
+        self.repo.create()
+        self.commit_files({"a.txt": "a", "src/b.txt": "b", "src/lib/c.txt": "c"}, "first")
+        self.write_file("src/new.txt", "new")
+        for rel_dir in ["src/lib", "src", "."]:
+            self.age_file(rel_dir, 60)
+        self.assertEqual(self.repo.compute_status()['untracked'], ["src/new.txt"])
+        
+        with mock.patch.object(repo_module.os, "scandir", wraps=os.scandir) as scandir:
+            status = self.repo.compute_status()
+        
+        self.assertEqual(status['untracked'], ["src/new.txt"])
+        self.assertEqual(scandir.call_count, 0)
+        
+        # only the directory that gained an entry is listed again
+        self.write_file("src/lib/other.txt", "other")
+        with mock.patch.object(repo_module.os, "scandir", wraps=os.scandir) as scandir:
+            status = self.repo.compute_status()
+        
+        self.assertEqual(status['untracked'], ["src/lib/other.txt", "src/new.txt"])
+        self.assertEqual([call.args[0] for call in scandir.call_args_list], [os.path.join(self.test_dir, "src", "lib")])
+
+    def test_history_walks_use_commit_graph(self):
+        self.repo.create()
+        commits = [self.commit_files({"a.txt": f"v{i}"}, f"commit {i}") for i in range(5)]
+        self.assertEqual(len(self.repo.commit_graph()), 5)
+        self.assertTrue(self.repo.move_to_commit(commits[2]))
+        fresh = Repository(self.test_dir)
+        
+        def load_object(hash_value):
+            obj = original(hash_value)
+            if obj.get_type() == "commit":
+                raise AssertionError("opened a commit object")
+            return obj
+        
+        original = fresh.load_object
+        with mock.patch.object(fresh, "load_object", side_effect=load_object):
+            self.assertEqual(fresh.get_commit_chain(), commits[::-1])
+            self.assertEqual(fresh.get_current_commit_position(), (commits[2], 2))
+            walked = [oid.hex() for oid, obj_type, path in fresh.walk_objects() if obj_type == "commit"]
+        
+        self.assertEqual(sorted(walked), sorted(commits))
+        self.assertEqual([hash_value for hash_value, commit in fresh.get_commit_history(max_commits=2)], [commits[2], commits[1]])
+
+    def test_commit_graph_is_built_for_older_commits(self):
+        self.repo.create()
+        commits = [self.commit_files({"a.txt": f"v{i}"}, f"commit {i}") for i in range(3)]
+        os.remove(self.repo.commit_graph_file)
+        
+        self.assertEqual(self.repo.get_commit_chain(), commits[::-1])
+        self.assertEqual(len(self.repo.commit_graph()), 3)
+        
+        # the next commit appends a single row
+        size = os.path.getsize(self.repo.commit_graph_file)
+        newest = self.commit_files({"b.txt": "b"}, "after")
+        graph = self.repo.commit_graph()
+        
+        self.assertGreater(os.path.getsize(self.repo.commit_graph_file), size)
+        self.assertEqual(graph.generation_at(graph.position(bytes.fromhex(newest))), 4)
+        self.assertEqual(self.repo.get_commit_chain(), [newest] + commits[::-1])
+
+    def test_status_skips_ignored_paths(self):
+        self.repo.create()
+        self.write_file(".minigitignore", "build/\n*.log\n")
+        self.commit_files({"src/app.py": "app", "build/tracked.txt": "t1"}, "first")
+        self.write_file("build/out.o", "object")
+        self.write_file("debug.log", "log")
+        self.write_file("src/new.py", "new")
+        self.write_file("build/tracked.txt", "t2")
+        
+        with mock.patch.object(self.repo, "hash_working_file", wraps=self.repo.hash_working_file) as hashed:
+            status = self.repo.compute_status()
+        
+        self.assertEqual(status['untracked'], [".minigitignore", "src/new.py"])
+        # tracked files are not affected by ignore rules
+        self.assertEqual(status['modified'], ["build/tracked.txt"])
+        self.assertEqual(status['deleted'], [])
+        hashed_paths = [call.args[0] for call in hashed.call_args_list]
+        self.assertNotIn("build/out.o", hashed_paths)
+        self.assertNotIn("debug.log", hashed_paths)
+
+    def test_add_paths_leaves_out_ignored_files(self):
+        self.repo.create()
+        self.write_file(".minigitignore", "*.log\nvendor/\n")
+        self.write_file("a.txt", "a")
+        self.write_file("b.log", "b")
+        self.write_file("vendor/lib.py", "lib")
+        
+        added, failed = self.repo.add_paths(["."])
+        
+        self.assertEqual([path for path, hash_value in added], [".minigitignore", "a.txt"])
+        self.assertEqual(failed, [])
+        
+        added, failed = self.repo.add_paths(["b.log", "vendor"])
+        
+        self.assertEqual(added, [])
+        self.assertEqual(failed, [("b.log", "Path is ignored by .minigitignore"),
+                                  ("vendor", "Path is ignored by .minigitignore")])
+
+    def test_restore_keeps_ignored_files(self):
+        self.repo.create()
+        self.write_file(".minigitignore", "cache/\n")
+        self.repo.add_to_index(".minigitignore")
+        first = self.commit_files({"a.txt": "a"}, "first")
+        self.write_file("cache/data.bin", "data")
+        
+        self.repo._restore_commit_state(self.repo.load_object(self.repo.load_object(first).tree_hash))
+        
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "cache", "data.bin")))
+
+    def test_add_update_with_fsmonitor_stores_blobs_status_only_hashed(self):
+        self.repo.create()
+        self.commit_files({"f.txt": "v1"}, "first")
+        self.write_file("f.txt", "v2")
+        self.repo.compute_status()
+        
+        # the daemon saw nothing change since that status
+        with mock.patch.object(self.repo, "monitored_changes", return_value=(set(), "token")):
+            added, failed = self.repo.add_paths([], update_only=True)
+        commit_hash = self.repo.create_commit("second")
+        
+        self.assertEqual(failed, [])
+        self.assertEqual([path for path, hash_value in added], ["f.txt"])
+        blob_hash = self.repo.flatten_tree(self.repo.load_object(commit_hash).tree_hash)["f.txt"]
+        self.assertTrue(self.repo.has_object(blob_hash))
+        self.assertEqual(self.repo.load_object(blob_hash).data, b"v2")
+
+    def test_status_keeps_old_token_when_index_write_fails(self):
+        self.repo.create()
+        self.commit_files({"a.txt": "a"}, "first")
+        self.write_file("a.txt", "changed")
+        
+        with mock.patch.object(self.repo, "monitored_changes", return_value=(None, "daemon:1")), \
+                mock.patch.object(self.repo, "save_index", side_effect=OSError("disk full")):
+            self.assertEqual(self.repo.compute_status()['modified'], ["a.txt"])
+        self.assertFalse(os.path.exists(self.repo.fsmonitor_token_file))
+        
+        with mock.patch.object(self.repo, "monitored_changes", return_value=(None, "daemon:2")):
+            self.repo.compute_status()
+        with open(self.repo.fsmonitor_token_file) as f:
+            self.assertEqual(f.read().strip(), "daemon:2")
+
+    def test_status_with_fsmonitor_only_checks_changed_files(self):
+        import fsmonitor
+        try:
+            daemon = fsmonitor.FSMonitorDaemon(self.test_dir, self.repo.fsmonitor_socket)
+        except OSError:
+            self.skipTest("inotify is not available")
+        self.repo.create()
+        self.commit_files({"a.txt": "a", "b.txt": "b", "dir/c.txt": "c"}, "first")
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        try:
+            for _ in range(200):
+                if fsmonitor.send_command(self.repo.fsmonitor_socket, 'status') is not None:
+                    break
+                threading.Event().wait(0.01)
+            
+            # the first status scans everything and saves a token
+            self.assertEqual(len(self.repo.compute_status()['unmodified']), 3)
+            self.write_file("a.txt", "changed")
+            shutil.rmtree(os.path.join(self.test_dir, "dir"))
+            self.write_file("new.txt", "new")
+            
+            with mock.patch.object(self.repo, "scan_working_tree", side_effect=AssertionError("walked")), \
+                    mock.patch.object(self.repo, "hash_working_file", wraps=self.repo.hash_working_file) as hashed:
+                status = self.repo.compute_status()
+            
+            self.assertEqual(status['modified'], ["a.txt"])
+            self.assertEqual(status['deleted'], ["dir/c.txt"])
+            self.assertEqual(status['untracked'], ["new.txt"])
+            self.assertEqual(status['unmodified'], ["b.txt"])
+            self.assertEqual(sorted(call.args[0] for call in hashed.call_args_list), ["a.txt", "new.txt"])
+        finally:
+            fsmonitor.send_command(self.repo.fsmonitor_socket, 'stop')
+            thread.join(5)
+
     def test_load_nonexistent_object(self):
         self.repo.create()
         
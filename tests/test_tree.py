@@ -68,6 +68,39 @@ class TestTree(unittest.TestCase):
         self.assertEqual(tree.entries[1]['name'], "script.sh")
         self.assertEqual(tree.entries[2]['name'], "subdir")
 
+    def test_from_entries_matches_add_entry(self):
+        entries = [
+            ("100644", "zeta.txt", "a" * 40),
+            ("100644", "alpha.txt", "b" * 40),
+            ("100755", "mid.sh", "c" * 40)
+        ]
+        
+        incremental = Tree()
+        for mode, name, hash_value in entries:
+            incremental.add_entry(mode, name, hash_value)
+        
+        bulk = Tree.from_entries(entries)
+        
+        self.assertEqual(bulk.data, incremental.data)
+        self.assertEqual(bulk.calculate_hash(), incremental.calculate_hash())
+
+    def test_add_entry_after_serializing_rebuilds_data(self):
+        tree = Tree.from_entries([("100644", "b.txt", "a" * 40)])
+        first_data = tree.data
+        
+        tree.add_entry("100644", "a.txt", "b" * 40)
+        
+        self.assertNotEqual(tree.data, first_data)
+        self.assertTrue(tree.data.startswith(b"100644 a.txt\0"))
+
+    def test_from_entries_large_tree(self):
+        entries = [("100644", f"dir/file{i:05d}.txt", f"{i:040x}") for i in range(50000)]
+        
+        tree = Tree.from_entries(reversed(entries))
+        
+        self.assertEqual(len(tree.entries), 50000)
+        self.assertTrue(tree.data.startswith(b"100644 dir/file00000.txt\0"))
+
     def test_parse_tree_data(self):
         # First create a tree with some entries
         tree1 = Tree()
@@ -92,6 +125,50 @@ class TestTree(unittest.TestCase):
         self.assertEqual(entry1['name'], "hello.txt")
         self.assertEqual(entry1['hash'], hash_value)
 
+    def test_from_data_is_lazy(self):
+        source = Tree.from_entries([("100644", "b.txt", "a" * 40), ("100644", "a.txt", "b" * 40)])
+        
+        tree = Tree.from_data(source.data)
+        
+        self.assertIsNone(tree._entries)
+        self.assertEqual(tree.entry_count(), 2)
+        self.assertEqual([entry['name'] for entry in tree.iter_entries()], ["a.txt", "b.txt"])
+        self.assertIsNone(tree._entries)
+        self.assertEqual(tree.entries[1], tree_module.TreeEntry("100644", "b.txt", b"\xaa" * 20))
+        self.assertEqual(tree.entries[1]['hash'], "a" * 40)
+
+    def test_lookup(self):
+        entries = [("100644", f"file{i:04d}.txt", f"{i:040x}") for i in range(1000)]
+        tree = Tree.from_data(Tree.from_entries(entries).data)
+        
+        entry = tree.lookup("file0421.txt")
+        
+        self.assertEqual(entry['hash'], f"{421:040x}")
+        self.assertEqual(entry['mode'], "100644")
+        self.assertIsNone(tree.lookup("file9999.txt"))
+        self.assertIsNone(tree.lookup("a"))
+
+    def test_lookup_on_built_tree(self):
+        tree = Tree()
+        tree.add_entry("100644", "zeta.txt", "a" * 40)
+        tree.add_entry("100644", "alpha.txt", "b" * 40)
+        
+        self.assertEqual(tree.lookup("alpha.txt")['hash'], "b" * 40)
+        
+        tree.add_entry("100755", "mid.sh", "c" * 40)
+        self.assertEqual(tree.lookup("mid.sh")['mode'], "100755")
+
+    def test_entries_are_compact_tuples(self):
+        tree = Tree.from_entries([("100644", "a.txt", "a" * 40), ("100644", "b.txt", "b" * 40)])
+        
+        entry = tree.lookup("a.txt")
+        
+        self.assertIsInstance(entry, tuple)
+        self.assertEqual(entry.oid, b"\xaa" * 20)
+        self.assertEqual(entry.hash, "a" * 40)
+        self.assertIs(entry.mode, tree.lookup("b.txt").mode)
+        self.assertFalse(hasattr(tree, '__dict__'))
+
     def test_get_entries(self):
         tree = Tree()
         hash_value = "b6fc4c620b67d95f953a5c1c1230aaab5db5a1b0"
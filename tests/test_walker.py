@@ -0,0 +1,97 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from unittest import mock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ignore import IgnoreMatcher
+from index import UntrackedCache
+from walker import walk_working_tree
+
+
+class TestWalker(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.files = ["a.txt", "z.txt", "src/main.py", "src/lib/util.py", "src/lib/deep/x.bin", "docs/readme.md"]
+        for rel_path in self.files + [".minigit/HEAD"]:
+            self.write_file(rel_path, rel_path)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def write_file(self, rel_path, content):
+        full_path = os.path.join(self.test_dir, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w') as f:
+            f.write(content)
+
+    def walk(self, **kwargs):
+        return walk_working_tree(self.test_dir, IgnoreMatcher(self.test_dir), **kwargs)
+
+    def test_returns_sorted_paths_with_stat(self):
+        result = self.walk()
+        
+        self.assertEqual([rel_path for rel_path, st in result], sorted(self.files))
+        for rel_path, st in result:
+            expected = os.stat(os.path.join(self.test_dir, rel_path))
+            self.assertEqual((st.st_ino, st.st_size, st.st_mtime_ns), (expected.st_ino, expected.st_size, expected.st_mtime_ns))
+
+    def test_parallel_matches_serial(self):
+        for i in range(20):
+            self.write_file(f"many/dir{i}/file{i}.txt", str(i))
+        
+        serial = [rel_path for rel_path, st in self.walk(jobs=1)]
+        parallel = [rel_path for rel_path, st in self.walk(jobs=8)]
+        
+        self.assertEqual(serial, parallel)
+        self.assertEqual(len(serial), len(self.files) + 20)
+
+    def test_top_limits_the_walk(self):
+        result = self.walk(top="src")
+        
+        self.assertEqual([rel_path for rel_path, st in result], ["src/lib/deep/x.bin", "src/lib/util.py", "src/main.py"])
+
+    def test_ignored_directories_are_not_listed(self):
+        self.write_file(".minigitignore", "lib/\n")
+        
+        with mock.patch("walker.os.scandir", wraps=os.scandir) as scandir:
+            result = self.walk(jobs=1)
+        
+        self.assertNotIn("src/lib/util.py", [rel_path for rel_path, st in result])
+        listed = {os.path.relpath(call.args[0], self.test_dir) for call in scandir.call_args_list}
+        self.assertEqual(listed, {".", "src", "docs"})
+
+    def test_symlinks(self):
+        try:
+            os.symlink(os.path.join(self.test_dir, "src"), os.path.join(self.test_dir, "linked"))
+            os.symlink(os.path.join(self.test_dir, "missing"), os.path.join(self.test_dir, "dangling"))
+            os.symlink(os.path.join(self.test_dir, "a.txt"), os.path.join(self.test_dir, "b.txt"))
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks are not available")
+        
+        paths = [rel_path for rel_path, st in self.walk()]
+        
+        # linked directories are not followed, dangling links have nothing to stat
+        self.assertIn("b.txt", paths)
+        self.assertFalse(any(path.startswith("linked") or path == "dangling" for path in paths))
+
+    def test_untracked_cache_skips_unchanged_directories(self):
+        cache = UntrackedCache()
+        first = self.walk(untracked_cache=cache)
+        self.assertEqual(sorted(cache.dirs), ["", "docs", "src", "src/lib", "src/lib/deep"])
+        cache.mtime_ns = max(mtime_ns for mtime_ns, files, dirs in cache.dirs.values()) + 1
+        
+        with mock.patch("walker.os.scandir", wraps=os.scandir) as scandir:
+            second = self.walk(untracked_cache=cache)
+        
+        self.assertEqual(scandir.call_count, 0)
+        self.assertEqual([rel_path for rel_path, st in second], [rel_path for rel_path, st in first])
+        self.assertEqual([st.st_ino for rel_path, st in second], [st.st_ino for rel_path, st in first])
+
+
+if __name__ == '__main__':
+    unittest.main()
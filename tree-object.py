@@ -1,96 +1,195 @@
-from minigit import MinigitObject
+import sys
+from array import array
+from collections import namedtuple
+from minigit import MinigitObject, to_oid
+from logger import get_logger
+
+log = get_logger("Tree")
+
+
+class TreeEntry(namedtuple('TreeEntry', ['mode', 'name', 'oid'])):
+    #a plain tuple with the binary id, much smaller than the dict of three strings we used to keep per entry
+    __slots__ = ()
+
+    @property
+    def hash(self):
+        return self.oid.hex()
+
+    def __getitem__(self, key):
+        #entries used to be dicts, keep entry['name'] / entry['hash'] working
+        if isinstance(key, str):
+            if key == 'hash':
+                return self.oid.hex()
+            if key in self._fields:
+                return getattr(self, key)
+            raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
 
 class Tree(MinigitObject):
+    __slots__ = ('_data', '_entries', '_dirty', '_name_starts', '_nuls', '_view')
 
     def __init__(self):
-        self.entries = []
+        self._entries = []
+        self._dirty = False
+        self._name_starts = None
+        self._nuls = None
         super().__init__()
-        print(f"[Tree] Created tree with 0 entries")
+        log.trace("Created tree with 0 entries")
+
+    #data is serialized lazily, adding n entries and then reading data sorts and joins once instead of n times
+    @property
+    def data(self):
+        if self._dirty:
+            self._build_tree_data()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._dirty = False
+        self._name_starts = None
+        self._nuls = None
+
+    #a tree loaded from disk only keeps its raw bytes plus entry offsets, the dict per entry is made on first use
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = list(self.iter_entries())
+        return self._entries
+
+    @entries.setter
+    def entries(self, value):
+        self._entries = value
 
     def get_type(self):
         return "tree"
 
     def add_entry(self, mode, name, hash_value):
-        print(f"[Tree] Adding entry: {mode} {name} {hash_value}")
-        entry = {
-            'mode': mode,
-            'name': name,
-            'hash': hash_value
-        }
-        self.entries.append(entry)
-        self._build_tree_data()
+        log.trace("Adding entry: %s %s %s", mode, name, hash_value)
+        self.entries.append(TreeEntry(sys.intern(mode), name, to_oid(hash_value)))
+        self._dirty = True
+        self._name_starts = None
 
     def _build_tree_data(self):
-        if not self.entries:
-            self.data = b''
-            return
-
-        sorted_entries = sorted(self.entries, key=lambda x: x['name'])
-        tree_data = b''
+        sorted_entries = sorted(self.entries, key=lambda x: x.name)
+        parts = []
         
         for entry in sorted_entries:
-            mode = entry['mode']
-            name = entry['name']
-            hash_value = entry['hash']
-            
-            hash_binary = bytes.fromhex(hash_value)
-            
-            entry_line = f"{mode} {name}".encode('utf-8')
-            entry_line += b'\0'
-            entry_line += hash_binary
-            
-            tree_data += entry_line
-
-        self.data = tree_data
-        print(f"[Tree] Built tree data with {len(sorted_entries)} entries, {len(self.data)} bytes")
+            parts.append(f"{entry.mode} {entry.name}".encode('utf-8'))
+            parts.append(b'\0')
+            parts.append(entry.oid)
+
+        self._data = b''.join(parts)
+        self._dirty = False
+        self._name_starts = None
+        log.trace("Built tree data with %d entries, %d bytes", len(sorted_entries), len(self._data))
 
     def get_entries(self):
         return self.entries.copy()
 
     @classmethod
     def from_entries(cls, entries_list):
+        #bulk version of add_entry, the tree is serialized once when data is first needed
         tree = cls()
-        for mode, name, hash_value in entries_list:
-            tree.add_entry(mode, name, hash_value)
+        tree.entries = [TreeEntry(sys.intern(mode), name, to_oid(hash_value)) for mode, name, hash_value in entries_list]
+        tree._dirty = bool(tree.entries)
+        return tree
+
+    @classmethod
+    def from_data(cls, tree_data):
+        #wraps serialized tree data without building any entry dicts
+        tree = cls()
+        tree.data = bytes(tree_data)
+        tree._index_tree_data()
+        tree._entries = None
         return tree
 
     def parse_tree_data(self, tree_data):
-        self.entries = []
+        self.data = bytes(tree_data)
+        self._index_tree_data()
+        self._entries = None
+        log.trace("Parsed %d entries from tree data", len(self._nuls))
+        return self.entries
+
+    def _index_tree_data(self):
+        #one pass over the raw bytes recording where each name starts and where its null byte is,
+        #nothing is sliced or decoded here
+        tree_data = self._data
+        name_starts = array('I')
+        nuls = array('I')
+        find = tree_data.find
+        size = len(tree_data)
         pos = 0
         
-        while pos < len(tree_data):
-            null_pos = tree_data.find(b'\0', pos)
-            if null_pos == -1:
+        while pos < size:
+            space_pos = find(b' ', pos)
+            null_pos = find(b'\0', pos)
+            if space_pos == -1 or null_pos == -1 or null_pos + 21 > size:
                 break
-                
-            mode_name = tree_data[pos:null_pos].decode('utf-8')
-            mode, name = mode_name.split(' ', 1)
-            
-            hash_start = null_pos + 1
-            hash_end = hash_start + 20
-            if hash_end > len(tree_data):
-                break
-                
-            hash_binary = tree_data[hash_start:hash_end]
-            hash_hex = hash_binary.hex()
-            
-            entry = {
-                'mode': mode,
-                'name': name,
-                'hash': hash_hex
-            }
-            self.entries.append(entry)
-            
-            pos = hash_end
-            
-        print(f"[Tree] Parsed {len(self.entries)} entries from tree data")
-        return self.entries
+            name_starts.append(space_pos + 1)
+            nuls.append(null_pos)
+            pos = null_pos + 21
+        
+        self._view = memoryview(tree_data)
+        self._name_starts = name_starts
+        self._nuls = nuls
+
+    def _ensure_index(self):
+        if self._dirty or self._name_starts is None:
+            self.data
+            self._index_tree_data()
+
+    def _entry_at(self, i):
+        name_start = self._name_starts[i]
+        null_pos = self._nuls[i]
+        mode_start = self._nuls[i - 1] + 21 if i else 0
+        view = self._view
+        return TreeEntry(
+            sys.intern(str(view[mode_start:name_start - 1], 'utf-8')),
+            str(view[name_start:null_pos], 'utf-8'),
+            bytes(view[null_pos + 1:null_pos + 21])
+        )
+
+    def iter_entries(self):
+        if self._entries is not None:
+            yield from self._entries
+            return
+        self._ensure_index()
+        for i in range(len(self._nuls)):
+            yield self._entry_at(i)
+
+    def entry_count(self):
+        if self._entries is not None:
+            return len(self._entries)
+        self._ensure_index()
+        return len(self._nuls)
+
+    def lookup(self, name):
+        """Binary search the sorted entries for name, returns the entry or None"""
+        self._ensure_index()
+        target = name.encode('utf-8')
+        data = self._data
+        name_starts = self._name_starts
+        nuls = self._nuls
+        lo, hi = 0, len(nuls)
+        
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = data[name_starts[mid]:nuls[mid]]
+            if current < target:
+                lo = mid + 1
+            elif current > target:
+                hi = mid
+            else:
+                return self._entry_at(mid)
+        return None
 
     def display_tree(self):
         print(f"[Tree] Tree contents ({len(self.entries)} entries):")
-        for entry in sorted(self.entries, key=lambda x: x['name']):
-            mode = entry['mode']
-            name = entry['name']
-            hash_value = entry['hash']
+        for entry in sorted(self.entries, key=lambda x: x.name):
+            mode = entry.mode
+            name = entry.name
+            hash_value = entry.hash
             obj_type = "tree" if mode == "040000" else "blob"
             print(f"  {mode} {obj_type} {hash_value} {name}")
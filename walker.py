@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from logger import get_logger
+
+log = get_logger("Walker")
+
+#Lists the working tree with os.scandir, one task per directory on a thread pool. Listing a directory and
+#stat'ing its files is mostly waiting on the filesystem, on network mounts and cold caches the waits overlap
+#instead of adding up. Each file comes back with its stat result so callers do not stat it a second time.
+
+
+def _scan_directory(repo_path, rel_dir, matcher, untracked_cache):
+    """(files [(rel_path, stat)], subdirectories, cache record or None) for one directory"""
+    full_dir = os.path.join(repo_path, rel_dir) if rel_dir else repo_path
+    listing = None
+    mtime_ns = None
+    if untracked_cache is not None:
+        # stat before listing, a change while listing then shows up as a newer mtime next time
+        mtime_ns = os.stat(full_dir).st_mtime_ns
+        listing = untracked_cache.lookup(rel_dir, mtime_ns)
+
+    if listing is None:
+        entries = {}
+        dirs = []
+        with os.scandir(full_dir) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    entries[entry.name] = entry
+                elif not entry.is_symlink():
+                    dirs.append(entry.name)
+        files = list(entries)
+        record = (rel_dir, mtime_ns, list(files), list(dirs)) if untracked_cache is not None else None
+    else:
+        entries = {}
+        files, dirs = (list(names) for names in listing)
+        record = None
+
+    # ignored directories are dropped here so the walk never descends into them
+    matcher.prune(rel_dir, dirs, files)
+
+    found = []
+    for name in files:
+        rel_path = os.path.join(rel_dir, name) if rel_dir else name
+        try:
+            entry = entries.get(name)
+            st = entry.stat() if entry is not None else os.stat(os.path.join(full_dir, name))
+        except OSError as e:
+            # removed since the listing, or a dangling symlink
+            log.debug("Cannot stat %s: %s", rel_path, e)
+            continue
+        found.append((rel_path, st))
+    return found, [os.path.join(rel_dir, name) if rel_dir else name for name in dirs], record
+
+
+def walk_working_tree(repo_path, matcher, top="", untracked_cache=None, jobs=None):
+    """Sorted [(rel_path, stat)] for every file under top that matcher does not ignore
+
+    top is a repository relative directory, "" for the whole tree. With an UntrackedCache, directories
+    whose mtime is unchanged are not listed again and the cache is updated with the ones that were.
+    jobs is the number of threads, 1 walks in the calling thread, None lets the pool pick.
+    """
+    files = []
+    visited = set()
+    listed = 0
+
+    def collect(rel_dir, result):
+        nonlocal listed
+        found, subdirs, record = result
+        files.extend(found)
+        visited.add(rel_dir)
+        if record is not None:
+            untracked_cache.record(*record)
+        if record is not None or untracked_cache is None:
+            listed += 1
+        return subdirs
+
+    def scan(rel_dir):
+        try:
+            return _scan_directory(repo_path, rel_dir, matcher, untracked_cache)
+        except OSError as e:
+            log.debug("Cannot list %s: %s", rel_dir or ".", e)
+            return None
+
+    if jobs == 1:
+        pending = [top]
+        while pending:
+            rel_dir = pending.pop()
+            result = scan(rel_dir)
+            if result is not None:
+                pending.extend(collect(rel_dir, result))
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            running = {pool.submit(scan, top): top}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rel_dir = running.pop(future)
+                    result = future.result()
+                    if result is not None:
+                        for subdir in collect(rel_dir, result):
+                            running[pool.submit(scan, subdir)] = subdir
+
+    if untracked_cache is not None and not top:
+        untracked_cache.retain(visited)
+    log.debug("Walked %d directories, listed %d, found %d files", len(visited), listed, len(files))
+    files.sort(key=lambda item: item[0])
+    return files